@@ -12,5 +12,23 @@ class Argument(BaseModel):
     media: Optional[str] = None
     extension: Optional[List[str]] = None
     keep_temp: bool
+    heif_temp: bool = False
+    output_cache: bool = False
     allow_reprocess: bool
     retry_failed: bool
+    resume: Optional[str] = None
+    workers: Optional[int] = None
+    threads: Optional[int] = None
+    upload_workers: Optional[int] = None
+    upload_queue_size: Optional[int] = None
+    download_workers: Optional[int] = None
+    download_queue_size: Optional[int] = None
+    scan_workers: Optional[int] = None
+    metrics_interval: Optional[float] = None
+    log_level: Optional[str] = None
+    quiet: bool = False
+    abort_ratio: Optional[float] = None
+    segment_duration: Optional[float] = None
+    segment_time: Optional[float] = None
+    segment_workers: Optional[int] = None
+    min_expected_savings: Optional[float] = None
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class EncodeProgress(BaseModel):
+    frame: int = 0
+    fps: float = 0.0                        # frames encoded per second
+    bitrate: Optional[float] = None         # kbit/s of the output so far
+    total_size: int = 0                     # bytes written so far
+    out_time: float = 0.0                   # seconds encoded
+    speed: Optional[float] = None           # multiple of real time
+    duration: Optional[float] = None        # seconds to encode in total
+    finished: bool = False                  # last event of the encode (progress=end)
+
+    @property
+    def ratio(self):
+        """Fraction encoded, None when the duration is unknown."""
+        if not self.duration:
+            return None
+        return min(1.0, self.out_time / self.duration)
+
+    @property
+    def eta(self):
+        """Seconds left at the current speed, None when it can't be told yet."""
+        if self.finished:
+            return 0.0
+        if not self.duration or not self.speed:
+            return None
+        return max(0.0, (self.duration - self.out_time) / self.speed)
+
+    @property
+    def projected_size(self):
+        """Output size in bytes if the rest encodes like the part so far."""
+        if not self.duration or self.out_time <= 0:
+            return None
+        return int(self.total_size * self.duration / self.out_time)
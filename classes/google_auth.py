@@ -4,6 +4,7 @@ from typing import Optional, List
 
 class Scope(BaseModel):
     appendonly: str
+    readonly: Optional[str] = None       # needed to list/download (operation 3)
 
 class FilePath(BaseModel):
     client_secret_file: str
@@ -13,6 +14,7 @@ class GoogleAPI(BaseModel):
     validate_token_url: str
     media_upload_url: str
     media_create_url: str
+    media_list_url: Optional[str] = None
 
 class GoogleAuth(BaseModel):
     scope: Scope
@@ -2,4 +2,12 @@ from pydantic import BaseModel
 from typing import Optional
 
 class GooglePhotos(BaseModel):
-    album_id: Optional[str]
\ No newline at end of file
+    album_id: Optional[str]
+    chunk_size_mb: int = 8                  # resumable upload chunk size
+    resumable_threshold_mb: int = 50        # files from this size on use resumable uploads
+    requests_per_second: Optional[float] = 5        # upload request rate, None for no limit
+    request_burst: int = 10                         # requests allowed at once after an idle period
+    bandwidth_mbps: Optional[float] = None          # upload bandwidth cap in megabits per second
+    max_retries: int = 6                            # retries of a request answered with 429/5xx
+    daily_request_quota: Optional[int] = 10000      # requests per day (Google quota day, Pacific Time)
+    daily_upload_quota_gb: Optional[float] = None   # bytes uploaded per day
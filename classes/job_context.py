@@ -0,0 +1,94 @@
+import uuid
+import threading
+import subprocess
+
+
+class JobContext:
+    """
+    Holds the state of a single optimization job (one media file).
+
+    Each job owns the subprocesses and progress bar it is currently driving, so
+    several jobs can run side by side and be cancelled independently.
+    """
+
+    def __init__(self, guid: str = None, threads: int = None):
+        self._guid: str = guid or str(uuid.uuid4())
+        self._threads: int = threads
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._subprocesses: list[subprocess.Popen] = []
+        self._pbar = None
+        self._output_path = None
+
+    @property
+    def guid(self):
+        return self._guid
+
+    @property
+    def threads(self):
+        return self._threads
+
+    @property
+    def output_path(self):
+        """Final output of the job, set once it succeeded."""
+        return self._output_path
+
+    @output_path.setter
+    def output_path(self, output_path):
+        self._output_path = output_path
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def attach_subprocess(self, process: subprocess.Popen):
+        """
+        Register a subprocess running for this job (a job may drive several at once).
+        A job that has already been cancelled terminates it straight away.
+        """
+        with self._lock:
+            self._subprocesses = [p for p in self._subprocesses if p.poll() is None]
+            self._subprocesses.append(process)
+        if self.cancelled:
+            self.terminate()
+
+    def attach_pbar(self, pbar):
+        with self._lock:
+            self._pbar = pbar
+
+    def cancel(self):
+        """
+        Flag the job as cancelled and stop whatever it is running.
+        """
+        self._cancelled.set()
+        self.terminate()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise KeyboardInterrupt("User Interrupted.")
+
+    def terminate(self, timeout: float = 5):
+        """
+        Close the progress bar and stop the running subprocesses, killing them if
+        they do not exit within the timeout.
+        """
+        with self._lock:
+            processes, pbar = list(self._subprocesses), self._pbar
+
+        try:
+            if pbar is not None and not pbar.disable:
+                pbar.close()
+        except Exception:
+            pass
+
+        for process in processes:
+            if process.poll() is not None:
+                continue
+            try:
+                process.terminate()
+                process.wait(timeout=timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+            except Exception:
+                pass
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class MediaProbe(BaseModel):
+    path: str
+    mime: Optional[str] = None
+    kind: str                               # image / video / other
+    size: int
+    format_name: Optional[str] = None
+    codec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    frames: int = 1
+    fps: Optional[float] = None
+    duration: Optional[float] = None
+    bit_rate: Optional[int] = None
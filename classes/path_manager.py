@@ -1,5 +1,7 @@
+from pathlib import Path
+
 class PathManager:
-    def __init__(self, root, log, failed_media, temp_media, optimized_media, raw_media, uploaded_media, failed_upload_media):
+    def __init__(self, root, log, failed_media, temp_media, optimized_media, raw_media, uploaded_media, failed_upload_media, downloaded_media=None, renditions=None):
         self._root: str = root
         self._log: str = log
         self._failed_media: str = failed_media
@@ -8,6 +10,9 @@ class PathManager:
         self._raw_media: str = raw_media
         self._uploaded_media: str = uploaded_media
         self._failed_upload_media: str = failed_upload_media
+        self._downloaded_media: str = downloaded_media
+        self._renditions: str = renditions
+        self._created: set[str] = set()
 
     def __str__(self):
         return f"""root={self._root}\n
@@ -17,7 +22,16 @@ class PathManager:
         optimized_media={self._optimized_media}\n
         raw_media={self._raw_media}\n
         uploaded_media={self._uploaded_media}\n
-        failed_upload_media={self._failed_upload_media}"""
+        failed_upload_media={self._failed_upload_media}\n
+        downloaded_media={self._downloaded_media}\n
+        renditions={self._renditions}"""
+
+    # Folders are created on first use, a run only creates the ones it needs (once each)
+    def _folder(self, folder):
+        if folder not in self._created:
+            Path(folder).mkdir(parents=True, exist_ok=True)
+            self._created.add(folder)
+        return folder
 
     @property
     def root(self):
@@ -29,24 +43,32 @@ class PathManager:
 
     @property
     def failed_media(self):
-        return self._failed_media
-    
+        return self._folder(self._failed_media)
+
     @property
     def temp_media(self):
-        return self._temp_media
+        return self._folder(self._temp_media)
 
     @property
     def optimized_media(self):
-        return self._optimized_media
-    
+        return self._folder(self._optimized_media)
+
     @property
     def raw_media(self):
-        return self._raw_media
-    
+        return self._folder(self._raw_media)
+
     @property
     def uploaded_media(self):
-        return self._uploaded_media
-    
+        return self._folder(self._uploaded_media)
+
     @property
     def failed_upload_media(self):
-        return self._failed_upload_media
+        return self._folder(self._failed_upload_media)
+
+    @property
+    def downloaded_media(self):
+        return self._folder(self._downloaded_media)
+
+    @property
+    def renditions(self):
+        return self._folder(self._renditions)
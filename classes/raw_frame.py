@@ -0,0 +1,32 @@
+class RawFrame:
+    """
+    Decoded pixels handed to ffmpeg through stdin (-f rawvideo), no temp file involved.
+    """
+    def __init__(self, data: bytes, width: int, height: int, pix_fmt: str):
+        self._data: bytes = data
+        self._width: int = width
+        self._height: int = height
+        self._pix_fmt: str = pix_fmt
+
+    def __str__(self):
+        return f"RawFrame({self._width}x{self._height}, {self._pix_fmt})"
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def pix_fmt(self):
+        return self._pix_fmt
+
+    @property
+    def size(self):
+        return f"{self._width}x{self._height}"
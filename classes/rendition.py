@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional, List
+
+class Rendition(BaseModel):
+    name: str                               # folder of the rendition (renditions/<name>/)
+    codec: str                              # ffmpeg encoder, the extension follows from it
+    crf: Optional[int] = None               # modern codecs quality (default: 30 image, 23/26 video)
+    qvb: Optional[int] = None               # simpler codecs quality, -q:v (default: 4)
+    preset: str = "medium"                  # video only
+    max_size: Optional[int] = None          # longest side in pixels (never upscaled), None for full size
+    audio: bool = True                      # video only, copy the audio streams
+    streaming: bool = False                 # video only, moov atom first (+faststart)
+
+class Renditions(BaseModel):
+    image: List[Rendition] = []             # written next to every optimized image
+    video: List[Rendition] = []             # written next to every optimized video
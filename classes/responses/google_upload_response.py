@@ -17,13 +17,17 @@ class MediaItem(BaseModel):
 
 
 class UploadStatus(BaseModel):
-    message: str
+    code: Optional[int] = None      # absent (0) on success
+    message: Optional[str] = None
 
 
 class NewMediaItemResult(BaseModel):
     uploadToken: str
     status: UploadStatus
-    mediaItem: MediaItem
+    mediaItem: Optional[MediaItem] = None   # missing when the item failed
+
+    def is_success(self) -> bool:
+        return self.mediaItem is not None and not self.status.code
 
 
 class ErrorResponse(BaseModel):
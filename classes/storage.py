@@ -0,0 +1,11 @@
+from typing import Optional
+from pydantic import BaseModel
+
+class Storage(BaseModel):
+    history_file: str = "output/compression_history.json"
+    ledger_file: str = "output/processed_ledger.sqlite3"
+    cache_dir: str = "output/cache"
+    cache_max_size_gb: float = 50
+    tool_cache_file: str = "output/tool_cache.json"
+    quota_file: str = "output/upload_quota.json"
+    metrics_dir: Optional[str] = None    # None: run folder (point it to node_exporter's textfile directory)
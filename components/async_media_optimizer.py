@@ -0,0 +1,271 @@
+import os
+import re
+import json
+import asyncio
+from collections import deque
+from pathlib import Path
+from typing import Callable
+from classes.media_probe import MediaProbe
+from classes.raw_frame import RawFrame
+from classes.encode_progress import EncodeProgress
+from classes.rendition import Rendition
+from components.media_optimizer import MediaOptimizer, EncodeAbortedError, STDERR_TAIL_LINES
+from helper.ffmpeg_progress import FFmpegProgressParser
+
+# ffmpeg ends its stats lines with \r, asyncio only splits on \n
+LINE_SPLIT = re.compile(r"[\r\n]+")
+
+class AsyncMediaOptimizer(MediaOptimizer):
+    """
+    asyncio flavour of MediaOptimizer built on asyncio.create_subprocess_exec.
+
+    A single event loop can drive many ffprobe/exiftool/ffmpeg jobs at once, without one OS thread
+    per job. The number of child processes alive at the same time is bounded by a semaphore,
+    progress is streamed from stderr without blocking the loop, and cancelling a task terminates
+    its child process. Commands are built by MediaOptimizer, so both engines encode identically.
+    This is a library API for asyncio callers, the command line app runs the threaded engine.
+    """
+
+    def __init__(self, ffmpeg="ffmpeg", ffprobe="ffprobe", exiftool="exiftool", xmp_config=None, max_concurrency: int = 4, timeout: float = 5, stream_groups=False):
+        """
+        Args:
+            max_concurrency (int): Maximum number of child processes running at the same time.
+            timeout (float): Seconds a cancelled child gets to exit before it is killed.
+        """
+        super().__init__(ffmpeg, ffprobe, exiftool, xmp_config, exiftool_daemon=False, stream_groups=stream_groups)
+        self._max_concurrency: int = max(1, max_concurrency)
+        self._timeout: float = timeout
+        self._semaphore: asyncio.Semaphore = None
+
+    #region Subprocess
+    def _get_semaphore(self):
+        # created lazily so the semaphore belongs to the running loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    @staticmethod
+    async def _read_lines(stream: asyncio.StreamReader, on_line: Callable[[str], None], tail: deque):
+        pending = ""
+        while chunk := await stream.read(4096):
+            parts = LINE_SPLIT.split(pending + chunk.decode("utf-8", errors="replace"))
+            pending = parts.pop()
+            for line in parts:
+                tail.append(line)
+                if on_line:
+                    on_line(line)
+        if pending:
+            tail.append(pending)
+            if on_line:
+                on_line(pending)
+
+    async def _terminate(self, process: asyncio.subprocess.Process):
+        if process.returncode is not None:
+            return
+        try:
+            process.terminate()
+            await asyncio.wait_for(process.wait(), self._timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+        except ProcessLookupError:
+            pass
+
+    async def run(self, cmd: list, stdin_data: bytes = None, on_stderr_line: Callable[[str], None] = None, on_stdout_line: Callable[[str], None] = None):
+        """
+        Run a command as a child process of the event loop.
+
+        Args:
+            cmd (list): Command and arguments.
+            stdin_data (bytes): Data written to the child's stdin.
+            on_stderr_line (Callable[[str], None]): Called for every stderr line as it arrives.
+            on_stdout_line (Callable[[str], None]): Called for every stdout line as it arrives, stdout
+                                                    is then streamed instead of returned.
+
+        Returns:
+            tuple[int, str, str]: Return code, stdout and the last lines of stderr.
+        """
+        async with self._get_semaphore():
+            process = await asyncio.create_subprocess_exec(
+                *[str(arg) for arg in cmd],
+                stdin=asyncio.subprocess.PIPE if stdin_data is not None else asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            tail = deque(maxlen=STDERR_TAIL_LINES)
+            if on_stdout_line:
+                stdout_task = asyncio.ensure_future(self._read_lines(process.stdout, on_stdout_line, deque(maxlen=1)))
+            else:
+                stdout_task = asyncio.ensure_future(process.stdout.read())
+            stderr_task = asyncio.ensure_future(self._read_lines(process.stderr, on_stderr_line, tail))
+            try:
+                if stdin_data is not None:
+                    try:
+                        process.stdin.write(stdin_data)
+                        await process.stdin.drain()
+                        process.stdin.close()
+                    except (BrokenPipeError, ConnectionResetError):
+                        pass   # the child exited without reading it, its return code and stderr tell why
+                stdout, _ = await asyncio.gather(stdout_task, stderr_task)
+                await process.wait()
+            except BaseException:
+                # cancelled (or failed), never leave the child behind
+                stdout_task.cancel()
+                stderr_task.cancel()
+                await asyncio.shield(self._terminate(process))
+                raise
+
+        stdout = stdout.decode("utf-8", errors="replace") if isinstance(stdout, bytes) else ""
+        return process.returncode, stdout, "\n".join(tail)
+    #endregion
+
+    #region Probe
+    async def async_probe(self, filepath: Path, mime: str = None):
+        """
+        Async version of probe(), shares the same memo cache.
+        """
+        stat = os.stat(filepath)
+        key = self._probe_key(filepath, stat)
+        probe = self._cached_probe(key, mime)
+        if probe:
+            return probe
+
+        returncode, stdout, stderr = await self.run(self._probe_command(filepath))
+        if returncode != 0:
+            raise RuntimeError(f"FFprobe failed: {stderr.strip()}")
+
+        probe: MediaProbe = self._parse_probe(filepath, stat.st_size, mime, json.loads(stdout or "{}"))
+        return self._store_probe(key, probe)
+    #endregion
+
+    #region Metadata
+    async def async_run_exiftool(self, args: list[str], xmp_config: str = None):
+        cmd = [
+            self._exiftool,
+            *(["-config", xmp_config] if xmp_config else []),
+            *args
+        ]
+        returncode, stdout, stderr = await self.run(cmd)
+        if returncode != 0:
+            raise RuntimeError(f"ExifTool failed: {stderr.strip()}")
+        return stdout
+
+    async def async_get_mime_type(self, filepath: Path):
+        stdout = await self.async_run_exiftool(["-MIMEType", str(filepath)])
+        return self._parse_mime_type(stdout)
+
+    async def async_read_custom_xmp_tag(self, file_path: str, namespace: str, tag: str, xmp_config: str = None):
+        stdout = await self.async_run_exiftool([f"-XMP-{namespace}:{tag}", "-j", str(file_path)], xmp_config or self._xmp_config)
+        return json.loads(stdout)[0].get(tag)
+
+    async def async_write_metadata(self, from_file, to_file, namespace: str, metadatas: dict[str, str]):
+        await self.async_run_exiftool(self._write_metadata_args(from_file, to_file, namespace, metadatas), self._xmp_config)
+    #endregion
+
+    #region Optimize
+    async def async_optimize_image(self, input_path: str, output_path: str, qvb: int = 4, crf: int = 30, codec="libaom-av1", multiple_frame=False, threads: int = None, raw_frame: RawFrame = None):
+        """
+        Async version of optimize_image().
+        """
+        cmd = self._image_command(input_path, output_path, qvb, crf, codec, multiple_frame, threads, raw_frame)
+        mod_time = os.path.getmtime(input_path)
+
+        returncode, _, stderr = await self.run(cmd, raw_frame.data if raw_frame else None)
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg failed:\n{stderr}")
+
+        os.utime(output_path, (mod_time, mod_time))
+        return output_path
+
+    async def async_optimize_video(self,
+        input_path: str,
+        output_path: Path,
+        crf: int = None,
+        preset: str = "slow",
+        codec: str = "libx265",
+        scale_resolution: str = None,
+        streaming: bool = False,
+        threads: int = None,
+        metadatas: dict[str, str] = None,
+        duration: float = None,
+        abort_ratio: float = None,
+        abort_min_progress: float = 0.1,
+        progress_callback: Callable[[EncodeProgress], None] = None
+    ):
+        """
+        Async version of optimize_video().
+
+        Args:
+            abort_ratio (float): Stop the encode once the projected output size exceeds this fraction of the
+                                 input size (e.g. 1.0 = never larger than the original). None disables it.
+            abort_min_progress (float): Fraction of the duration to encode before the projection is trusted.
+            progress_callback (Callable[[EncodeProgress], None]): Called with every progress event
+                                                                 (fps, speed, output size, ETA).
+
+        Raises:
+            EncodeAbortedError: If the projected output size exceeds abort_ratio.
+        """
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        cmd = self._video_command(input_path, output_path, crf, preset, codec, scale_resolution, streaming, threads, metadatas)
+        cmd[1:1] = self._progress_args()
+        if duration is None:
+            duration = (await self.async_probe(input_path)).duration or 0.0
+
+        parser = FFmpegProgressParser(duration)
+        size_limit = os.path.getsize(input_path) * abort_ratio if abort_ratio else None
+
+        def on_line(line: str):
+            event = parser.feed(line)
+            if event is None:
+                return
+            if progress_callback:
+                progress_callback(event)
+            if size_limit and duration and event.out_time >= duration * abort_min_progress:
+                if event.projected_size > size_limit:
+                    # raised out of the stdout reader, run() terminates the child
+                    raise EncodeAbortedError(f"Projected size {event.projected_size} exceeds {size_limit:.0f} bytes", event.projected_size)
+
+        returncode, _, stderr = await self.run(cmd, on_stdout_line=on_line)
+        if returncode != 0:
+            raise RuntimeError(f"FFmpeg failed:\n{stderr}")
+        return output_path
+    
+    async def async_optimize_renditions(self,
+        input_path: str,
+        outputs: list[tuple[Rendition, Path, dict[str, str]]],
+        kind: str = "image",
+        threads: int = None,
+        raw_frame: RawFrame = None,
+        multiple_frame: bool = False,
+        duration: float = None,
+        progress_callback: Callable[[EncodeProgress], None] = None
+    ):
+        """
+        Async version of optimize_renditions().
+        """
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        cmd = self._renditions_command(input_path, outputs, kind, threads, raw_frame, multiple_frame)
+        cmd[1:1] = self._progress_args()
+        mod_time = os.path.getmtime(input_path)
+        parser = FFmpegProgressParser(duration)
+
+        def on_line(line: str):
+            event = parser.feed(line)
+            if event is not None and progress_callback:
+                progress_callback(event)
+
+        returncode, _, stderr = await self.run(cmd, raw_frame.data if raw_frame else None, on_stdout_line=on_line)
+        paths = [output_path for _, output_path, _ in outputs]
+        if returncode != 0:
+            for path in paths:
+                Path(path).unlink(missing_ok=True)
+            raise RuntimeError(f"FFmpeg failed:\n{stderr}")
+
+        for path in paths:
+            os.utime(path, (mod_time, mod_time))
+        return paths
+    #endregion
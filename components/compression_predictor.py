@@ -0,0 +1,146 @@
+import os
+import json
+import math
+import threading
+from pathlib import Path
+from classes.media_probe import MediaProbe
+
+# Typical bits per pixel (per frame for video) produced by our default encoder settings
+TARGET_BPP = {
+    # Image codecs
+    "libaom-av1": 0.6,
+    "libsvtav1": 0.6,
+    "libwebp": 0.9,
+    "libjxl": 0.9,
+    "mjpeg": 1.8,
+    # Video codecs
+    "libx265": 0.05,
+    "libx264": 0.09,
+    "libvpx-vp9": 0.06,
+    "libvpx": 0.1,
+}
+
+# Bits per pixel bands used to bucket the history (upper bounds)
+BPP_BANDS = [0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.0, 4.0]
+
+
+class CompressionPredictor:
+    """
+    Predicts how much an encode will save before running it.
+
+    The estimate starts from the input's bits per pixel against what the output codec usually
+    produces, and is blended with the history of past Size_Reduction_Percent results for the same
+    (input codec, output codec, bits per pixel band) bucket. The history is kept on disk so every
+    run keeps improving the next one.
+    """
+
+    def __init__(self, history_file: str, min_samples: int = 5):
+        """
+        Args:
+            history_file (str): JSON file keeping the compression history between runs.
+            min_samples (int): History samples needed before the history weighs as much as the prior.
+        """
+        self._history_file = Path(history_file)
+        self._min_samples: int = min_samples
+        self._lock = threading.Lock()
+        self._buckets: dict[str, dict] = self._load()
+        self._predictions: int = 0
+        self._absolute_error: float = 0.0
+
+    def _load(self):
+        try:
+            with open(self._history_file, "r") as file:
+                return json.load(file).get("buckets", {})
+        except (OSError, ValueError):
+            return {}
+
+    def save(self):
+        """
+        Write the history atomically (temp file + replace).
+        """
+        with self._lock:
+            data = {"buckets": dict(self._buckets)}
+        self._history_file.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._history_file.with_suffix(self._history_file.suffix + ".tmp")
+        with open(temp, "w") as file:
+            json.dump(data, file, indent=2)
+        os.replace(temp, self._history_file)
+
+    @staticmethod
+    def bits_per_pixel(probe: MediaProbe):
+        """
+        Bits per pixel of the input (per frame for video), None when the probe lacks the data.
+        """
+        if not probe or not probe.width or not probe.height:
+            return None
+        pixels = probe.width * probe.height
+
+        if probe.kind == "video":
+            bit_rate = probe.bit_rate or (probe.size * 8 / probe.duration if probe.duration else None)
+            if not bit_rate or not probe.fps:
+                return None
+            return bit_rate / (pixels * probe.fps)
+        return probe.size * 8 / (pixels * max(1, probe.frames))
+
+    @staticmethod
+    def _bucket(probe: MediaProbe, output_codec: str, bpp: float):
+        band = next((i for i, limit in enumerate(BPP_BANDS) if bpp <= limit), len(BPP_BANDS)) if bpp else "na"
+        return f"{probe.codec}|{output_codec}|{band}"
+
+    def predict(self, probe: MediaProbe, output_codec: str):
+        """
+        Expected size reduction in percent, None when there is nothing to base it on.
+        """
+        bpp = self.bits_per_pixel(probe)
+        target = TARGET_BPP.get(output_codec)
+        prior = (1 - target / bpp) * 100 if bpp and target else None
+
+        with self._lock:
+            bucket = self._buckets.get(self._bucket(probe, output_codec, bpp))
+        if not bucket:
+            return prior
+        if prior is None:
+            return bucket["mean"]
+
+        weight = bucket["count"] / (bucket["count"] + self._min_samples)
+        return weight * bucket["mean"] + (1 - weight) * prior
+
+    @staticmethod
+    def below_threshold(predicted: float, min_expected_savings: float = None):
+        """
+        True when an encode is predicted to save less than min_expected_savings percent
+        (never when either is unknown, the encode runs to find out).
+        """
+        return min_expected_savings is not None and predicted is not None and predicted < min_expected_savings
+
+    def record(self, probe: MediaProbe, output_codec: str, actual: float, predicted: float = None):
+        """
+        Add an encode result to the history and track how far the prediction was.
+
+        Args:
+            probe (MediaProbe): Probe of the input media.
+            output_codec (str): Codec used for the encode.
+            actual (float): Actual size reduction in percent.
+            predicted (float): Prediction made before the encode, if any.
+        """
+        if actual is None or math.isnan(actual):
+            return
+        key = self._bucket(probe, output_codec, self.bits_per_pixel(probe))
+        with self._lock:
+            bucket = self._buckets.setdefault(key, {"count": 0, "mean": 0.0})
+            bucket["count"] += 1
+            bucket["mean"] += (actual - bucket["mean"]) / bucket["count"]
+
+            if predicted is not None:
+                self._predictions += 1
+                self._absolute_error += abs(predicted - actual)
+
+    @property
+    def accuracy(self):
+        """
+        Number of checked predictions and their mean absolute error (percentage points).
+        """
+        with self._lock:
+            if not self._predictions:
+                return 0, None
+            return self._predictions, self._absolute_error / self._predictions
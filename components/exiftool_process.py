@@ -0,0 +1,134 @@
+import queue
+import threading
+import subprocess
+
+
+class ExifToolProcess:
+    """
+    Long-lived exiftool process driven through `-stay_open True -@ -`.
+
+    Every command is written to exiftool's stdin as an argument file, one argument per line,
+    and framed with `-execute{n}`. exiftool answers with `{ready{n}}` on stdout, and `-echo4`
+    places the same sentinel on stderr, so both streams can be read up to the end of the command.
+    stderr is drained by a reader thread while stdout is read, so neither pipe can fill up and
+    stall exiftool.
+    The Perl interpreter is started once instead of once per call, and a process that died
+    is restarted on the next command.
+    """
+
+    def __init__(self, exiftool: str = "exiftool", xmp_config: str = None, timeout: float = 5):
+        """
+        Args:
+            exiftool (str): Path to the exiftool executable.
+            xmp_config (str): Optional exiftool config file, loaded once when the process starts.
+            timeout (float): Seconds to wait for exiftool to exit when closing it.
+        """
+        self._exiftool: str = exiftool
+        self._xmp_config: str = xmp_config
+        self._timeout: float = timeout
+        self._process: subprocess.Popen = None
+        self._stderr: queue.Queue = None
+        self._counter: int = 0
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self._process is not None and self._process.poll() is None
+
+    def start(self):
+        cmd = [
+            self._exiftool,
+            *(["-config", self._xmp_config] if self._xmp_config else []),   # -config must be the first argument
+            "-stay_open", "True",
+            "-@", "-"
+        ]
+        self._process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+            errors="replace"
+        )
+        self._stderr = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._process.stderr, self._stderr), daemon=True).start()
+        self._counter = 0
+
+    @staticmethod
+    def _pump(stream, lines: queue.Queue):
+        # Drain stderr as it is written, None marks the end of the stream
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+
+    def close(self):
+        """
+        Ask exiftool to leave stay_open mode, kill it if it does not exit in time.
+        """
+        with self._lock:
+            process, self._process = self._process, None
+            if process is None or process.poll() is not None:
+                return
+            try:
+                process.stdin.write("-stay_open\nFalse\n")
+                process.stdin.flush()
+                process.wait(timeout=self._timeout)
+            except (OSError, subprocess.TimeoutExpired):
+                process.kill()
+                process.wait()
+
+    def execute(self, *args: str):
+        """
+        Run one exiftool command in the persistent process.
+
+        Args:
+            *args (str): exiftool arguments, exactly as they would be given on the command line.
+
+        Returns:
+            tuple[str, str]: stdout and stderr of the command.
+
+        Raises:
+            RuntimeError: If exiftool reports an error or keeps dying.
+        """
+        with self._lock:
+            for attempt in range(2):
+                if not self.running:
+                    self.start()
+                try:
+                    stdout, stderr = self._execute(args)
+                    break
+                except (OSError, EOFError) as e:
+                    # exiftool died (or never started properly), restart it once
+                    self._process.kill()
+                    self._process.wait()
+                    self._process = None
+                    if attempt:
+                        raise RuntimeError(f"ExifTool process stopped responding: {e}")
+
+        errors = [line for line in stderr.splitlines() if line.startswith("Error")]
+        if errors:
+            raise RuntimeError(f"ExifTool failed: {' '.join(errors)}")
+        return stdout, stderr
+
+    def _execute(self, args: tuple[str]):
+        self._counter += 1
+        ready = f"{{ready{self._counter}}}"
+
+        lines = ["-charset", "filename=utf8"]                               # non-ascii file names
+        lines += [str(arg).replace("\n", " ") for arg in args]              # one argument per line
+        lines += ["-echo4", ready, f"-execute{self._counter}"]
+        self._process.stdin.write("\n".join(lines) + "\n")
+        self._process.stdin.flush()
+
+        return self._read_until(self._process.stdout.readline, ready), self._read_until(self._stderr.get, ready)
+
+    @staticmethod
+    def _read_until(readline, ready: str):
+        output = []
+        while True:
+            line = readline()
+            if not line:
+                raise EOFError("ExifTool closed its output")
+            if line.rstrip() == ready:
+                return "".join(output)
+            output.append(line)
@@ -1,4 +1,8 @@
+import os
 import re
+import hashlib
+import queue
+import threading
 from pathlib import Path
 from datetime import datetime
 
@@ -75,6 +79,136 @@ class FileManager:
         folder.mkdir(parents=True, exist_ok=True)
         return folder
 
+    @staticmethod
+    def _media_extensions(image_exts=None, video_exts=None, media=None):
+        media = (media or "").lower()
+
+        if image_exts is None:
+            image_exts = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff']
+        if video_exts is None:
+            video_exts = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
+
+        image_exts = set([ext.lower() for ext in image_exts]) if media in ("", "image") else set()
+        video_exts = set([ext.lower() for ext in video_exts]) if media in ("", "video") else set()
+        return image_exts, video_exts
+
+    @staticmethod
+    def _scan_directory(directory: str, image_exts: set[str], video_exts: set[str]):
+        """
+        List one directory with os.scandir, reusing the cached DirEntry type information.
+
+        Returns:
+            files (list[tuple[Path, str]]): Media files found and their media type (image / video).
+            sub_directories (list[str]): Directories to scan next.
+        """
+        files, sub_directories = [], []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            sub_directories.append(entry.path)
+                        elif entry.is_file():
+                            ext = os.path.splitext(entry.name)[1].lower()
+                            if ext in image_exts:
+                                files.append((Path(entry.path), "image"))
+                            elif ext in video_exts:
+                                files.append((Path(entry.path), "video"))
+                    except OSError:
+                        continue
+        except OSError:
+            pass    # unreadable directory, same as rglob
+        return files, sub_directories
+
+    @staticmethod
+    def iter_media_files(root_dir: Path, image_exts=None, video_exts=None, media=None, workers: int = 1):
+        """
+        Recursively scans a folder for image and video files, yielding them as they are found.
+
+        Args:
+            root_dir (Path): The root directory to scan (or a single file).
+            image_exts (list[str], optional): Allowed image file extensions.
+            video_exts (list[str], optional): Allowed video file extensions.
+            media (str): Declare what type of media should be process (image / video).
+            workers (int): Number of threads scanning sub directories in parallel (Default: 1).
+
+        Yields:
+            tuple[Path, str]: Media file path and its media type (image / video).
+        """
+        image_exts, video_exts = FileManager._media_extensions(image_exts, video_exts, media)
+
+        if root_dir.is_file():
+            ext = root_dir.suffix.lower()
+            if ext in image_exts:
+                yield root_dir, "image"
+            elif ext in video_exts:
+                yield root_dir, "video"
+            return
+
+        if workers <= 1:
+            directories = [str(root_dir)]
+            while directories:
+                files, sub_directories = FileManager._scan_directory(directories.pop(), image_exts, video_exts)
+                directories.extend(reversed(sub_directories))
+                yield from files
+            return
+
+        yield from FileManager._iter_media_files_threaded(str(root_dir), image_exts, video_exts, workers)
+
+    @staticmethod
+    def _iter_media_files_threaded(root_dir: str, image_exts: set[str], video_exts: set[str], workers: int):
+        """
+        Fan the directory scan out over several threads, results are handed over through a bounded queue.
+        """
+        done = object()
+        results = queue.Queue(maxsize=4096)
+        directories = queue.Queue()
+        stop = threading.Event()
+        lock = threading.Lock()
+        pending = 1     # directories queued but not scanned yet
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    results.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+
+        def scan():
+            nonlocal pending
+            while not stop.is_set():
+                directory = directories.get()
+                if directory is None:
+                    return
+                files, sub_directories = FileManager._scan_directory(directory, image_exts, video_exts)
+                with lock:
+                    pending += len(sub_directories)
+                for sub_directory in sub_directories:
+                    directories.put(sub_directory)
+                for file in files:
+                    put(file)
+                with lock:
+                    pending -= 1
+                    finished = pending == 0
+                if finished:
+                    put(done)
+                    for _ in range(workers):
+                        directories.put(None)
+
+        directories.put(root_dir)
+        threads = [threading.Thread(target=scan, name=f"scanner-{i}", daemon=True) for i in range(workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while (item := results.get()) is not done:
+                yield item
+        finally:
+            # consumer stopped early (or finished), release the scanners
+            stop.set()
+            for _ in range(workers):
+                directories.put(None)
+
     @staticmethod
     def collect_media_files(root_dir: Path, image_exts=None, video_exts=None, media=None):
         """
@@ -91,39 +225,16 @@ class FileManager:
             image_count (int): number of image found.
             video_count (int): number of video found.
         """
-        media = (media or "").lower()
-
-        if image_exts is None:
-            image_exts = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tiff']
-        if video_exts is None:
-            video_exts = ['.mp4', '.mov', '.avi', '.mkv', '.webm', '.flv', '.wmv', '.m4v']
-
-        image_exts = set([ext.lower() for ext in image_exts]) if media in ("", "image") else set()
-        video_exts = set([ext.lower() for ext in video_exts]) if media in ("", "video") else set()
-
         image_count = 0
         video_count = 0
         media_files = []
 
-        def found(file):
-            media_files.append(file)
-            return 1
-        
-        def filter_ext(file_path: Path):
-            nonlocal image_count, video_count
-            if not file_path.is_file():
-                return
-            ext = file_path.suffix.lower()
-            if ext in image_exts:
-                image_count += found(file_path)
-            elif ext in video_exts:
-                video_count += found(file_path)
-
-        if root_dir.is_file():
-            filter_ext(root_dir)
-        else:
-            for file_path in root_dir.rglob('*'):
-                filter_ext(file_path)
+        for file_path, media_type in FileManager.iter_media_files(root_dir, image_exts, video_exts, media):
+            media_files.append(file_path)
+            if media_type == "image":
+                image_count += 1
+            else:
+                video_count += 1
 
         return media_files, image_count, video_count
 
@@ -133,4 +244,22 @@ class FileManager:
             file.unlink()
             return True, "Success"
         except Exception as e:
-            return False, str(e)
\ No newline at end of file
+            return False, str(e)
+
+    @staticmethod
+    def hash_file(file: Path, chunk_size: int = 1024 * 1024):
+        """
+        blake2b digest of a file's content, read in chunks.
+
+        Args:
+            file (Path): File to hash.
+            chunk_size (int): Bytes read at a time.
+
+        Returns:
+            str: Hex digest.
+        """
+        digest = hashlib.blake2b(digest_size=32)
+        with open(file, "rb") as f:
+            while chunk := f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
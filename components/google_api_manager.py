@@ -1,5 +1,6 @@
 import os
 import requests
+from typing import Callable
 from magic import magic
 from pathlib import Path
 from http import HTTPStatus
@@ -8,15 +9,23 @@ from zoneinfo import ZoneInfo
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
+from requests.adapters import HTTPAdapter
+from classes.responses.google_upload_response import GoogleUploadResponse
+from components.resumable_upload import ResumableUpload
+from components.media_downloader import MediaDownloader
+from components.upload_scheduler import UploadScheduler
+from components.media_item_batcher import BATCH_CREATE_LIMIT
+from components.token_refresher import TokenRefresher
 
 
 class GoogleAPIManager:
     """
-    Manages Google API authentication and media upload/creation.
+    Manages Google API authentication and media upload/creation/download.
     Handles OAuth2 credentials, uploads media files to Google servers,
     and creates media items in Google Photos via REST API.
 
-    ##### Not possible for fetch/download anymore due to (https://issuetracker.google.com/issues/368779600?pli=1)
+    ##### Listing/downloading is limited to media items created by this app since the readonly scope
+    ##### was removed (https://issuetracker.google.com/issues/368779600?pli=1)
     """
 
     def __init__(self, 
@@ -25,7 +34,12 @@ class GoogleAPIManager:
         validate_token_url: str,
         media_upload_url: str, 
         media_create_url: str,
-        token_scopes: list[str]
+        token_scopes: list[str],
+        media_list_url: str = None,
+        pool_size: int = 10,
+        chunk_size: int = 8 * 1024 * 1024,
+        resumable_threshold: int = 50 * 1024 * 1024,
+        scheduler: UploadScheduler = None
     ):
         """
         Initializes the GoogleAPIManager with authentication and API configuration.
@@ -37,6 +51,12 @@ class GoogleAPIManager:
             media_upload_url (str): API endpoint to upload media.
             media_create_url (str): API endpoint to create media items.
             token_scopes (list[str]): List of OAuth2 scopes required for the token.
+            media_list_url (str): API endpoint to list media items (needs a readonly scope).
+            pool_size (int): Keep-alive connections kept by the shared session (one per concurrent upload).
+            chunk_size (int): Bytes per chunk of a resumable upload.
+            resumable_threshold (int): Files from this size on are uploaded with the resumable protocol.
+            scheduler (UploadScheduler): Paces the upload requests and retries 429/5xx responses,
+                                         None for an unlimited scheduler.
         """
                 
         self._client_secret_file = client_secret_file
@@ -44,13 +64,31 @@ class GoogleAPIManager:
         self._validate_token_api = validate_token_url
         self._upload_media_api = media_upload_url
         self._create_media_api = media_create_url
+        self._list_media_api = media_list_url
         self._token_scopes = token_scopes
+        self._token_refresher = TokenRefresher(lambda: self._creds, self._refresh_token, self._is_token_active)
+        self._chunk_size = chunk_size
+        self._resumable_threshold = resumable_threshold
+        self._scheduler = scheduler or UploadScheduler(requests_per_second=None)
+        self._session = self._create_session(pool_size)
         self._creds: Credentials = self._load_stored_token()
 
         if not self._creds:
             self._authorize()
 
 
+    # Shared session, connections are kept alive and reused by every request
+    @staticmethod
+    def _create_session(pool_size: int):
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self):
+        self._session.close()
+
     #region Credentials
     # Create or refresh credentials
     def _authorize(self):
@@ -102,14 +140,26 @@ class GoogleAPIManager:
 
         if self._creds and self._creds.token:
             url = self._validate_token_api.replace("{token}", self._creds.token)
-            response = requests.get(url)
+            response = self._session.get(url)
             return response.status_code == HTTPStatus.OK
         return False
     
+    # Refresh the access token, or authorize again when it can't be refreshed
+    def _refresh_token(self):
+        if self._creds and self._creds.refresh_token and sorted(self._creds.scopes or []) == sorted(self._token_scopes):
+            self._creds.refresh(Request())
+            with open(self._token_file, 'w') as token:
+                token.write(self._creds.to_json())
+        else:
+            if self._token_scopes == []:
+                raise ValueError("Token scopes must be provided.")
+            self._authorize()
+
     # Validate and generate or refresh token when necessary
     def _ensure_token_valid(self):
         """
-        Ensures the access token is valid, refreshing or reauthorizing if necessary.
+        Ensures the access token is valid, refreshing it shortly before it expires.
+        The expiry is trusted locally, no request is made while the token is fresh.
 
         Returns:
             bool: True when token is valid.
@@ -118,11 +168,17 @@ class GoogleAPIManager:
             ValueError: If token scopes are empty during authorization.
         """
 
-        if not self._is_token_active():
-            if self._token_scopes == []:
-                raise ValueError("Token scopes must be provided.")
-            self._authorize()
-        return True
+        return self._token_refresher.ensure_valid()
+
+    # Handle a 401: validate remotely and refresh, unless another thread already did
+    def _on_unauthorized(self, used_token: str):
+        """
+        Called after a request was rejected with 401 Unauthorized.
+
+        Args:
+            used_token (str): Access token the rejected request was sent with.
+        """
+        self._token_refresher.on_unauthorized(used_token)
     #endregion
 
     #region Upload
@@ -146,10 +202,34 @@ class GoogleAPIManager:
             headers.update(extra_headers)
         return headers
 
+    def _upload_headers(self):
+        # called for every chunk of a resumable upload, cheap while the token is fresh
+        self._ensure_token_valid()
+        return self._auth_headers(content_type="application/octet-stream")
+
+    # Request with fresh headers through the scheduler (429/5xx are retried there), retried once after a 401
+    def _request(self, method: str, url: str, build_headers: Callable[[], dict[str, str]], nbytes: int = 0, **kwargs):
+        used_token = None
+
+        def send():
+            nonlocal used_token
+            if hasattr(kwargs.get("data"), "seek"):
+                kwargs["data"].seek(0)   # (re)send the file from the start
+            self._ensure_token_valid()
+            used_token = self._creds.token
+            return self._session.request(method, url, headers=build_headers(), **kwargs)
+
+        for attempt in range(2):
+            response = self._scheduler.call(send, nbytes)
+            if response.status_code != HTTPStatus.UNAUTHORIZED or attempt:
+                return response
+            self._on_unauthorized(used_token)
+
     # Upload media stream to google server
     def upload_media(self, file_path: Path):
         """
         Uploads a media file to Google's upload endpoint and returns the upload token.
+        Large files use the resumable protocol (chunks, resumed after transient errors).
 
         Args:
             file_path (Path): Path to the media file to upload.
@@ -161,14 +241,25 @@ class GoogleAPIManager:
             Exception: On file read errors or if the upload fails.
         """
 
-        # Keep token alive
-        self._ensure_token_valid()
-        
         filename = file_path.name
         # mime = magic.Magic(mime=True).from_file(str(file_path))
         mime = magic.from_file(str(file_path), mime=True)
 
-        headers = self._auth_headers(
+        if file_path.stat().st_size >= self._resumable_threshold:
+            try:
+                resumable = ResumableUpload(
+                    self._session,
+                    self._upload_media_api,
+                    self._upload_headers,
+                    self._chunk_size,
+                    on_unauthorized=self._on_unauthorized,
+                    scheduler=self._scheduler
+                )
+                return resumable.upload(file_path, mime)
+            except (ConnectionError, ValueError) as e:
+                raise Exception(f"Upload token request failed for {filename}: {e}")
+
+        build_headers = lambda: self._auth_headers(
             content_type = "application/octet-stream",
             extra_headers = {
                 "X-Goog-Upload-File-Name": filename,
@@ -179,37 +270,38 @@ class GoogleAPIManager:
 
         try:
             with open(file_path, "rb") as file:
-                upload_response = requests.post(self._upload_media_api, headers=headers, data=file)
+                upload_response = self._request("POST", self._upload_media_api, build_headers, file_path.stat().st_size, data=file)
 
             if upload_response.status_code != HTTPStatus.OK:
                 raise ConnectionError(upload_response.text)
 
             return upload_response.text.strip() # Upload Token
-        except ConnectionError as e:
+        except (ConnectionError, ValueError) as e:
             raise Exception(f"Upload token request failed for {filename}: {e}")
         except Exception as e:
             raise Exception(f"Error reading file {filename}: {e}")
 
 
-    # Create media file from google server
-    def create_media_item(self, upload_token: str, filename: str, album_id: str = None):
+    # Create media items from google server (batchCreate)
+    def create_media_items(self, items: list[tuple[str, str]], album_id: str = None):
         """
-        Creates a media item on Google Photos using the given upload token.
+        Creates up to 50 media items on Google Photos in a single batchCreate call.
 
         Args:
-            upload_token (str): The token received from a successful media upload.
-            filename (str): The name of the file for logging/description purposes.
-            album_id (str, optional): Optional album ID to associate the media item with.
+            items (list[tuple[str, str]]): (upload token, filename) of every item.
+            album_id (str, optional): Optional album ID to associate the media items with.
 
         Returns:
-            str: JSON response from the media item creation request.
+            GoogleUploadResponse: Response with one result per item, matched to its item by uploadToken.
+
+        Raises:
+            ValueError: If more than 50 items are given.
+            ConnectionError: If the request fails as a whole.
         """
-        
-        # Keep token alive
-        self._ensure_token_valid()
+        if len(items) > BATCH_CREATE_LIMIT:
+            raise ValueError(f"batchCreate accepts at most {BATCH_CREATE_LIMIT} items, got {len(items)}.")
 
         optimized_date = datetime.now(ZoneInfo("Asia/Singapore")).isoformat()
-        headers = self._auth_headers()
 
         # Payload
         payload = {}
@@ -222,12 +314,70 @@ class GoogleAPIManager:
                     "uploadToken": upload_token
                 }
             }
+            for upload_token, filename in items
         ]
 
-        response = requests.post(self._create_media_api, headers=headers, json=payload)
+        response = self._request("POST", self._create_media_api, self._auth_headers, json=payload)
 
-        if response.status_code != HTTPStatus.OK:
+        # 207: some items failed, their status tells which
+        if response.status_code not in (HTTPStatus.OK, HTTPStatus.MULTI_STATUS):
             raise ConnectionError(response.text)
-        
-        return response
-    #endregion
\ No newline at end of file
+
+        return GoogleUploadResponse(**response.json())
+    #endregion
+
+    #region Download
+    def list_media_items(self, album_id: str = None, page_size: int = 100):
+        """
+        Lists media items page by page (nextPageToken), the next page is requested once the
+        previous one has been consumed.
+
+        Args:
+            album_id (str, optional): Only list the items of this album.
+            page_size (int): Items per page (at most 100).
+
+        Yields:
+            dict: Media item (id, filename, mimeType, baseUrl, mediaMetadata, ...).
+
+        Raises:
+            ValueError: If no media list url is configured.
+            ConnectionError: If a page request fails.
+        """
+        if not self._list_media_api:
+            raise ValueError("No media list url configured (google_auth.google_api.media_list_url).")
+
+        page_token = None
+        while True:
+            if album_id:
+                payload = {"albumId": album_id, "pageSize": page_size}
+                if page_token:
+                    payload["pageToken"] = page_token
+                response = self._request("POST", f"{self._list_media_api}:search", self._auth_headers, json=payload)
+            else:
+                params = {"pageSize": page_size}
+                if page_token:
+                    params["pageToken"] = page_token
+                response = self._request("GET", self._list_media_api, self._auth_headers, params=params)
+
+            if response.status_code != HTTPStatus.OK:
+                raise ConnectionError(f"{response.status_code}: {response.text}")
+
+            page = response.json()
+            yield from page.get("mediaItems", [])
+            page_token = page.get("nextPageToken")
+            if not page_token:
+                return
+
+    def download_media(self, item: dict, destination: Path):
+        """
+        Streams a media item (from list_media_items) to destination over the shared session.
+
+        Returns:
+            int: Bytes written.
+
+        Raises:
+            ConnectionError: If the download fails.
+        """
+        downloader = MediaDownloader(self._session, self._chunk_size)
+        return downloader.download(downloader.download_url(item), destination)
+    #endregion
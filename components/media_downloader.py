@@ -0,0 +1,57 @@
+import os
+import requests
+from pathlib import Path
+from http import HTTPStatus
+
+
+class MediaDownloader:
+    """
+    Streams Google Photos media items to disk over a shared session.
+
+    The body is written chunk by chunk (never held in memory) to <destination>.part, which is
+    renamed once complete, so an interrupted download never looks finished.
+    """
+
+    def __init__(self, session: requests.Session, chunk_size: int = 1024 * 1024, timeout: float = 60):
+        """
+        Args:
+            session (requests.Session): Session used for every download.
+            chunk_size (int): Bytes held in memory at once.
+            timeout (float): Seconds to wait for the connection or the next chunk.
+        """
+        self._session = session
+        self._chunk_size: int = chunk_size
+        self._timeout: float = timeout
+
+    @staticmethod
+    def download_url(item: dict):
+        # "=d" keeps the image metadata (except location), "=dv" is the video file
+        return item["baseUrl"] + ("=dv" if "video" in item.get("mediaMetadata", {}) else "=d")
+
+    def download(self, url: str, destination: Path):
+        """
+        Download url to destination.
+
+        Returns:
+            int: Bytes written.
+
+        Raises:
+            ConnectionError: If the download fails.
+        """
+        part = destination.with_name(destination.name + ".part")
+        written = 0
+        try:
+            with self._session.get(url, stream=True, timeout=self._timeout) as response:
+                if response.status_code != HTTPStatus.OK:
+                    raise ConnectionError(f"{response.status_code}: {response.reason}")
+                with open(part, "wb") as file:
+                    for chunk in response.iter_content(self._chunk_size):
+                        file.write(chunk)
+                        written += len(chunk)
+            os.replace(part, destination)
+            return written
+        except requests.RequestException as e:
+            raise ConnectionError(str(e))
+        finally:
+            if part.exists():
+                part.unlink()
@@ -0,0 +1,74 @@
+import threading
+from pathlib import Path
+from typing import Callable
+from classes.responses.google_upload_response import GoogleUploadResponse, NewMediaItemResult
+
+# Maximum newMediaItems per batchCreate call
+BATCH_CREATE_LIMIT = 50
+
+
+class MediaItemBatcher:
+    """
+    Collects uploaded files and creates their media items with one batchCreate call per full batch.
+
+    Results are matched back to their file by uploadToken, so a partial (207) response only fails
+    the items it reports as failed. When the call fails as a whole, every file of the batch fails
+    with that error.
+    """
+
+    def __init__(self,
+        create_media_items: Callable[[list[tuple[str, str]]], GoogleUploadResponse],
+        on_created: Callable[[Path, str, NewMediaItemResult], None],
+        on_failed: Callable[[Path, str, str], None],
+        batch_size: int = BATCH_CREATE_LIMIT
+    ):
+        """
+        Args:
+            create_media_items (Callable): Creates the media items of (upload token, filename) pairs.
+            on_created (Callable[[Path, str, NewMediaItemResult], None]): Told the file, guid and result of every created item.
+            on_failed (Callable[[Path, str, str], None]): Told the file, guid and reason of every failed item.
+            batch_size (int): Items per batchCreate call (at most 50).
+        """
+        self._create_media_items = create_media_items
+        self._on_created = on_created
+        self._on_failed = on_failed
+        self._batch_size: int = max(1, min(batch_size, BATCH_CREATE_LIMIT))
+        self._batch: list[tuple[Path, str, str]] = []   # (media, guid, upload token)
+        self._lock = threading.Lock()
+
+    def add(self, media: Path, guid: str, upload_token: str):
+        """
+        Queue an uploaded file, the batch is created by the caller that fills it.
+        """
+        with self._lock:
+            self._batch.append((media, guid, upload_token))
+            if len(self._batch) < self._batch_size:
+                return
+            items, self._batch = self._batch, []
+        self._create(items)
+
+    def flush(self):
+        """
+        Create the media items of the last, partial batch.
+        """
+        with self._lock:
+            items, self._batch = self._batch, []
+        if items:
+            self._create(items)
+
+    def _create(self, items: list[tuple[Path, str, str]]):
+        results = {}
+        error = None
+        try:
+            response = self._create_media_items([(token, media.name) for media, _, token in items])
+            results = {result.uploadToken: result for result in response.newMediaItemResults or []}
+        except Exception as e:
+            error = e
+
+        for media, guid, token in items:
+            result = results.get(token)
+            if result and result.is_success():
+                self._on_created(media, guid, result)
+            else:
+                reason = result.status.message if result else str(error or "No result returned for the upload token.")
+                self._on_failed(media, guid, reason)
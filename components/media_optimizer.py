@@ -1,18 +1,49 @@
 import subprocess
 import os
-import re
 import json
+import atexit
+import shutil
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import contextmanager
 from pathlib import Path
 from tqdm import tqdm
+from classes.job_context import JobContext
+from classes.media_probe import MediaProbe
+from classes.raw_frame import RawFrame
+from classes.encode_progress import EncodeProgress
+from classes.rendition import Rendition
+from components.exiftool_process import ExifToolProcess
+from helper.ffmpeg_progress import FFmpegProgressParser
+from typing import Callable
+
+# Lines of ffmpeg stderr kept for error reports
+STDERR_TAIL_LINES = 50
+
+class EncodeAbortedError(RuntimeError):
+    """
+    Raised when an encode is stopped early because its output is on track to outgrow the input.
+    """
+    def __init__(self, message: str, projected_size: int):
+        super().__init__(message)
+        self.projected_size = projected_size
 
 class MediaOptimizer:
-    def __init__(self, ffmpeg="ffmpeg", ffprobe="ffprobe", exiftool="exiftool", xmp_config=None):
+    def __init__(self, ffmpeg="ffmpeg", ffprobe="ffprobe", exiftool="exiftool", xmp_config=None, exiftool_daemon=True, stream_groups=False):
         self._ffmpeg:str = ffmpeg
         self._ffprobe:str = ffprobe
         self._exiftool:str = exiftool
         self._xmp_config:str = xmp_config
-        self._subprocess:subprocess
-        self._pbar:tqdm
+        self._exiftool_daemon:bool = exiftool_daemon
+        self._stream_groups:bool = stream_groups   # ffprobe 7.0+ describes HEIF tile grids as stream groups
+        self._exiftool_processes:list[ExifToolProcess] = []
+        self._exiftool_idle:list[ExifToolProcess] = []
+        self._exiftool_lock = threading.Lock()
+        self._probe_cache:OrderedDict[tuple, MediaProbe] = OrderedDict()
+        self._probe_cache_size:int = 4096
+        self._probe_lock = threading.Lock()
+        atexit.register(self.close)
 
     #region Loader
     def load_executable(self, ffmpeg=None, ffprobe=None, exiftool=None):
@@ -22,33 +53,253 @@ class MediaOptimizer:
             self._ffprobe = ffprobe
         if exiftool:
             self._exiftool = exiftool
+            self.close()
 
     def load_xmp_config(self, xmp_config):
         self._xmp_config = xmp_config
+        self.close()
+
+    def close(self):
+        """
+        Stop every persistent exiftool process, they are restarted on demand.
+        """
+        with self._exiftool_lock:
+            processes, self._exiftool_processes, self._exiftool_idle = self._exiftool_processes, [], []
+        for process in processes:
+            process.close()
     #endregion
 
-    #region Metadata
-    def get_mime_type(self, filepath: Path):
+    #region ExifTool
+    @contextmanager
+    def _exiftool_process(self):
+        """
+        Borrow an idle persistent exiftool process, one is started per concurrent caller (worker).
+        """
+        with self._exiftool_lock:
+            if self._exiftool_idle:
+                process = self._exiftool_idle.pop()
+            else:
+                process = ExifToolProcess(self._exiftool, self._xmp_config)
+                self._exiftool_processes.append(process)
+        try:
+            yield process
+        finally:
+            with self._exiftool_lock:
+                if process in self._exiftool_processes:
+                    self._exiftool_idle.append(process)
+
+    def _run_exiftool(self, args: list[str], xmp_config: str = None):
+        """
+        Run an exiftool command, through the persistent process when possible.
+
+        Args:
+            args (list[str]): exiftool arguments (without the executable).
+            xmp_config (str): Config file required by the command, None when not needed.
+
+        Returns:
+            str: stdout of the command.
+
+        Raises:
+            RuntimeError: If exiftool reports an error.
+        """
+        if self._exiftool_daemon and xmp_config in (None, self._xmp_config):
+            with self._exiftool_process() as exiftool:
+                stdout, _ = exiftool.execute(*args)
+            return stdout
+
         cmd = [
             self._exiftool,
-            "-MIMEType", str(filepath)
+            *(["-config", xmp_config] if xmp_config else []),
+            *[str(arg) for arg in args]
         ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ExifTool failed: {result.stderr.strip()}")
+        return result.stdout
+    #endregion
 
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True
-        )
+    #region Subprocess
+    def _popen(self, cmd: list, job: JobContext = None, **kwargs):
+        """
+        Start a subprocess and register it to the job so it can be cancelled.
+        """
+        process = subprocess.Popen(cmd, **kwargs)
+        if job:
+            job.attach_subprocess(process)
+        return process
+
+    @staticmethod
+    def _thread_args(codec: str, threads: int = None):
+        """
+        Limit ffmpeg (and x265's own thread pool) to the worker's share of the cpu.
+        """
+        if not threads:
+            return []
+        args = ["-threads", str(threads)]
+        if codec == "libx265":
+            args += ["-x265-params", f"pools={threads}"]
+        return args
+    #endregion
+
+    #region Probe
+    def probe(self, filepath: Path, mime: str = None):
+        """
+        Inspect a media file with a single ffprobe call.
+
+        Results are memoized by (device, inode, size, mtime), so every stage of the
+        pipeline can ask for the same file without spawning ffprobe again.
+
+        Args:
+            filepath (Path): Media file to inspect.
+            mime (str, optional): MIME type if already known, used to classify the media.
+
+        Returns:
+            MediaProbe: MIME, kind, frame count, duration, resolution, codec and bitrate.
+
+        Raises:
+            RuntimeError: If ffprobe can't read the file or it has no visual stream.
+        """
+        stat = os.stat(filepath)
+        key = self._probe_key(filepath, stat)
+        probe = self._cached_probe(key, mime)
+        if probe:
+            return probe
 
+        result = subprocess.run(self._probe_command(filepath), capture_output=True, text=True, encoding="utf-8", errors="replace")
         if result.returncode != 0:
-            raise RuntimeError(f"ExifTool failed: {result.stderr.strip()}")
-        
-        for line in result.stdout.splitlines():
+            raise RuntimeError(f"FFprobe failed: {result.stderr.strip()}")
+
+        probe = self._parse_probe(filepath, stat.st_size, mime, json.loads(result.stdout or "{}"))
+        return self._store_probe(key, probe)
+
+    def _probe_command(self, filepath: Path):
+        return [
+            self._ffprobe,
+            "-v", "error",
+            "-show_format",
+            "-show_streams",
+            *(["-show_stream_groups"] if self._stream_groups else []),
+            "-of", "json",
+            str(filepath)
+        ]
+
+    @staticmethod
+    def _probe_key(filepath: Path, stat: os.stat_result):
+        # inode is 0 on filesystems without one, fall back to the path
+        return (stat.st_dev if stat.st_ino else str(filepath), stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _cached_probe(self, key: tuple, mime: str = None):
+        with self._probe_lock:
+            probe = self._probe_cache.get(key)
+            if probe:
+                self._probe_cache.move_to_end(key)
+        if probe and mime and probe.mime != mime:
+            probe = probe.model_copy(update={"mime": mime, "kind": self._media_kind(mime, probe.format_name)})
+        return probe
+
+    def _store_probe(self, key: tuple, probe: MediaProbe):
+        with self._probe_lock:
+            self._probe_cache[key] = probe
+            if len(self._probe_cache) > self._probe_cache_size:
+                self._probe_cache.popitem(last=False)
+        return probe
+
+    @staticmethod
+    def _media_kind(mime: str, format_name: str):
+        if mime:
+            kind = mime.split("/")[0]
+            return kind if kind in ("image", "video") else "other"
+        # ffprobe reads still images through the image2 / *_pipe demuxers
+        if format_name and (format_name == "image2" or format_name.endswith("_pipe")):
+            return "image"
+        return "video"
+
+    @staticmethod
+    def _tile_grid(data: dict, stream: dict):
+        """
+        (width, height) of the tile grid the stream belongs to, None when ffprobe reported no grid.
+        """
+        for group in data.get("stream_groups", []):
+            if "tile grid" not in str(group.get("type", "")).lower():
+                continue
+            indexes = {member.get("index") for member in group.get("streams", [])}
+            if indexes and stream.get("index") not in indexes:
+                continue
+            for component in group.get("components", []):
+                if component.get("width") and component.get("height"):
+                    return int(component["width"]), int(component["height"])
+        return None
+
+    @staticmethod
+    def _parse_probe(filepath: Path, size: int, mime: str, data: dict):
+        """
+        Build a MediaProbe from ffprobe's json output.
+        """
+        def to_number(value, cast):
+            try:
+                return cast(value)
+            except (TypeError, ValueError):
+                return None
+
+        def to_rate(value):
+            try:
+                num, den = (float(x) for x in str(value).split("/"))
+                return num / den if den else None
+            except ValueError:
+                return None
+
+        streams = [stream for stream in data.get("streams", []) if stream.get("codec_type") == "video"]
+        # Cover art is also a video stream, prefer the real one
+        streams.sort(key=lambda stream: stream.get("disposition", {}).get("attached_pic", 0))
+        if not streams:
+            raise RuntimeError(f"No image or video stream found: {filepath}")
+        stream = streams[0]
+        media_format = data.get("format", {})
+
+        format_name = media_format.get("format_name")
+        kind = MediaOptimizer._media_kind(mime, format_name)
+        width, height = to_number(stream.get("width"), int), to_number(stream.get("height"), int)
+        # HEIF tile grid: every tile is a video stream, the picture size is the grid's
+        grid = MediaOptimizer._tile_grid(data, stream)
+        if grid:
+            width, height = grid
+        elif kind == "image" and len(streams) > 1:
+            width = height = None   # tiles without a grid description, the caller reads the size itself
+        duration = to_number(media_format.get("duration"), float) or to_number(stream.get("duration"), float)
+        fps = to_rate(stream.get("avg_frame_rate")) or to_rate(stream.get("r_frame_rate"))
+        frames = to_number(stream.get("nb_frames"), int)
+        if frames is None:
+            frames = round(duration * fps) if duration and fps else 1
+
+        return MediaProbe(
+            path=str(filepath),
+            mime=mime,
+            kind=kind,
+            size=size,
+            format_name=format_name,
+            codec=stream.get("codec_name"),
+            width=width,
+            height=height,
+            frames=max(1, frames),
+            fps=fps,
+            duration=duration,
+            bit_rate=to_number(media_format.get("bit_rate"), int) or to_number(stream.get("bit_rate"), int)
+        )
+    #endregion
+
+    #region Metadata
+    def get_mime_type(self, filepath: Path):
+        stdout = self._run_exiftool(["-MIMEType", str(filepath)])
+        return self._parse_mime_type(stdout)
+
+    @staticmethod
+    def _parse_mime_type(stdout: str):
+        for line in stdout.splitlines():
             if line.startswith("MIME Type"):
                 return line.split(":", 1)[1].strip()
         return None
     
-    def ffmpeg_set_media_metadata(self, media: Path, output_path, metadatas: dict[str, str]):
+    def ffmpeg_set_media_metadata(self, media: Path, output_path, metadatas: dict[str, str], job: JobContext = None):
         if metadatas:
             cmd = [
                 self._ffmpeg,
@@ -56,8 +307,7 @@ class MediaOptimizer:
                 "-c", "copy"
             ]
 
-            for tag, value in metadatas.items():
-                cmd.extend(['-metadata', f"{tag}=\"{value}\""])  #-metadata Optimizer_Toolkit="Media Optimizer"
+            cmd.extend(self._ffmpeg_metadata_args(metadatas))
 
             cmd.extend([
                 output_path
@@ -65,19 +315,22 @@ class MediaOptimizer:
 
             print(cmd)
 
-            process = subprocess.Popen(cmd)
-            self._subprocess = process
+            process = self._popen(cmd, job)
             process.wait()
 
             return True if process.returncode == 0 else False
         return None
     
+    @staticmethod
+    def _ffmpeg_metadata_args(metadatas: dict[str, str]):
+        args = []
+        for tag, value in (metadatas or {}).items():
+            args.extend(["-metadata", f"{tag}={value}"])  #-metadata Optimizer_Toolkit=Media Optimizer (no shell, no quoting)
+        return args
+
     def exiftool_set_media_metadata(self, media: Path, namespace: str, metadatas: dict[str, str], xmp_config: bool=False):
         if metadatas:
-            cmd = [
-                self._exiftool,
-                *(["-config", self._xmp_config] if xmp_config else [])
-            ]
+            cmd = []
             
             for tag, value in metadatas.items():
                 cmd.append(f"-XMP-{namespace}:{tag}={value}")  #-XMP-mediaoptimizer:Optimizer_Toolkit=Media Optimizer
@@ -87,19 +340,16 @@ class MediaOptimizer:
                 str(media)
             ])
 
-            result = subprocess.run(cmd, check=True)
-            return result
+            return self._run_exiftool(cmd, self._xmp_config if xmp_config else None)
         return None
     
     def read_custom_xmp_tag(self, file_path: str, namespace:str, tag: str, xmp_config: str=None):
         cmd = [
-            self._exiftool,
-            "-config", xmp_config or self._xmp_config,
             f"-XMP-{namespace}:{tag}",
-            "-j", file_path
+            "-j", str(file_path)
         ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        data = json.loads(result.stdout)[0]
+        stdout = self._run_exiftool(cmd, xmp_config or self._xmp_config)
+        data = json.loads(stdout)[0]
         
         return data.get(tag)
 
@@ -118,65 +368,129 @@ class MediaOptimizer:
         """
 
         cmd = [
-            self._exiftool,              # Path to exiftool binary (e.g., "/usr/bin/exiftool")
-            "-TagsFromFile", from_file,  # Copy all metadata from input file
-            "-all:all",                  # Copy all groups of metadata (EXIF, IPTC, XMP, etc.)
-            "-overwrite_original",       # Overwrite output image's original metadata
-            to_file                      # File to receive the metadata
+            "-TagsFromFile", str(from_file),  # Copy all metadata from input file
+            "-all:all",                       # Copy all groups of metadata (EXIF, IPTC, XMP, etc.)
+            "-overwrite_original",            # Overwrite output image's original metadata
+            str(to_file)                      # File to receive the metadata
         ]
-        subprocess.run(cmd, check=True)
+        self._run_exiftool(cmd)
+
+    def write_metadata(self, from_file, to_file, namespace: str, metadatas: dict[str, str]):
+        """
+        Copies all metadata from the source file and writes the custom XMP tags in one exiftool run,
+        so the output file is rewritten only once.
+
+        Args:
+            from_file (str): Path to the source media containing the desired metadata.
+            to_file (str): Path to the media that should receive the metadata.
+            namespace (str): Custom XMP namespace (registered in the xmp config).
+            metadatas (dict[str, str]): Custom XMP tags to write.
+        """
+
+        self._run_exiftool(self._write_metadata_args(from_file, to_file, namespace, metadatas), self._xmp_config)
+
+    @staticmethod
+    def _write_metadata_args(from_file, to_file, namespace: str, metadatas: dict[str, str]):
+        cmd = [
+            "-TagsFromFile", str(from_file),  # Copy all metadata from input file
+            "-all:all",                       # Copy all groups of metadata (EXIF, IPTC, XMP, etc.)
+            f"--XMP-{namespace}:all",         # except previous optimizer tags, they are rewritten below
+        ]
+        for tag, value in metadatas.items():
+            cmd.append(f"-XMP-{namespace}:{tag}={value}")
+        cmd += [
+            "-overwrite_original",            # Overwrite output media's original metadata
+            str(to_file)                      # File to receive the metadata
+        ]
+        return cmd
     #endregion
     
     #region Optimize Image
-    def optimize_image(self, input_path: str, output_path:str, qvb: int = 4, crf: int = 30, codec="libaom-av1", multiple_frame = False):
+    def _image_command(self, input_path: str, output_path: str, qvb: int, crf: int, codec: str, multiple_frame: bool, threads: int = None, raw_frame: RawFrame = None):
         """
-        Converts an image to optimized JPEG using FFmpeg.
-        
-        Args:
-            input_path (str): Path to the input image.
-            mime_type (str): Image mimetype.
-            output_path (str, optional): Path to save the JPEG. Defaults to input file name with .jpg.
-            qvb (int): Quality for Variable Bitrate, simpler codecs quality (1=best, 31=worst). Lower is better, 4 is reasonable.
-            crf (int): Constant Rate Factor, modern codecs quality (0=best, 63=worst). Lower is better, 30 is reasonable
-            codec (str): can study ffmpeg codec list to choose codec of your liking. Suggest mjpeg or libaom-av1 for smallest file size (Default: libaom-av1)
-            metadata (bool): Keep metadata (True to keep previous image's metadata, False to let it be).
-            multiple_frame (bool): Indicator for whether the image has multiple frames like (.gif) required to loop the frame or just single frames
+        Build the ffmpeg command used by optimize_image (shared with the async engine).
         """
+        if raw_frame:
+            source = [
+                "-f", "rawvideo",                 # Uncompressed pixels from stdin
+                "-pix_fmt", raw_frame.pix_fmt,
+                "-s", raw_frame.size,
+                "-i", "pipe:0",
+            ]
+        else:
+            source = ["-i", input_path]  # Input file
 
         cmd = [
             self._ffmpeg,
             "-y",                    # Overwrite output without asking
-            "-i", input_path,        # Input file
+            *source,
             "-map_metadata", "0",    # Keep original metadata
+            *self._image_codec_args(codec, qvb, crf, multiple_frame),
+        ]
+
+        cmd += self._thread_args(codec, threads)
+
+        cmd += [output_path]         # Output file
+        return cmd
+
+    @staticmethod
+    def _image_codec_args(codec: str, qvb: int, crf: int, multiple_frame: bool):
+        """
+        Encoder and quality arguments of one image output.
+        """
+        args = [
             "-c:v", codec,           # Output format
             "-update", "1",          # overwrite the output file if it exists (used for image outputs)
         ]
 
         modern_codecs = {"libaom-av1", "libsvtav1", "libx264", "libx265"}
         if codec in modern_codecs:
-            cmd += [
+            args += [
                 "-crf", str(crf),         # Constant Rate Factor (quality)
                 "-still-picture", "1",    # AVIF required standards compliance
             ]    
         else:
-            cmd += [
+            args += [
                 "-q:v", str(qvb),         # Quality for Variable Bitrate (quality)
                 "-frames:v", "1",         # Force format
             ]
 
         if multiple_frame:
-            cmd += ["-plays", "0",]       # loops infinitely
+            args += ["-plays", "0",]      # loops infinitely
+        return args
 
-        cmd += [output_path]         # Output file
+    def optimize_image(self, input_path: str, output_path:str, qvb: int = 4, crf: int = 30, codec="libaom-av1", multiple_frame = False, threads: int = None, job: JobContext = None, raw_frame: RawFrame = None):
+        """
+        Converts an image to optimized JPEG using FFmpeg.
+        
+        Args:
+            input_path (str): Path to the input image.
+            mime_type (str): Image mimetype.
+            output_path (str, optional): Path to save the JPEG. Defaults to input file name with .jpg.
+            qvb (int): Quality for Variable Bitrate, simpler codecs quality (1=best, 31=worst). Lower is better, 4 is reasonable.
+            crf (int): Constant Rate Factor, modern codecs quality (0=best, 63=worst). Lower is better, 30 is reasonable
+            codec (str): can study ffmpeg codec list to choose codec of your liking. Suggest mjpeg or libaom-av1 for smallest file size (Default: libaom-av1)
+            metadata (bool): Keep metadata (True to keep previous image's metadata, False to let it be).
+            multiple_frame (bool): Indicator for whether the image has multiple frames like (.gif) required to loop the frame or just single frames
+            threads (int): ffmpeg thread count, None to let ffmpeg decide.
+            job (JobContext): Job that owns the ffmpeg subprocess.
+            raw_frame (RawFrame): Already decoded pixels, piped to ffmpeg's stdin instead of reading input_path
+                                  (input_path is then only used for the modified time).
+        """
+
+        cmd = self._image_command(input_path, output_path, qvb, crf, codec, multiple_frame, threads, raw_frame)
 
         mod_time = os.path.getmtime(input_path)
 
-        process = subprocess.Popen(cmd)
-        self._subprocess = process
-        process.wait()
+        if raw_frame:
+            process = self._popen(cmd, job, stdin=subprocess.PIPE)
+            process.communicate(raw_frame.data)
+        else:
+            process = self._popen(cmd, job)
+            process.wait()
 
         if process.returncode != 0:
-            raise RuntimeError(process.stderr.read().decode())
+            raise RuntimeError(f"FFmpeg failed with exit code {process.returncode}")
 
         # subprocess.run(cmd, check=True)
         os.utime(output_path, (mod_time, mod_time))
@@ -185,74 +499,24 @@ class MediaOptimizer:
 
     # Get progress bar
     def get_video_duration(self, filepath):
-        """Get video duration in seconds using ffprobe."""
-        cmd = [
-                self._ffprobe, "-v", "error", "-show_entries",
-                "format=duration", "-of",
-                "default=noprint_wrappers=1:nokey=1", filepath
-        ]
-        # print(cmd)
-        result = subprocess.run(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
-        return float(result.stdout.strip())
+        """Get video duration in seconds using ffprobe (shared with probe())."""
+        return self.probe(filepath).duration or 0.0
     #endregion
 
     #region Optimize Video
-    def optimize_video(self, 
-        input_path: str,
-        output_path: str,
-        crf: int = None,
-        preset: str = "slow",
-        codec: str = "libx265",
-        audio_bitrate: str = "128k",
-        scale_resolution: str = None,
-        streaming: bool = False,
-        metadata: bool = True
-    ):
+    def _video_command(self, input_path: str, output_path: Path, crf: int, preset: str, codec: str, scale_resolution: str = None, streaming: bool = False, threads: int = None, metadatas: dict[str, str] = None):
         """
-        Reduce video file size using FFmpeg while keeping quality acceptable.
-
-        Args:
-            input_path (str): Full path to the input video file.
-            output_path (str): Path to save optimized video.
-            crf (int): Constant Rate Factor Profile, Default value will based on codex ('libx264' = 23, 'libx265' = 26). 
-                       CRF (lower = better quality, bigger size). Recommended: 18–28.
-            preset (str): Encoding speed vs compression efficiency.
-                        Options: ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow.
-            codex (str): Encoding format. Recommend 'libx264' for compatibility, but if required smaller file size
-                        highly recommend 'libx265' but beware of compatibility, old device will but be able to open it.
-                        Default value: 'libx265'.
-            audio_bitrate (str): Bitrate for audio stream. e.g., '96k', '128k'. # Due to quality degraded too much, will temporary disabled this input
-            scale_resolution (str): Optional. Resize video using format like '1280:720'. Set to None to keep original.
-            metadata (bool): Keep metadata (True to keep previous video's metadata, False to let it be).
-
-        Returns:
-            str: Path to the optimized video.
-        
-        Raises:
-            FileNotFoundError: If input file is missing.
-            RuntimeError: If FFmpeg fails.
+        Build the ffmpeg command used by optimize_video (shared with the async engine).
         """
-
         # CONSTANT
         CRF_264 = 23
         CRF_265 = 26
 
-        if not os.path.isfile(input_path):
-            raise FileNotFoundError(f"Input file not found: {input_path}")
-
         if crf is None:
             crf = CRF_265 if codec == 'libx265' else CRF_264
         elif not (0 <= crf <= 51):
             raise ValueError("CRF must be an integer between 0 and 51.")
 
-        # Get video duration for progress bar
-        total_duration = self.get_video_duration(input_path)
-
         # Base ffmpeg command
         cmd = [
             self._ffmpeg,
@@ -285,33 +549,122 @@ class MediaOptimizer:
             cmd += [
                 "-movflags", "+faststart",  # Optimize for streaming
             ]
+
+        # Worker's share of the cpu
+        cmd += self._thread_args(codec, threads)
+
+        # Tags written while encoding, saves a remux afterwards
+        cmd += self._ffmpeg_metadata_args(metadatas)
         
         # Set output location
         cmd.append(output_path)
+        return cmd
+
+    def optimize_video(self, 
+        input_path: str,
+        output_path: str,
+        crf: int = None,
+        preset: str = "slow",
+        codec: str = "libx265",
+        audio_bitrate: str = "128k",
+        scale_resolution: str = None,
+        streaming: bool = False,
+        metadata: bool = True,
+        threads: int = None,
+        job: JobContext = None,
+        metadatas: dict[str, str] = None,
+        duration: float = None,
+        abort_ratio: float = None,
+        abort_min_progress: float = 0.1,
+        progress_callback: Callable[[EncodeProgress], None] = None
+    ):
+        """
+        Reduce video file size using FFmpeg while keeping quality acceptable.
+
+        Args:
+            input_path (str): Full path to the input video file.
+            output_path (str): Path to save optimized video.
+            crf (int): Constant Rate Factor Profile, Default value will based on codex ('libx264' = 23, 'libx265' = 26). 
+                       CRF (lower = better quality, bigger size). Recommended: 18–28.
+            preset (str): Encoding speed vs compression efficiency.
+                        Options: ultrafast, superfast, veryfast, faster, fast, medium, slow, slower, veryslow.
+            codex (str): Encoding format. Recommend 'libx264' for compatibility, but if required smaller file size
+                        highly recommend 'libx265' but beware of compatibility, old device will but be able to open it.
+                        Default value: 'libx265'.
+            audio_bitrate (str): Bitrate for audio stream. e.g., '96k', '128k'. # Due to quality degraded too much, will temporary disabled this input
+            scale_resolution (str): Optional. Resize video using format like '1280:720'. Set to None to keep original.
+            metadata (bool): Keep metadata (True to keep previous video's metadata, False to let it be).
+            threads (int): ffmpeg thread count, None to let ffmpeg decide.
+            job (JobContext): Job that owns the ffmpeg subprocess and progress bar.
+            metadatas (dict[str, str]): Extra global tags written by ffmpeg (for containers exiftool can't edit).
+            duration (float): Input duration in seconds if already probed, used by the progress bar.
+            abort_ratio (float): Stop the encode once the projected output size exceeds this fraction of the
+                                 input size (e.g. 1.0). None to always encode the whole file.
+            abort_min_progress (float): Fraction of the duration to encode before trusting the projection.
+            progress_callback (Callable[[EncodeProgress], None]): Called with every progress event
+                                                                 (fps, speed, output size, ETA).
+
+        Returns:
+            str: Path to the optimized video.
+        
+        Raises:
+            FileNotFoundError: If input file is missing.
+            RuntimeError: If FFmpeg fails.
+            EncodeAbortedError: If the projected output size exceeds abort_ratio.
+        """
+
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        cmd = self._video_command(input_path, output_path, crf, preset, codec, scale_resolution, streaming, threads, metadatas)
+
+        # Get video duration for progress bar
+        total_duration = duration if duration is not None else self.get_video_duration(input_path)
+
+        # Progress as key=value blocks on stdout, stderr only carries warnings and errors
+        cmd[1:1] = self._progress_args()
+        size_limit = os.path.getsize(input_path) * abort_ratio if abort_ratio else None
+        projected_size = None
 
         print(cmd)
 
         # Run FFmpeg and parse progress
-        self._subprocess = process = subprocess.Popen(
+        process = self._popen(
             cmd,
+            job,
             stderr=subprocess.PIPE,
-            stdout=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
             universal_newlines=True,
             bufsize=1
         )
+        stderr_tail, stderr_thread = self._stderr_ring(process)
 
-        time_pattern = re.compile(r"time=(\d+):(\d+):(\d+).(\d+)")
-        self._pbar = pbar = tqdm(total=total_duration, unit="s", desc="Encoding")
+        pbar = tqdm(total=total_duration, unit="s", desc="Encoding")
+        if job:
+            job.attach_pbar(pbar)
 
-        for line in process.stderr:
-            match = time_pattern.search(line)   
-            if match:
-                h, m, s, ms = map(int, match.groups())
-                current_time = h * 3600 + m * 60 + s + ms / 100.0
-                pbar.n = min(current_time, total_duration)
-                pbar.refresh()
+        parser = FFmpegProgressParser(total_duration)
+        for line in process.stdout:
+            event = parser.feed(line)
+            if event is None:
+                continue
+            self._update_pbar(pbar, event)
+            if progress_callback:
+                progress_callback(event)
+            if size_limit and total_duration and event.out_time >= total_duration * abort_min_progress:
+                if event.projected_size > size_limit:
+                    projected_size = event.projected_size
+                    break
+
+        if projected_size is not None:
+            # Output is on track to be larger than allowed, stop wasting encode time
+            process.terminate()
+            process.wait()
+            pbar.close()
+            raise EncodeAbortedError(f"Projected size {projected_size} exceeds {size_limit:.0f} bytes", projected_size)
 
         process.wait()
+        stderr_thread.join()
         pbar.n = total_duration
         pbar.refresh()
         pbar.close()
@@ -319,38 +672,437 @@ class MediaOptimizer:
         print(process)
         
         if process.returncode != 0:
-            raise RuntimeError(f"FFmpeg failed:\n{line}")
+            raise RuntimeError(f"FFmpeg failed:\n{''.join(stderr_tail)}")
 
         return output_path
     #endregion
 
-    #region Get Version
-    @property
-    def get_exiftool_version(self):
+    #region Optimize Video (Segmented)
+    def _split_command(self, input_path: str, work_dir: Path, segment_time: float = 30):
+        """
+        Build the ffmpeg command used by split_video.
+        """
+        return [
+            self._ffmpeg,
+            "-y",
+            "-v", "error",
+            "-i", input_path,
+            "-map", "0:v:0",                 # video only, audio and the rest are remuxed from the original
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_time", str(segment_time),
+            "-reset_timestamps", "1",
+            work_dir / "source_%05d.mkv"
+        ]
+
+    def split_video(self, input_path: str, work_dir: Path, segment_time: float = 30, job: JobContext = None):
+        """
+        Split the first video stream into segments at keyframes, with stream copy (no re-encode).
+
+        Args:
+            input_path (str): Full path to the input video file.
+            work_dir (Path): Folder receiving the segments.
+            segment_time (float): Target segment length in seconds, cuts land on the next keyframe.
+            job (JobContext): Job that owns the ffmpeg subprocess.
+
+        Returns:
+            list[Path]: Segment files in playback order.
+        """
+        cmd = self._split_command(input_path, work_dir, segment_time)
+        process = self._popen(cmd, job, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to split video:\n{stderr}")
+        return sorted(work_dir.glob("source_*.mkv"))
+
+    def concat_video(self, segments: list[Path], input_path: str, output_path: Path, work_dir: Path, streaming: bool = False, job: JobContext = None, metadatas: dict[str, str] = None):
+        """
+        Join encoded segments with the concat demuxer and remux every other stream and the metadata
+        from the original file.
+        """
+        list_file = work_dir / "segments.txt"
+        with open(list_file, "w", encoding="utf-8") as file:
+            for segment in segments:
+                escaped = segment.absolute().as_posix().replace("'", "'\\''")
+                file.write(f"file '{escaped}'\n")
+
+        cmd = self._concat_command(list_file, input_path, output_path, streaming, metadatas)
+        process = self._popen(cmd, job, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, universal_newlines=True)
+        _, stderr = process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError(f"FFmpeg failed to join segments:\n{stderr}")
+        return output_path
+
+    def _concat_command(self, list_file: Path, input_path: str, output_path: Path, streaming: bool = False, metadatas: dict[str, str] = None):
+        """
+        Build the ffmpeg command used by concat_video.
+        """
+        cmd = [
+            self._ffmpeg,
+            "-y",
+            "-v", "error",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", list_file,
+            "-i", input_path,
+            "-map", "0:v:0",                          # encoded video
+            "-map", "1",                              # everything else from the original...
+            "-map", "-1:v:0",                         # ...except its original video stream
+            "-c", "copy",
+            "-map_metadata", "1",                     # Keep original metadata
+            "-map_metadata:s:v:0", "1:s:v:0",
+            "-map_chapters", "1",
+        ]
+        if output_path.suffix == ".mp4":
+            cmd += ["-dn"]                            # data streams are not supported in mp4 container
+        if streaming:
+            cmd += ["-movflags", "+faststart"]
+        cmd += self._ffmpeg_metadata_args(metadatas)
+        cmd.append(output_path)
+        return cmd
+
+    def optimize_video_segmented(self,
+        input_path: str,
+        output_path: Path,
+        work_dir: Path,
+        crf: int = None,
+        preset: str = "slow",
+        codec: str = "libx265",
+        scale_resolution: str = None,
+        streaming: bool = False,
+        threads: int = None,
+        segment_workers: int = None,
+        segment_time: float = 30,
+        job: JobContext = None,
+        metadatas: dict[str, str] = None,
+        duration: float = None,
+        abort_ratio: float = None,
+        abort_min_progress: float = 0.1,
+        progress_callback: Callable[[EncodeProgress], None] = None
+    ):
+        """
+        optimize_video() for long videos: the video stream is split at keyframes, the segments are
+        encoded by several ffmpeg processes at once with identical settings, then joined losslessly.
+        One x265 process stops scaling after a handful of threads, several smaller ones keep every core busy.
+
+        Args:
+            work_dir (Path): Scratch folder for the segments, removed afterwards.
+            threads (int): Total ffmpeg threads shared by the segment encoders (Default: cpu count).
+            segment_workers (int): Segments encoded at the same time (Default: one per 4 threads).
+            segment_time (float): Target segment length in seconds.
+            abort_ratio (float): Stop once the finished segments project an output larger than this
+                                 fraction of the input size.
+            progress_callback (Callable[[EncodeProgress], None]): Called with the combined progress of
+                                                                 all segments (fps and speed are summed).
+
+            Other arguments are the same as optimize_video().
+
+        Returns:
+            Path: Path to the optimized video.
+
+        Raises:
+            FileNotFoundError: If input file is missing.
+            RuntimeError: If FFmpeg fails.
+            EncodeAbortedError: If the projected output size exceeds abort_ratio.
+        """
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        total_duration = duration if duration is not None else self.get_video_duration(input_path)
+        threads = max(1, threads or os.cpu_count() or 1)
+        segment_workers = max(1, segment_workers or threads // 4)
+        segment_threads = max(1, threads // segment_workers)
+        size_limit = os.path.getsize(input_path) * abort_ratio if abort_ratio else None
+
+        work_dir = Path(work_dir)
+        work_dir.mkdir(parents=True, exist_ok=True)
+        stop = threading.Event()
+        lock = threading.Lock()
+        processes: list[subprocess.Popen] = []
+        progress: dict[int, EncodeProgress] = {}
+        pbar = tqdm(total=total_duration, unit="s", desc="Encoding")
+        if job:
+            job.attach_pbar(pbar)
+
+        def encode(index: int, segment: Path):
+            if stop.is_set():
+                return None
+            output = work_dir / f"encoded_{index:05d}.mkv"
+            cmd = self._video_command(segment, output, crf, preset, codec, scale_resolution, False, segment_threads)
+            cmd[1:1] = self._progress_args()
+            process = self._popen(cmd, job, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, bufsize=1)
+            with lock:
+                processes.append(process)
+            stderr_tail, stderr_thread = self._stderr_ring(process)
+            parser = FFmpegProgressParser()
+            for line in process.stdout:
+                event = parser.feed(line)
+                if event is None:
+                    continue
+                with lock:
+                    progress[index] = event
+                    combined = self._combine_progress(progress.values(), total_duration)
+                    self._update_pbar(pbar, combined)
+                if progress_callback:
+                    progress_callback(combined)
+            process.wait()
+            stderr_thread.join()
+            if stop.is_set():
+                return None
+            if process.returncode != 0:
+                raise RuntimeError(f"FFmpeg failed on segment {segment.name}:\n{''.join(stderr_tail)}")
+            return output
+
+        def stop_all():
+            stop.set()
+            with lock:
+                running = [process for process in processes if process.poll() is None]
+            for process in running:
+                process.terminate()
+            for process in running:
+                process.wait()
+
         try:
-            result = subprocess.run([self._exiftool, '-ver'], capture_output=True, text=True).stdout.strip()
-            return (f"exiftool-{result}")
-        except FileNotFoundError as e:
-            raise e
+            segments = self.split_video(input_path, work_dir, segment_time, job)
+            if not segments:
+                raise RuntimeError("FFmpeg produced no segment.")
+
+            encoded: list[Path] = [None] * len(segments)
+            encoded_size, encoded_time = 0, 0.0
+            with ThreadPoolExecutor(max_workers=segment_workers, thread_name_prefix="segment") as executor:
+                pending = {executor.submit(encode, index, segment): index for index, segment in enumerate(segments)}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = pending.pop(future)
+                        try:
+                            encoded[index] = future.result()
+                        except Exception:
+                            stop_all()
+                            raise
+                        if encoded[index] is None:
+                            continue
+
+                        # Project the final size from the finished segments
+                        encoded_size += encoded[index].stat().st_size
+                        encoded_time += progress[index].out_time if index in progress else 0.0
+                        if size_limit and total_duration and encoded_time >= total_duration * abort_min_progress:
+                            projected = int(encoded_size * total_duration / encoded_time)
+                            if projected > size_limit:
+                                stop_all()
+                                raise EncodeAbortedError(f"Projected size {projected} exceeds {size_limit:.0f} bytes", projected)
+
+            if job:
+                job.raise_if_cancelled()
+            if None in encoded:
+                raise RuntimeError("FFmpeg segment encode was stopped.")
 
+            self.concat_video(encoded, input_path, output_path, work_dir, streaming, job, metadatas)
+            pbar.n = total_duration
+            pbar.refresh()
+            return output_path
+        finally:
+            pbar.close()
+            shutil.rmtree(work_dir, ignore_errors=True)
+    #endregion
+
+    #region Optimize Renditions
     @staticmethod
-    def extract_version(text: str):
-        match = re.search(r'version\s+([\d.]+)', text)
-        return match.group(1) if match else None
+    def _scale_filter(max_size: int, even: bool = False):
+        # fit in max_size x max_size, never upscale (yuv420 video needs even dimensions)
+        scale = f"scale=w='min(iw,{max_size})':h='min(ih,{max_size})':force_original_aspect_ratio=decrease"
+        return scale + (":force_divisible_by=2" if even else "")
 
-    @property
-    def get_ffmpeg_version(self):
-        try:
-            result = subprocess.run([self._ffmpeg, '-version'], capture_output=True, text=True).stdout
-            return (f"ffmpeg-{MediaOptimizer.extract_version(result)}")
-        except FileNotFoundError as e:
-            raise e
+    def _renditions_command(self, input_path: str, outputs: list[tuple[Rendition, Path, dict[str, str]]], kind: str, threads: int = None, raw_frame: RawFrame = None, multiple_frame: bool = False):
+        """
+        Build the ffmpeg command used by optimize_renditions: the decoded video stream is split,
+        every branch scaled as needed and encoded to its own output with its own settings and tags.
+        """
+        if raw_frame:
+            source = [
+                "-f", "rawvideo",                 # Uncompressed pixels from stdin
+                "-pix_fmt", raw_frame.pix_fmt,
+                "-s", raw_frame.size,
+                "-i", "pipe:0",
+            ]
+        else:
+            source = ["-i", input_path]
 
-    @property
-    def get_ffprobe_version(self):
-        try:
-            result = subprocess.run([self._ffprobe, '-version'], capture_output=True, text=True).stdout
-            return (f"ffprobe-{MediaOptimizer.extract_version(result)}")
-        except FileNotFoundError as e:
-            raise e
-    #endregion
\ No newline at end of file
+        # [0:v:0]split=3[s0][s1][s2];[s2]scale=...[r2]
+        graph = [f"[0:v:0]split={len(outputs)}" + "".join(f"[s{index}]" for index in range(len(outputs)))]
+        labels = []
+        for index, (rendition, _, _) in enumerate(outputs):
+            if rendition.max_size:
+                graph.append(f"[s{index}]{self._scale_filter(rendition.max_size, kind == 'video')}[r{index}]")
+                labels.append(f"[r{index}]")
+            else:
+                labels.append(f"[s{index}]")
+
+        # the encoders share the thread budget, the decode is shared by all of them
+        output_threads = max(1, threads // len(outputs)) if threads else None
+
+        cmd = [self._ffmpeg, "-y", *source, "-filter_complex", ";".join(graph)]
+        for index, (rendition, output_path, metadatas) in enumerate(outputs):
+            cmd += ["-map", labels[index]]
+            if kind == "image":
+                crf = 30 if rendition.crf is None else rendition.crf
+                cmd += ["-map_metadata", "0", *self._image_codec_args(rendition.codec, rendition.qvb or 4, crf, multiple_frame)]
+            else:
+                if index == 0:
+                    cmd += ["-map", "0", "-map", "-0:v:0"]   # main output keeps every other stream
+                elif rendition.audio:
+                    cmd += ["-map", "0:a?"]
+                crf = rendition.crf if rendition.crf is not None else (26 if rendition.codec == "libx265" else 23)
+                cmd += [
+                    "-c:v", rendition.codec,
+                    "-preset", rendition.preset,
+                    "-crf", str(crf),
+                    "-c:a", "copy",
+                    "-map_metadata", "0",
+                ]
+                if output_path.suffix == ".mp4":
+                    cmd += ["-dn"]                           # data streams are not supported in mp4 container
+                if rendition.streaming:
+                    cmd += ["-movflags", "+faststart"]
+            cmd += self._thread_args(rendition.codec, output_threads)
+            cmd += self._ffmpeg_metadata_args(metadatas)
+            cmd.append(output_path)
+        return cmd
+
+    def optimize_renditions(self,
+        input_path: str,
+        outputs: list[tuple[Rendition, Path, dict[str, str]]],
+        kind: str = "image",
+        threads: int = None,
+        job: JobContext = None,
+        raw_frame: RawFrame = None,
+        multiple_frame: bool = False,
+        duration: float = None,
+        progress_callback: Callable[[EncodeProgress], None] = None
+    ):
+        """
+        Encode several renditions of a media (e.g. AVIF + JPEG fallback + thumbnail) from a single decode:
+        one ffmpeg process, a split filter graph and one output per rendition.
+
+        Args:
+            input_path (str): Full path to the input media.
+            outputs (list[tuple[Rendition, Path, dict[str, str]]]): Rendition, output path and the tags ffmpeg
+                                                                    writes into it (None for none). The first
+                                                                    one is the main output.
+            kind (str): "image" or "video".
+            threads (int): ffmpeg thread count shared by the encoders, None to let ffmpeg decide.
+            job (JobContext): Job that owns the ffmpeg subprocess and progress bar.
+            raw_frame (RawFrame): Already decoded pixels, piped to ffmpeg's stdin instead of reading input_path.
+            multiple_frame (bool): Image has multiple frames (animated).
+            duration (float): Input duration in seconds (videos), used by the progress bar.
+            progress_callback (Callable[[EncodeProgress], None]): Called with every progress event,
+                                                                 total_size counts all outputs.
+
+        Returns:
+            list[Path]: Output paths, in the order given.
+
+        Raises:
+            FileNotFoundError: If input file is missing.
+            RuntimeError: If FFmpeg fails (no partial output is left behind).
+        """
+        if not os.path.isfile(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+
+        cmd = self._renditions_command(input_path, outputs, kind, threads, raw_frame, multiple_frame)
+        cmd[1:1] = self._progress_args()
+        mod_time = os.path.getmtime(input_path)
+        if kind == "video" and duration is None:
+            duration = self.get_video_duration(input_path)
+
+        process = self._popen(
+            cmd,
+            job,
+            stdin=subprocess.PIPE if raw_frame else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+            bufsize=1
+        )
+        stderr_tail, stderr_thread = self._stderr_ring(process)
+
+        if raw_frame:
+            # fed on a thread, ffmpeg's progress is read meanwhile
+            def feed():
+                try:
+                    process.stdin.buffer.write(raw_frame.data)
+                    process.stdin.close()
+                except OSError:
+                    pass   # ffmpeg exited early, reported by its return code
+            threading.Thread(target=feed, name="ffmpeg-stdin", daemon=True).start()
+
+        pbar = None
+        if kind == "video":
+            pbar = tqdm(total=duration, unit="s", desc="Encoding")
+            if job:
+                job.attach_pbar(pbar)
+
+        parser = FFmpegProgressParser(duration)
+        for line in process.stdout:
+            event = parser.feed(line)
+            if event is None:
+                continue
+            if pbar:
+                self._update_pbar(pbar, event)
+            if progress_callback:
+                progress_callback(event)
+
+        process.wait()
+        stderr_thread.join()
+        if pbar:
+            pbar.close()
+
+        paths = [output_path for _, output_path, _ in outputs]
+        if process.returncode != 0:
+            for path in paths:
+                Path(path).unlink(missing_ok=True)
+            raise RuntimeError(f"FFmpeg failed:\n{''.join(stderr_tail)}")
+
+        for path in paths:
+            os.utime(path, (mod_time, mod_time))
+        return paths
+    #endregion
+
+    #region Progress
+    @staticmethod
+    def _progress_args():
+        return ["-progress", "pipe:1", "-nostats"]
+
+    @staticmethod
+    def _stderr_ring(process: subprocess.Popen):
+        """
+        Keep the last lines of stderr in a ring buffer for error reports. Drained on a thread,
+        so a chatty stderr can't fill its pipe while progress is read from stdout.
+        """
+        tail = deque(maxlen=STDERR_TAIL_LINES)
+        thread = threading.Thread(target=tail.extend, args=(process.stderr,), name="ffmpeg-stderr", daemon=True)
+        thread.start()
+        return tail, thread
+
+    @staticmethod
+    def _combine_progress(events, duration: float = None):
+        """
+        One event for encodes running side by side (segments): sizes, times and rates are summed.
+        """
+        events = list(events)
+        speeds = [event.speed for event in events if event.speed is not None]
+        return EncodeProgress(
+            frame=sum(event.frame for event in events),
+            fps=sum(event.fps for event in events),
+            total_size=sum(event.total_size for event in events),
+            out_time=sum(event.out_time for event in events),
+            speed=sum(speeds) if speeds else None,
+            duration=duration
+        )
+
+    @staticmethod
+    def _update_pbar(pbar: tqdm, event: EncodeProgress):
+        if event.duration:
+            pbar.n = min(event.out_time, event.duration)
+        pbar.set_postfix(fps=f"{event.fps:.1f}", speed=f"{event.speed or 0:.2f}x", size=event.total_size, refresh=False)
+        pbar.refresh()
+    #endregion
@@ -0,0 +1,213 @@
+import os
+import json
+import time
+import threading
+from bisect import bisect_left
+from pathlib import Path
+
+# Histogram buckets (upper bounds, seconds)
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+PREFIX = "mediaoptimizer"
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # last one is +Inf
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsManager:
+    """
+    Counters and latency histograms of a run, exported as a Prometheus textfile and a JSON snapshot.
+
+    Stage timings follow the ProcessState transitions of each job: the time between two transitions
+    is observed under the stage that was left. Running encodes report their fps, speed and ETA, exported
+    as gauges over all of them. Both files are rewritten atomically every interval
+    by a background thread, so node_exporter's textfile collector can scrape long-running jobs.
+    """
+
+    def __init__(self, output_dir: Path, interval: float = 30):
+        """
+        Args:
+            output_dir (Path): Folder receiving metrics.prom and metrics.json.
+            interval (float): Seconds between two exports, 0 to only export when stopping.
+        """
+        self._prometheus_file = Path(output_dir) / "metrics.prom"
+        self._json_file = Path(output_dir) / "metrics.json"
+        self._interval: float = interval
+        self._lock = threading.Lock()
+        self._counters: dict[tuple, float] = {}
+        self._histograms: dict[tuple, Histogram] = {}
+        self._stages: dict[str, tuple[str, float]] = {}
+        self._encodes: dict[str, tuple[float, float, float]] = {}   # guid: (fps, speed, eta)
+        self._started: float = time.time()
+        self._stop = threading.Event()
+        self._thread: threading.Thread = None
+
+    @staticmethod
+    def _series(name: str, labels: dict):
+        return (name, tuple(sorted((key, str(value)) for key, value in labels.items())))
+
+    #region Record
+    def count(self, name: str, value: float = 1, **labels):
+        """
+        Increase a counter, e.g. count("bytes_in_total", 1024).
+        """
+        series = self._series(name, labels)
+        with self._lock:
+            self._counters[series] = self._counters.get(series, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Add a value (seconds) to a histogram.
+        """
+        series = self._series(name, labels)
+        with self._lock:
+            self._histograms.setdefault(series, Histogram()).observe(value)
+
+    def transition(self, guid: str, stage: str):
+        """
+        Move a job to a new stage, timing the stage it leaves.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            previous = self._stages.get(guid)
+            self._stages[guid] = (stage, now)
+        if previous:
+            self.observe("stage_duration_seconds", now - previous[1], stage=previous[0])
+        self.count("stage_transitions_total", stage=stage)
+
+    def encoding(self, guid: str, fps: float, speed: float = None, eta: float = None):
+        """
+        Latest progress of a job's encode (until the job finishes).
+        """
+        with self._lock:
+            self._encodes[guid] = (fps, speed or 0.0, eta or 0.0)
+
+    def finish(self, guid: str, result: str, elapsed: float = None, kind: str = None):
+        """
+        Close a job: time its last stage, count the file and its total duration.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            previous = self._stages.pop(guid, None)
+            self._encodes.pop(guid, None)
+        if previous:
+            self.observe("stage_duration_seconds", now - previous[1], stage=previous[0])
+        self.count("files_total", result=result)
+        if elapsed is not None:
+            self.observe("file_duration_seconds", elapsed, kind=kind or "unknown")
+    #endregion
+
+    #region Export
+    def snapshot(self):
+        """
+        Current values as a JSON friendly dict.
+        """
+        with self._lock:
+            encodes = list(self._encodes.values())
+            return {
+                "started": self._started,
+                "updated": time.time(),
+                "gauges": [
+                    {"name": "encodes_running", "value": len(encodes)},
+                    {"name": "encode_fps", "value": sum(fps for fps, _, _ in encodes)},
+                    {"name": "encode_speed", "value": sum(speed for _, speed, _ in encodes)},
+                    {"name": "encode_eta_seconds", "value": max((eta for _, _, eta in encodes), default=0.0)},
+                ],
+                "counters": [
+                    {"name": name, "labels": dict(labels), "value": value}
+                    for (name, labels), value in sorted(self._counters.items())
+                ],
+                "histograms": [
+                    {
+                        "name": name, "labels": dict(labels), "count": histogram.count, "sum": histogram.sum,
+                        "buckets": dict(zip([*map(str, histogram.buckets), "+Inf"], histogram.counts))
+                    }
+                    for (name, labels), histogram in sorted(self._histograms.items())
+                ]
+            }
+
+    @staticmethod
+    def _labels(labels: dict, **extra):
+        labels = {**labels, **extra}
+        if not labels:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in labels.values())
+        return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+    def to_prometheus(self):
+        """
+        Current values in the Prometheus text exposition format.
+        """
+        data = self.snapshot()
+        lines = [f"# TYPE {PREFIX}_run_started_seconds gauge", f"{PREFIX}_run_started_seconds {data['started']}"]
+        for gauge in data["gauges"]:
+            lines += [f"# TYPE {PREFIX}_{gauge['name']} gauge", f"{PREFIX}_{gauge['name']} {gauge['value']}"]
+
+        typed = set()
+        for counter in data["counters"]:
+            name = f"{PREFIX}_{counter['name']}"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            lines.append(f"{name}{self._labels(counter['labels'])} {counter['value']}")
+
+        for histogram in data["histograms"]:
+            name = f"{PREFIX}_{histogram['name']}"
+            if name not in typed:
+                lines.append(f"# TYPE {name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for le, count in histogram["buckets"].items():
+                cumulative += count
+                lines.append(f"{name}_bucket{self._labels(histogram['labels'], le=le)} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(histogram['labels'])} {histogram['sum']}")
+            lines.append(f"{name}_count{self._labels(histogram['labels'])} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _write_atomic(file: Path, content: str):
+        temp = file.with_name(f".{file.name}.tmp")   # hidden, the collector only reads *.prom
+        with open(temp, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(temp, file)
+
+    def export(self):
+        self._prometheus_file.parent.mkdir(parents=True, exist_ok=True)
+        self._write_atomic(self._prometheus_file, self.to_prometheus())
+        self._write_atomic(self._json_file, json.dumps(self.snapshot(), indent=2))
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.export()
+            except OSError:
+                pass   # try again next interval
+
+    def start(self):
+        """
+        Export on the interval in a background thread.
+        """
+        if self._interval and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background export and write the final values.
+        """
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.export()
+    #endregion
@@ -1,15 +1,152 @@
-from datetime import datetime
+import os
+import re
+import json
+import queue
+import atexit
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+
+LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+# log lines of a job start with its guid: "[<guid>] message"
+GUID_PATTERN = re.compile(r"^\[([0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})\]\s*")
 
 # Function to get current timestamp
 def get_timestamp():
     return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-# Function to log messages
-def log_message(message, file_path):
-    timestamped_message = f"[{get_timestamp()}] {message}"
-    with open(file_path, "a") as file:  # Append log instead of overwriting
-        file.write(timestamped_message + "\n")
-    print(timestamped_message)  # Also print to console
 
+class QueueLogger:
+    """
+    Non-blocking structured logger.
+
+    Callers only enqueue events; one background thread drains the queue in batches, writes them
+    as JSON Lines (one open handle per log file, size based rotation) and prints the human readable
+    line to the console. Pending events are flushed at shutdown.
+    """
+
+    def __init__(self, level: str = "INFO", console: bool = True, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5, batch_size: int = 256):
+        """
+        Args:
+            level (str): Minimum level written (DEBUG, INFO, WARNING, ERROR).
+            console (bool): Print the events to the console as well.
+            max_bytes (int): Rotate a log file once it grows past this size, 0 to never rotate.
+            backup_count (int): Rotated files kept (log.jsonl.1 ... log.jsonl.N).
+            batch_size (int): Maximum events written per batch.
+        """
+        self.configure(level, console, max_bytes, backup_count)
+        self._batch_size: int = batch_size
+        self._queue: queue.Queue = queue.Queue()
+        self._files: dict[str, object] = {}
+        self._thread: threading.Thread = None
+        self._lock = threading.Lock()
+
+    def configure(self, level: str = None, console: bool = None, max_bytes: int = None, backup_count: int = None):
+        if level is not None:
+            self._level: int = LEVELS[level.upper()]
+        if console is not None:
+            self._console: bool = console
+        if max_bytes is not None:
+            self._max_bytes: int = max_bytes
+        if backup_count is not None:
+            self._backup_count: int = backup_count
+
+    def log(self, message, file_path, level: str = "INFO", **fields):
+        level = level.upper()
+        if LEVELS.get(level, 20) < self._level:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put((datetime.now(UTC), level, str(message), str(file_path), fields))
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="logger", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self._batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"[{get_timestamp()}] Logger failed: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, batch: list[tuple]):
+        lines: dict[str, list[str]] = {}
+        for time, level, message, file_path, fields in batch:
+            match = GUID_PATTERN.match(message)
+            record = {
+                "time": time.isoformat(),
+                "level": level,
+                "guid": match.group(1) if match else None,
+                "message": message[match.end():] if match else message,
+                **{key: (str(value) if isinstance(value, Path) else value) for key, value in fields.items()}
+            }
+            lines.setdefault(file_path, []).append(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            if self._console:
+                print(f"[{time.astimezone().strftime('%Y-%m-%d %H:%M:%S')}] {message}")
+
+        for file_path, records in lines.items():
+            file = self._open(file_path)
+            file.write("".join(records))
+            file.flush()
+            if self._max_bytes and file.tell() >= self._max_bytes:
+                self._rotate(file_path)
+
+    def _open(self, file_path: str):
+        file = self._files.get(file_path)
+        if file is None:
+            file = open(file_path, "a", encoding="utf-8")
+            self._files[file_path] = file
+        return file
+
+    def _rotate(self, file_path: str):
+        self._files.pop(file_path).close()
+        for index in range(self._backup_count - 1, 0, -1):
+            source = f"{file_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{file_path}.{index + 1}")
+        if self._backup_count:
+            os.replace(file_path, f"{file_path}.1")
+        else:
+            os.remove(file_path)
+
+    def flush(self):
+        """
+        Block until every queued event is written.
+        """
+        if self._thread is not None:
+            self._queue.join()
+
+    def shutdown(self):
+        self.flush()
+        for file in list(self._files.values()):
+            file.close()
+        self._files.clear()
+
+
+logger = QueueLogger()
+atexit.register(logger.shutdown)
+
+# Function to log messages
+def log_message(message, file_path, level: str = "INFO", **fields):
+    """
+    Queue a log event, written to file_path (JSON Lines) and the console by the background writer.
 
-# TODO: make use of lib and better standardization (level: [Information][Warning][Error])
\ No newline at end of file
+    Args:
+        message: Message, a leading "[<guid>]" is stored in the guid field.
+        file_path: Log file.
+        level (str): DEBUG, INFO, WARNING or ERROR.
+        **fields: Extra structured fields, e.g. stage, file, duration.
+    """
+    logger.log(message, file_path, level, **fields)
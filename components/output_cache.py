@@ -0,0 +1,144 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import threading
+import time
+from pathlib import Path
+
+
+class OutputCache:
+    """
+    Content-addressed store of encoded outputs, so byte-identical duplicates are encoded once.
+
+    Entries are keyed by (source hash, codec, encode params, ffmpeg version) and kept in the cache
+    folder. A hit is served by hardlink (copy when linking is not possible) instead of an encode.
+    The folder is bounded in size and the least recently used entries are evicted first; usage is
+    tracked in a small SQLite index next to the entries.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int, tool_version: str = ""):
+        """
+        Args:
+            cache_dir (str): Folder holding the cached outputs.
+            max_size (int): Maximum total size of the entries in bytes.
+            tool_version (str): Encoder version, part of every key.
+        """
+        self._cache_dir = Path(cache_dir)
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        self._max_size: int = max_size
+        self._tool_version: str = tool_version
+        self._lock = threading.Lock()
+        self._hits: int = 0
+        self._misses: int = 0
+        self._connection: sqlite3.Connection = None
+
+    def _connect(self):
+        # Opened on first use (and again after close()), callers hold the lock
+        if self._connection is None:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self._cache_dir / "index.sqlite3", check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    file TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+            self._connection.commit()
+        return self._connection
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def key(self, digest: str, codec: str, params: dict = None):
+        """
+        Cache key of an encode: content of the source plus everything that changes the output.
+
+        Args:
+            digest (str): Content hash of the source (FileManager.hash_file), computed once per file
+                          by the caller and shared with the ledger.
+            codec (str): Output codec.
+            params (dict): Encode parameters.
+        """
+        parts = [digest, codec, json.dumps(params or {}, sort_keys=True), self._tool_version]
+        return hashlib.blake2b("\n".join(parts).encode("utf-8"), digest_size=32).hexdigest()
+
+    @staticmethod
+    def _link(source: Path, destination: Path, link: bool = True):
+        if destination.exists():
+            destination.unlink()
+        if link:
+            try:
+                os.link(source, destination)
+                return
+            except OSError:
+                pass   # other device or no hardlink support
+        shutil.copy2(source, destination)
+
+    def get(self, key: str, output_path: Path, link: bool = True):
+        """
+        Serve a cached output.
+
+        Args:
+            key (str): Cache key.
+            output_path (Path): Where the output is expected.
+            link (bool): Hardlink the entry, False when the output is rewritten in place afterwards.
+
+        Returns:
+            bool: True on a hit.
+        """
+        with self._lock:
+            row = self._connect().execute("SELECT file FROM entries WHERE key = ?", (key,)).fetchone()
+            entry = self._cache_dir / row[0] if row else None
+            if entry is None or not entry.exists():
+                self._misses += 1
+                return False
+            self._connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+            self._hits += 1
+
+        self._link(entry, Path(output_path), link)
+        return True
+
+    def put(self, key: str, output_path: Path):
+        """
+        Store an encoded output, evicting the least recently used entries beyond the size limit.
+        """
+        output_path = Path(output_path)
+        file = f"{key[:2]}/{key}{output_path.suffix}"
+        entry = self._cache_dir / file
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        self._link(output_path, entry)
+
+        with self._lock:
+            self._connect().execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, file, entry.stat().st_size, time.time()))
+            self._connection.commit()
+            self._evict()
+
+    def _evict(self):
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self._max_size:
+            return
+        for key, file, size in self._connection.execute("SELECT key, file, size FROM entries ORDER BY last_used").fetchall():
+            if total <= self._max_size:
+                break
+            (self._cache_dir / file).unlink(missing_ok=True)
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+        self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
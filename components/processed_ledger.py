@@ -0,0 +1,161 @@
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import Iterable, Iterator
+from components.file_manager import FileManager
+
+
+class ProcessedLedger:
+    """
+    Persistent SQLite ledger of the media already processed.
+
+    A file is known when its path, size, mtime and inode match a recorded entry, which only needs
+    a stat() call. A file that was moved or touched is still recognised by its content hash, when
+    it matches an entry of the same size whose recorded file is gone or changed. A copy of a file
+    that is still in place is a duplicate, not a processed file, and is left to the output cache.
+    Recording never reads the file, the hash is stored when the caller already has it. Lookups
+    are batched, one query per batch of paths, so re-scanning a large unchanged library costs
+    seconds. Batches start at a single path and double, so the first file is not held back.
+    """
+
+    def __init__(self, ledger_file: str, batch_size: int = 900):
+        """
+        Args:
+            ledger_file (str): SQLite database file.
+            batch_size (int): Paths checked per query (kept under SQLite's 999 variables limit).
+        """
+        self._ledger_file = Path(ledger_file)
+        self._batch_size: int = batch_size
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection = None
+
+    def _connect(self):
+        # Opened on first use (and again after close()), callers hold the lock
+        if self._connection is None:
+            self._ledger_file.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self._ledger_file, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS media (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    inode INTEGER NOT NULL,
+                    hash TEXT,
+                    codec TEXT,
+                    params TEXT,
+                    result TEXT,
+                    processed_at TEXT
+                )
+            """)
+            self._connection.execute("CREATE INDEX IF NOT EXISTS media_size ON media (size)")
+            self._connection.commit()
+        return self._connection
+
+    @staticmethod
+    def _key(media: Path):
+        return str(Path(media).absolute())
+
+    def _query(self, sql: str, values: list):
+        with self._lock:
+            return self._connect().execute(sql, values).fetchall()
+
+    def filter_unknown(self, files: Iterable[Path], batch_size: int = None) -> Iterator[tuple[Path, bool]]:
+        """
+        Check files against the ledger in batches.
+
+        Args:
+            files (Iterable[Path]): Files to check, consumed lazily.
+            batch_size (int): Largest batch for this call, 1 checks every file as it arrives
+                              (e.g. when the files come from a bounded queue).
+
+        Yields:
+            tuple[Path, bool]: The file and whether it was processed before.
+        """
+        limit = max(1, min(batch_size or self._batch_size, self._batch_size))
+        batch, size = [], 1
+        for media in files:
+            batch.append(media)
+            if len(batch) >= size:
+                yield from self._check_batch(batch)
+                batch, size = [], min(size * 2, limit)
+        if batch:
+            yield from self._check_batch(batch)
+
+    def _check_batch(self, batch: list[Path]):
+        stats = {}
+        for media in batch:
+            try:
+                stats[self._key(media)] = os.stat(media)
+            except OSError:
+                pass
+
+        keys = list(stats)
+        placeholders = ",".join("?" * len(keys))
+        rows = self._query(f"SELECT path, size, mtime_ns, inode FROM media WHERE path IN ({placeholders})", keys) if keys else []
+        known = {
+            path for path, size, mtime_ns, inode in rows
+            if (size, mtime_ns, inode) == (stats[path].st_size, stats[path].st_mtime_ns, stats[path].st_ino)
+        }
+
+        # Hash fallback, only for files sharing their size with a recorded file that was moved or changed
+        misses = [key for key in keys if key not in known]
+        sizes = sorted({stats[key].st_size for key in misses})
+        hashes: dict[int, set[str]] = {}
+        if sizes:
+            placeholders = ",".join("?" * len(sizes))
+            rows = self._query(f"SELECT path, size, mtime_ns, inode, hash FROM media WHERE size IN ({placeholders}) AND hash IS NOT NULL", sizes)
+            for path, size, mtime_ns, inode, digest in rows:
+                if not self._in_place(path, size, mtime_ns, inode):
+                    hashes.setdefault(size, set()).add(digest)
+        for key in misses:
+            candidates = hashes.get(stats[key].st_size)
+            if candidates:
+                try:
+                    if FileManager.hash_file(Path(key)) in candidates:
+                        known.add(key)
+                except OSError:
+                    pass
+
+        for media in batch:
+            yield media, self._key(media) in known
+
+    @staticmethod
+    def _in_place(path: str, size: int, mtime_ns: int, inode: int):
+        # The recorded file is still there, unchanged: a same-content file elsewhere is a copy
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return (stat.st_size, stat.st_mtime_ns, stat.st_ino) == (size, mtime_ns, inode)
+
+    def record(self, media: Path, codec: str = None, params: dict = None, result: str = None, digest: str = None):
+        """
+        Record a processed file, replacing its previous entry. Only stat() is called on the file.
+
+        Args:
+            media (Path): Processed file.
+            codec (str): Codec used for the output.
+            params (dict): Encode parameters.
+            result (str): Outcome, e.g. "optimized" or "rollback".
+            digest (str): Content hash when the caller already computed it (FileManager.hash_file),
+                          without it a moved file is not recognised.
+        """
+        stat = os.stat(media)
+        values = (
+            self._key(media), stat.st_size, stat.st_mtime_ns, stat.st_ino, digest,
+            codec, json.dumps(params) if params else None, result, datetime.now(UTC).isoformat()
+        )
+        with self._lock:
+            connection = self._connect()
+            connection.execute("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", values)
+            connection.commit()
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
@@ -0,0 +1,173 @@
+import os
+import time
+import requests
+from pathlib import Path
+from http import HTTPStatus
+from typing import Callable
+from components.upload_scheduler import UploadScheduler
+
+# Errors worth a query + retry (the session is still alive on the server)
+TRANSIENT_STATUS = {HTTPStatus.REQUEST_TIMEOUT, HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR,
+                    HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT}
+
+
+class TransientUploadError(ConnectionError):
+    def __init__(self, message: str, retry_after: str = None):
+        super().__init__(message)
+        self.retry_after = retry_after    # Retry-After header of the response, if any
+
+
+class ResumableUpload:
+    """
+    Google resumable upload protocol (X-Goog-Upload-Protocol: resumable).
+
+    The upload session is opened with a `start` command, the file is sent in chunks with `upload`
+    commands at explicit offsets and the last chunk carries `finalize`, which returns the upload
+    token. After a transient error the received size is asked with a `query` command and the
+    upload continues from there instead of from zero.
+    """
+
+    def __init__(self,
+        session: requests.Session,
+        upload_url: str,
+        auth_headers: Callable[[], dict[str, str]],
+        chunk_size: int = 8 * 1024 * 1024,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        timeout: float = 60,
+        on_unauthorized: Callable[[str], None] = None,
+        scheduler: UploadScheduler = None
+    ):
+        """
+        Args:
+            session (requests.Session): Session used for every request.
+            upload_url (str): Upload endpoint, receives the `start` command.
+            auth_headers (Callable[[], dict[str, str]]): Returns fresh authorization headers.
+            chunk_size (int): Bytes per chunk, rounded down to the server's chunk granularity.
+            max_retries (int): Consecutive failures tolerated before giving up.
+            backoff (float): First retry delay in seconds, doubled on every consecutive failure.
+            timeout (float): Seconds per request.
+            on_unauthorized (Callable[[str], None]): Called with the rejected access token after a 401,
+                                                     the request is then retried with fresh headers.
+            scheduler (UploadScheduler): Paces every request (rate, bandwidth, quota) and computes the
+                                         retry delays, None for plain exponential backoff.
+        """
+        self._session = session
+        self._upload_url: str = upload_url
+        self._auth_headers = auth_headers
+        self._chunk_size: int = chunk_size
+        self._max_retries: int = max_retries
+        self._backoff: float = backoff
+        self._timeout: float = timeout
+        self._on_unauthorized = on_unauthorized
+        self._scheduler = scheduler
+
+    def _post(self, url: str, command: str, data: bytes = b"", extra_headers: dict[str, str] = None):
+        headers = {
+            **self._auth_headers(),
+            "Content-Length": str(len(data)),
+            "X-Goog-Upload-Command": command,
+            **(extra_headers or {})
+        }
+        if self._scheduler:
+            self._scheduler.acquire(len(data))
+        try:
+            response = self._session.post(url, headers=headers, data=data, timeout=self._timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise TransientUploadError(str(e))
+        if response.status_code == HTTPStatus.UNAUTHORIZED and self._on_unauthorized:
+            self._on_unauthorized(headers.get("Authorization", "").removeprefix("Bearer "))
+            raise TransientUploadError(f"{response.status_code}: {response.text}")
+        if response.status_code in TRANSIENT_STATUS:
+            raise TransientUploadError(f"{response.status_code}: {response.text}", response.headers.get("Retry-After"))
+        if response.status_code != HTTPStatus.OK:
+            raise ConnectionError(f"{response.status_code}: {response.text}")
+        return response
+
+    def start(self, file_size: int, mime: str, filename: str):
+        """
+        Open an upload session.
+
+        Returns:
+            tuple[str, int]: Session url and chunk size to use.
+        """
+        response = self._post(self._upload_url, "start", extra_headers={
+            "X-Goog-Upload-Protocol": "resumable",
+            "X-Goog-Upload-Content-Type": mime,
+            "X-Goog-Upload-File-Name": filename,
+            "X-Goog-Upload-Raw-Size": str(file_size),
+        })
+        session_url = response.headers.get("X-Goog-Upload-URL")
+        if not session_url:
+            raise ConnectionError("Resumable upload start returned no X-Goog-Upload-URL.")
+
+        granularity = int(response.headers.get("X-Goog-Upload-Chunk-Granularity") or 1)
+        chunk_size = max(granularity, self._chunk_size // granularity * granularity)
+        return session_url, chunk_size
+
+    def query(self, session_url: str):
+        """
+        Bytes received by the server so far.
+        """
+        response = self._post(session_url, "query")
+        if response.headers.get("X-Goog-Upload-Status") == "final":
+            raise ConnectionError("Upload session is already finalized.")
+        return int(response.headers.get("X-Goog-Upload-Size-Received") or 0)
+
+    def upload(self, file_path: Path, mime: str):
+        """
+        Upload a file in chunks.
+
+        Args:
+            file_path (Path): File to upload.
+            mime (str): Mime type of the file.
+
+        Returns:
+            str: Upload token.
+
+        Raises:
+            ConnectionError: If the upload fails or keeps failing.
+        """
+        file_size = os.path.getsize(file_path)
+        session_url, chunk_size = self._retry(lambda: self.start(file_size, mime, Path(file_path).name))
+
+        offset = 0
+        failures = 0
+        with open(file_path, "rb") as file:
+            while True:
+                try:
+                    file.seek(offset)
+                    data = file.read(chunk_size)
+                    last = offset + len(data) >= file_size
+                    response = self._post(
+                        session_url,
+                        "upload, finalize" if last else "upload",
+                        data,
+                        {"X-Goog-Upload-Offset": str(offset)}
+                    )
+                    if last:
+                        return response.text.strip()   # Upload Token
+                    offset += len(data)
+                    failures = 0
+                except TransientUploadError as e:
+                    failures += 1
+                    if failures > self._max_retries:
+                        raise ConnectionError(f"Upload failed after {self._max_retries} retries: {e}")
+                    self._wait(failures - 1, e)
+                    # Resume from what the server really has
+                    offset = self._retry(lambda: self.query(session_url))
+
+    def _retry(self, request: Callable):
+        for attempt in range(self._max_retries + 1):
+            try:
+                return request()
+            except TransientUploadError as e:
+                if attempt == self._max_retries:
+                    raise ConnectionError(f"Upload failed after {self._max_retries} retries: {e}")
+                self._wait(attempt, e)
+
+    def _wait(self, attempt: int, error: TransientUploadError):
+        if self._scheduler:
+            time.sleep(self._scheduler.backoff_delay(attempt, error.retry_after))
+        else:
+            time.sleep(self._backoff * 2 ** attempt)
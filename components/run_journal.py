@@ -0,0 +1,101 @@
+import os
+import json
+import threading
+from datetime import datetime, UTC
+from pathlib import Path
+
+# States after which a file needs no more work in this run
+FINAL_STATES = {"SUCCESS", "SKIPPED", "FAILED"}
+
+
+class RunJournal:
+    """
+    Append-only, fsynced JSONL journal of every file's state transitions in a run.
+
+    Each line is written and synced before the work it describes starts, so after a crash or a
+    reboot the journal tells which files finished and which ones stopped half way (and the output
+    they may have left behind). Later lines win: the last entry of a file is its current state.
+    """
+
+    def __init__(self, journal_file: Path):
+        """
+        Args:
+            journal_file (Path): Journal location, usually inside the run folder.
+        """
+        self._journal_file = Path(journal_file)
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = self._load()
+        self._file = None
+
+    @staticmethod
+    def _key(media: Path):
+        return str(Path(media).absolute())
+
+    def _load(self):
+        entries = {}
+        try:
+            with open(self._journal_file, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue   # torn last line from a crash
+                    entries[entry["path"]] = entry
+        except OSError:
+            pass
+        return entries
+
+    def _ends_with_newline(self):
+        with open(self._journal_file, "rb") as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b"\n"
+
+    def record(self, media: Path, state: str, guid: str = None, output_path: Path = None):
+        """
+        Durably append a state transition of a file.
+
+        Args:
+            media (Path): Source file.
+            state (str): New state name.
+            guid (str): Job guid, ties the entry to the log.
+            output_path (Path): Output the file is writing, if any.
+        """
+        entry = {
+            "time": datetime.now(UTC).isoformat(),
+            "guid": guid,
+            "path": self._key(media),
+            "state": state,
+            "output": str(output_path) if output_path else None
+        }
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self._journal_file.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self._journal_file, "a", encoding="utf-8")
+                if self._file.tell() and not self._ends_with_newline():
+                    line = "\n" + line   # start after a torn line
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._entries[entry["path"]] = entry
+
+    def finished(self, media: Path):
+        """
+        True when the file reached a final state in this run.
+        """
+        with self._lock:
+            entry = self._entries.get(self._key(media))
+        return entry is not None and entry["state"] in FINAL_STATES
+
+    def unfinished(self):
+        """
+        Last entry of every file that was interrupted before reaching a final state.
+        """
+        with self._lock:
+            return [entry for entry in self._entries.values() if entry["state"] not in FINAL_STATES]
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
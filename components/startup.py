@@ -1,6 +1,7 @@
 import argparse
 import json
 import sys
+from pathlib import Path
 from pydantic import ValidationError
 from dependency_injector import containers, providers
 from classes.google_auth import GoogleAuth
@@ -8,14 +9,19 @@ from classes.tools import Tool
 from classes.google_photos import GooglePhotos
 from classes.argument import Argument
 from classes.path_manager import PathManager
-from components.google_api_manager import GoogleAPIManager
+from classes.storage import Storage
+from classes.rendition import Renditions
 from components.media_optimizer import MediaOptimizer
 from components.file_manager import FileManager
+from components.metrics_manager import MetricsManager
+from components.tool_registry import ToolRegistry
+from components.my_logging import logger, log_message, LEVELS
+from components.upload_scheduler import UploadScheduler
 
 # Args handling
 parser = argparse.ArgumentParser(description="MediaOptimizer settings")
 parser.add_argument("-n", "--name", type=str, default="Manual", help="Operation name (default: 'Manual')")
-parser.add_argument("-o", "--operation", type=int, choices=[0,1,2], default=1, help='Operation: 0 = Optimize and Upload, 1 = Optimize only, 2 = Upload only (default: 1)')
+parser.add_argument("-o", "--operation", type=int, choices=[0,1,2,3], default=1, help='Operation: 0 = Optimize and Upload, 1 = Optimize only, 2 = Upload only, 3 = Download (Google Photos) and Optimize (default: 1)')
 parser.add_argument("-s", "--source", type=str, help="Source folder path (skips manual input)")
 parser.add_argument("-iq", "--image_quality", type=int, help="Image quality (int value, depends on selected codec)")
 parser.add_argument("-vq", "--video_quality", type=int, help="Video quality (int value, depends on selected codec)")
@@ -24,8 +30,26 @@ parser.add_argument("-voc", "--video_output_codec", type=str, help="Video output
 parser.add_argument("-m", "--media", type=str, choices=["image", "video"], help="Only process specified media type")
 parser.add_argument("-e", "--extension", type=str, help='Only process files with specified extensions (e.g. "jpg;png;mp4")')
 parser.add_argument("-k", "--keep_temp", action="store_true", help='Keep temp files instead of deleting them after execution (large files in png format)')
+parser.add_argument("-ht", "--heif_temp", action="store_true", help='Decode HEIF/HEIC into a temp png file instead of piping raw frames to ffmpeg')
+parser.add_argument("-oc", "--output_cache", action="store_true", help='Reuse encodes of byte-identical media from the output cache (storage.cache_dir)')
 parser.add_argument("-rp", "--allow_reprocess", action="store_true", help='Allow reprocessing files that are previously processed or flagged')
 parser.add_argument("-rf", "--retry_failed", action="store_true", help='Retry failed files (recommend on small batch of files)')
+parser.add_argument("-re", "--resume", type=str, help="Resume an interrupted run from its output folder (e.g. output/Manual-2025-01-01_000000-1)")
+parser.add_argument("-w", "--workers", type=int, default=1, help="Number of files optimized at the same time (default: 1)")
+parser.add_argument("-uw", "--upload_workers", type=int, default=4, help="Number of files uploaded at the same time (default: 4)")
+parser.add_argument("-uq", "--upload_queue_size", type=int, default=8, help="Optimized files waiting for upload before encoding pauses, operation 0 only (default: 8)")
+parser.add_argument("-dw", "--download_workers", type=int, default=4, help="Number of files downloaded at the same time, operation 3 only (default: 4)")
+parser.add_argument("-dq", "--download_queue_size", type=int, default=8, help="Downloaded files waiting for optimization before downloads pause, operation 3 only (default: 8)")
+parser.add_argument("-t", "--threads", type=int, help="Total ffmpeg threads shared by all workers (default: cpu count)")
+parser.add_argument("-ar", "--abort_ratio", type=float, help="Abort a video encode once its projected size exceeds this fraction of the original (e.g. 1.0)")
+parser.add_argument("-sd", "--segment_duration", type=float, help="Encode videos at least this long (seconds) as parallel keyframe segments")
+parser.add_argument("-st", "--segment_time", type=float, default=30, help="Length of each video segment in seconds (default: 30)")
+parser.add_argument("-sgw", "--segment_workers", type=int, help="Number of video segments encoded at the same time (default: one per 4 threads)")
+parser.add_argument("-mes", "--min_expected_savings", type=float, help="Skip encoding files predicted to shrink less than this percentage (e.g. 5)")
+parser.add_argument("-ll", "--log_level", type=str.upper, choices=list(LEVELS), default="INFO", help="Minimum level written to the log (default: INFO)")
+parser.add_argument("-q", "--quiet", action="store_true", help="Don't print the log to the console")
+parser.add_argument("-mi", "--metrics_interval", type=float, default=30, help="Seconds between two metrics exports, 0 to export at the end only (default: 30)")
+parser.add_argument("-sw", "--scan_workers", type=int, default=1, help="Number of threads scanning the source folder (default: 1)")
 args = parser.parse_args()
 
 
@@ -41,8 +65,26 @@ try:
         media = args.media,
         extension = args.extension.split(';') if isinstance(args.extension, str) else args.extension,
         keep_temp = args.keep_temp,
+        heif_temp = args.heif_temp,
+        output_cache = args.output_cache,
         allow_reprocess = args.allow_reprocess,
-        retry_failed = args.retry_failed
+        retry_failed = args.retry_failed,
+        resume = args.resume,
+        workers = args.workers,
+        threads = args.threads,
+        upload_workers = args.upload_workers,
+        upload_queue_size = args.upload_queue_size,
+        download_workers = args.download_workers,
+        download_queue_size = args.download_queue_size,
+        scan_workers = args.scan_workers,
+        metrics_interval = args.metrics_interval,
+        log_level = args.log_level,
+        quiet = args.quiet,
+        abort_ratio = args.abort_ratio,
+        segment_duration = args.segment_duration,
+        segment_time = args.segment_time,
+        segment_workers = args.segment_workers,
+        min_expected_savings = args.min_expected_savings
     )
 except ValidationError as e:
     print(e)
@@ -55,58 +97,86 @@ config: str
 with open('config.json', 'r') as file:
     config = json.load(file)
 
-google_auth = GoogleAuth(**config['google_auth'])
-google_photos = GooglePhotos(**config.get('google_photos', {}))
-tools = Tool(**config['tool'])
-
-
-# File Generation
-folder_path = FileManager.generate_folder_structure(name=args.name)
-log_file = FileManager.generate_file("log", folder_path, extension="txt")
-failed_media_folder = FileManager.generate_folder_single("failed_media", folder_path)
-temp_media_folder = FileManager.generate_folder_single("temp_media", folder_path)
-optimized_media_folder = FileManager.generate_folder_single("optimized_media", folder_path)
-raw_media_folder = FileManager.generate_folder_single("raw_media", folder_path)
-uploaded_media_folder = FileManager.generate_folder_single("uploaded_media", folder_path)
-failed_upload_media_folder = FileManager.generate_folder_single("failed_upload_media", folder_path)
-path_manager = PathManager(folder_path, log_file, failed_media_folder, temp_media_folder, optimized_media_folder, raw_media_folder, uploaded_media_folder, failed_upload_media_folder)
-
-# Init Manager
-google_api_manager = GoogleAPIManager(
-    client_secret_file=google_auth.file_path.client_secret_file,
-    token_file=google_auth.file_path.token_file,
-    validate_token_url=google_auth.google_api.validate_token_url,
-    media_upload_url=google_auth.google_api.media_upload_url,
-    media_create_url=google_auth.google_api.media_create_url,
-    token_scopes=[google_auth.scope.appendonly]
-)
-
-media_optimizer = MediaOptimizer(
-    ffmpeg=tools.ffmpeg, ffprobe=tools.ffprobe,
-    exiftool=tools.exiftool, xmp_config=tools.config.exiftool_config
-)
-
-# Validate Tools
-exiftool = media_optimizer.get_exiftool_version
-ffmpeg = media_optimizer.get_ffmpeg_version
-ffprobe = media_optimizer.get_ffprobe_version
-
-
-# Setup Dependency Injection
+
+# File Generation (a resumed run keeps writing into its previous folder)
+if args.resume:
+    folder_path = Path(args.resume)
+    if not folder_path.is_dir():
+        print(f"Resume folder not found: {folder_path}")
+        sys.exit(1)
+else:
+    folder_path = FileManager.generate_folder_structure(name=args.name)
+log_file = FileManager.generate_file("log", folder_path, extension="jsonl")
+logger.configure(level=args.log_level, console=not args.quiet)
+
+
+# Builders (run on first use only)
+def _build_path_manager():
+    # output folders are created by PathManager when first used
+    return PathManager(
+        folder_path, log_file,
+        folder_path / "failed_media", folder_path / "temp_media", folder_path / "optimized_media",
+        folder_path / "raw_media", folder_path / "uploaded_media", folder_path / "failed_upload_media",
+        folder_path / "downloaded_media", folder_path / "renditions"
+    )
+
+def _build_upload_scheduler(google_photos: GooglePhotos, storage: Storage):
+    return UploadScheduler(
+        requests_per_second=google_photos.requests_per_second,
+        burst=google_photos.request_burst,
+        bandwidth=google_photos.bandwidth_mbps * 1000 * 1000 / 8 if google_photos.bandwidth_mbps else None,
+        max_retries=google_photos.max_retries,
+        daily_request_limit=google_photos.daily_request_quota,
+        daily_byte_limit=int(google_photos.daily_upload_quota_gb * 1024 ** 3) if google_photos.daily_upload_quota_gb else None,
+        quota_file=storage.quota_file,
+        on_throttle=lambda reason, delay: log_message(f"Upload throttled ({reason}), waiting {delay:.1f}s", log_file, "WARNING")
+    )
+
+def _build_google_api_manager(google_auth: GoogleAuth, google_photos: GooglePhotos, upload_scheduler: UploadScheduler):
+    from components.google_api_manager import GoogleAPIManager   # google libraries are only loaded for uploads
+    return GoogleAPIManager(
+        client_secret_file=google_auth.file_path.client_secret_file,
+        token_file=google_auth.file_path.token_file,
+        validate_token_url=google_auth.google_api.validate_token_url,
+        media_upload_url=google_auth.google_api.media_upload_url,
+        media_create_url=google_auth.google_api.media_create_url,
+        token_scopes=[scope for scope in (google_auth.scope.appendonly, google_auth.scope.readonly) if scope],
+        media_list_url=google_auth.google_api.media_list_url,
+        pool_size=max(1, args.upload_workers or 1, args.download_workers or 1),
+        chunk_size=google_photos.chunk_size_mb * 1024 * 1024,
+        resumable_threshold=google_photos.resumable_threshold_mb * 1024 * 1024,
+        scheduler=upload_scheduler
+    )
+
+def _build_tool_registry(tools: Tool, storage: Storage):
+    return ToolRegistry(ffmpeg=tools.ffmpeg, ffprobe=tools.ffprobe, exiftool=tools.exiftool, cache_file=storage.tool_cache_file)
+
+def _build_media_optimizer(tools: Tool, tool_registry: ToolRegistry):
+    # Validate Tools (cached on disk until a binary changes)
+    tool_registry.validate()
+    return MediaOptimizer(
+        ffmpeg=tools.ffmpeg, ffprobe=tools.ffprobe,
+        exiftool=tools.exiftool, xmp_config=tools.config.exiftool_config,
+        stream_groups=tool_registry.ffprobe_stream_groups
+    )
+
+def _build_metrics_manager(storage: Storage):
+    return MetricsManager(Path(storage.metrics_dir) if storage.metrics_dir else folder_path, args.metrics_interval)
+
+
+# Setup Dependency Injection (lazy, every manager is built on first call, e.g. container.media_optimizer())
 class Container(containers.DeclarativeContainer):
-    path_manager = providers.Singleton(PathManager)
-    google_api_manager = providers.Singleton(GoogleAPIManager)
-    media_optimizer = providers.Singleton(MediaOptimizer)
-    google_auth = providers.Singleton(GoogleAuth)
-    google_photos = providers.Singleton(GooglePhotos)
-    tools = providers.Singleton(Tool)
-    args = providers.Singleton(Argument)
+    args = providers.Object(args_model)
+    google_auth = providers.Singleton(GoogleAuth, **config['google_auth'])
+    google_photos = providers.Singleton(GooglePhotos, **config.get('google_photos', {}))
+    tools = providers.Singleton(Tool, **config['tool'])
+    storage = providers.Singleton(Storage, **config.get('storage', {}))
+    renditions = providers.Singleton(Renditions, **config.get('renditions', {}))
+    path_manager = providers.Singleton(_build_path_manager)
+    upload_scheduler = providers.Singleton(_build_upload_scheduler, google_photos, storage)
+    google_api_manager = providers.Singleton(_build_google_api_manager, google_auth, google_photos, upload_scheduler)
+    tool_registry = providers.Singleton(_build_tool_registry, tools, storage)
+    media_optimizer = providers.Singleton(_build_media_optimizer, tools, tool_registry)
+    metrics_manager = providers.Singleton(_build_metrics_manager, storage)
 
 container = Container()
-container.path_manager = path_manager
-container.google_api_manager = google_api_manager
-container.media_optimizer = media_optimizer
-container.google_auth = google_auth
-container.google_photos = google_photos
-container.tools = tools
-container.args = args_model
@@ -1,12 +1,120 @@
+import os
 import threading
-import time
+from typing import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from classes.job_context import JobContext
 
-# Get the number of active threads
-print(f"Active Threads: {threading.active_count()}")
 
-# List all running threads
-for thread in threading.enumerate():
-    print(thread.name)
+class ThreadManager:
+    """
+    Runs jobs on a bounded worker pool and shares an ffmpeg thread budget between them.
 
+    Every job receives its own JobContext, so subprocesses and progress bars are tracked
+    per job. Ctrl-C (or interrupt()) while waiting on the jobs cancels the running jobs only;
+    the remaining items keep going, matching the single-threaded behaviour of the optimizer.
+    Ctrl-C while the next item is pulled or submitted also stops the pull and drops the
+    submitted jobs that have not started yet.
+    """
 
-# in-progress
\ No newline at end of file
+    def __init__(self, workers: int = 1, threads: int = None):
+        """
+        Args:
+            workers (int): Number of jobs running at the same time (Default: 1).
+            threads (int): Total ffmpeg thread budget shared by all workers (Default: cpu count,
+                           a single worker then leaves the thread count to ffmpeg).
+        """
+        self._workers: int = max(1, workers or 1)
+        self._threads: int = max(1, threads) if threads else None
+        self._interrupted: bool = False
+        self._active: set[JobContext] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        return self._workers
+
+    @property
+    def threads_per_worker(self):
+        """
+        ffmpeg -threads value for each worker so the pool never oversubscribes the cpu,
+        None when a single worker has the whole cpu and ffmpeg can pick its own.
+        """
+        if self._threads is None and self._workers == 1:
+            return None
+        return max(1, (self._threads or os.cpu_count() or 1) // self._workers)
+
+    @property
+    def interrupted(self):
+        return self._interrupted
+
+    def interrupt(self):
+        """
+        Cancel every job that is currently running.
+        """
+        self._interrupted = True
+        with self._lock:
+            jobs = list(self._active)
+        for job in jobs:
+            job.cancel()
+
+    def _execute(self, func: Callable, item):
+        job = JobContext(threads=self.threads_per_worker)
+        with self._lock:
+            self._active.add(job)
+        try:
+            return func(item, job)
+        except KeyboardInterrupt:
+            job.cancel()
+            return None
+        finally:
+            with self._lock:
+                self._active.discard(job)
+            if job.cancelled:
+                self._interrupted = True
+
+    def _wait(self, pending: set, return_when: str):
+        while True:
+            try:
+                return wait(pending, return_when=return_when)
+            except KeyboardInterrupt:
+                self.interrupt()
+
+    def run(self, func: Callable, items: Iterable):
+        """
+        Run func(item, job) for every item.
+
+        Items are pulled lazily, so a generator can keep producing while earlier items run.
+
+        Args:
+            func (Callable): Job function receiving the item and its JobContext.
+            items (Iterable): Items to process.
+
+        Returns:
+            list: Results of the job function, in completion order.
+        """
+        results = []
+        if self._workers == 1:
+            try:
+                for item in items:
+                    results.append(self._execute(func, item))
+            except KeyboardInterrupt:
+                self.interrupt()   # while pulling the next item (jobs catch their own)
+            return results
+
+        with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="worker") as executor:
+            pending = set()
+            try:
+                for item in items:
+                    # Keep only a small backlog of submitted jobs
+                    if len(pending) >= self._workers * 2:
+                        done, pending = self._wait(pending, FIRST_COMPLETED)
+                        results.extend(future.result() for future in done)
+                    pending.add(executor.submit(self._execute, func, item))
+            except KeyboardInterrupt:
+                # while pulling or submitting: drop the backlog first, then cancel the running jobs
+                pending = {future for future in pending if not future.cancel()}
+                self.interrupt()
+
+            done, _ = self._wait(pending, ALL_COMPLETED)
+            results.extend(future.result() for future in done)
+        return results
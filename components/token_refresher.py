@@ -0,0 +1,76 @@
+import threading
+from datetime import datetime, timedelta, UTC
+from typing import Callable
+from google.oauth2.credentials import Credentials
+
+# Refresh the access token this long before it expires
+TOKEN_REFRESH_SKEW = timedelta(minutes=5)
+
+
+class TokenRefresher:
+    """
+    Keeps the access token of shared credentials fresh for concurrent requests.
+
+    The expiry is trusted locally, so no request is made while the token is fresh. When it is about
+    to expire one caller refreshes it while the others wait for that refresh. A 401 is validated
+    remotely only when no other thread refreshed the token since the rejected request was sent.
+    """
+
+    def __init__(self,
+        get_credentials: Callable[[], Credentials],
+        refresh: Callable[[], None],
+        is_token_active: Callable[[], bool],
+        skew: timedelta = TOKEN_REFRESH_SKEW
+    ):
+        """
+        Args:
+            get_credentials (Callable[[], Credentials]): Current credentials (they may be replaced by refresh).
+            refresh (Callable[[], None]): Refreshes the token, or authorizes again.
+            is_token_active (Callable[[], bool]): Validates the current token remotely.
+            skew (timedelta): Refresh this long before the expiry.
+        """
+        self._get_credentials = get_credentials
+        self._refresh = refresh
+        self._is_token_active = is_token_active
+        self._skew: timedelta = skew
+        self._lock = threading.Lock()
+
+    def expiring(self):
+        """
+        True when the token is missing or expires within the skew.
+        """
+        creds = self._get_credentials()
+        if not creds or not creds.token:
+            return True
+        if creds.expiry is None:
+            return False
+        # google-auth keeps expiry as a naive UTC datetime
+        return creds.expiry - self._skew <= datetime.now(UTC).replace(tzinfo=None)
+
+    def ensure_valid(self):
+        """
+        Refresh the token shortly before it expires, concurrent callers share one refresh.
+
+        Returns:
+            bool: True when token is valid.
+        """
+        if not self.expiring():
+            return True
+        with self._lock:
+            if self.expiring():
+                self._refresh()
+        return True
+
+    def on_unauthorized(self, used_token: str):
+        """
+        Called after a request was rejected with 401 Unauthorized.
+
+        Args:
+            used_token (str): Access token the rejected request was sent with.
+        """
+        with self._lock:
+            creds = self._get_credentials()
+            if creds and creds.token != used_token:
+                return   # refreshed in the meantime
+            if not self._is_token_active():
+                self._refresh()
@@ -0,0 +1,165 @@
+import os
+import re
+import json
+import shutil
+import threading
+import subprocess
+from pathlib import Path
+
+
+class ToolRegistry:
+    """
+    Versions and capabilities (encoders, pixel formats, muxers) of ffmpeg, ffprobe and exiftool.
+
+    Every tool is probed once, and the results are cached on disk keyed by the binary's resolved
+    path and mtime, so later runs don't spawn the tools at all until a binary is replaced.
+    """
+
+    def __init__(self, ffmpeg: str = "ffmpeg", ffprobe: str = "ffprobe", exiftool: str = "exiftool", cache_file: str = None):
+        """
+        Args:
+            ffmpeg (str): Path to the ffmpeg executable.
+            ffprobe (str): Path to the ffprobe executable.
+            exiftool (str): Path to the exiftool executable.
+            cache_file (str): JSON file keeping the probe results between runs, None for memory only.
+        """
+        self._ffmpeg: str = ffmpeg
+        self._ffprobe: str = ffprobe
+        self._exiftool: str = exiftool
+        self._cache_file = Path(cache_file) if cache_file else None
+        self._lock = threading.Lock()
+        self._cache: dict[str, dict] = self._load()
+        self._signatures: dict[str, str] = {}   # binaries are not replaced while the process runs
+
+    #region Cache
+    def _load(self):
+        if not self._cache_file:
+            return {}
+        try:
+            with open(self._cache_file, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self._cache_file:
+            return
+        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._cache_file.with_suffix(self._cache_file.suffix + ".tmp")
+        with open(temp, "w") as file:
+            json.dump(self._cache, file, indent=2)
+        os.replace(temp, self._cache_file)
+
+    def _signature(self, executable: str):
+        """
+        Resolved path and mtime of the binary, the cache key of everything probed from it.
+        Resolved once per executable for the lifetime of the process.
+        """
+        signature = self._signatures.get(executable)
+        if signature is None:
+            signature = self._signatures[executable] = self._resolve(executable)
+        return signature
+
+    @staticmethod
+    def _resolve(executable: str):
+        path = shutil.which(executable) or executable
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Executable not found: {executable}")
+        resolved = os.path.realpath(path)
+        return f"{resolved}|{os.stat(resolved).st_mtime_ns}"
+
+    def _probe(self, executable: str, name: str, args: list[str], parse):
+        signature = self._signature(executable)
+        entry = self._cache.get(signature)
+        if entry and name in entry:
+            return entry[name]   # probed already, no lock needed to read it
+        with self._lock:
+            entry = self._cache.get(signature, {})
+            if name in entry:
+                return entry[name]
+
+            result = subprocess.run([executable, *args], capture_output=True, text=True, errors="replace")
+            entry[name] = parse(result.stdout)
+            self._cache[signature] = entry
+            self._save()
+            return entry[name]
+    #endregion
+
+    #region Parse
+    @staticmethod
+    def extract_version(text: str):
+        match = re.search(r'version\s+n?([\d.]+)', text)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _parse_list(text: str, separator: str):
+        """
+        Rows of an ffmpeg listing (-encoders, -pix_fmts, -muxers) below its separator line,
+        as {name: flags}.
+        """
+        rows = {}
+        listing = False
+        for line in text.splitlines():
+            if not listing:
+                listing = line.strip().startswith(separator)
+                continue
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            for name in parts[1].split(","):
+                rows[name] = parts[0]
+        return rows
+    #endregion
+
+    #region Version
+    @property
+    def ffmpeg_version(self):
+        return self._probe(self._ffmpeg, "version", ["-version"], lambda out: f"ffmpeg-{self.extract_version(out)}")
+
+    @property
+    def ffprobe_version(self):
+        return self._probe(self._ffprobe, "version", ["-version"], lambda out: f"ffprobe-{self.extract_version(out)}")
+
+    @property
+    def exiftool_version(self):
+        return self._probe(self._exiftool, "version", ["-ver"], lambda out: f"exiftool-{out.strip()}")
+
+    @property
+    def ffprobe_stream_groups(self):
+        """ffprobe 7.0+ describes stream groups (HEIF tile grids), older builds reject -show_stream_groups."""
+        major = self.ffprobe_version.removeprefix("ffprobe-").split(".")[0]
+        return major.isdigit() and int(major) >= 7
+    #endregion
+
+    #region Capabilities
+    @property
+    def encoders(self):
+        """{encoder: flags}, the first flag is the type (V, A or S)."""
+        return self._probe(self._ffmpeg, "encoders", ["-hide_banner", "-encoders"], lambda out: self._parse_list(out, "------"))
+
+    @property
+    def pix_fmts(self):
+        return self._probe(self._ffmpeg, "pix_fmts", ["-hide_banner", "-pix_fmts"], lambda out: self._parse_list(out, "-----"))
+
+    @property
+    def muxers(self):
+        return self._probe(self._ffmpeg, "muxers", ["-hide_banner", "-muxers"], lambda out: self._parse_list(out, "--"))
+
+    def has_encoder(self, codec: str, kind: str = "V"):
+        flags = self.encoders.get(codec)
+        return bool(flags) and flags.startswith(kind)
+
+    def validate(self, *codecs: str):
+        """
+        Check that every tool runs and that the output codecs (image, video, renditions...)
+        exist in this ffmpeg build.
+
+        Raises:
+            FileNotFoundError: If an executable is missing.
+            ValueError: If an encoder is not available.
+        """
+        self.exiftool_version, self.ffprobe_version, self.ffmpeg_version
+        missing = [codec for codec in dict.fromkeys(codecs) if codec and not self.has_encoder(codec)]
+        if missing:
+            raise ValueError(f"Encoder not available in {self.ffmpeg_version}: {', '.join(missing)} (see `ffmpeg -encoders`)")
+    #endregion
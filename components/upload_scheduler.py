@@ -0,0 +1,222 @@
+import os
+import json
+import time
+import random
+import threading
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from pathlib import Path
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+# Responses worth another attempt after a pause
+RETRY_STATUS = {HTTPStatus.TOO_MANY_REQUESTS, HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.BAD_GATEWAY,
+                HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT}
+# Google API daily quotas reset at midnight Pacific Time
+QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+
+class UploadScheduler:
+    """
+    Paces the upload requests sent to Google.
+
+    A token bucket limits the request rate (with bursts), a second bucket optionally caps the
+    bandwidth in bytes per second. Responses with 429/5xx are retried with exponential backoff and
+    jitter, or after the server's Retry-After when it sends one. Requests and bytes sent per day are
+    counted in a file, so a long job waits for the next quota day instead of getting banned.
+    """
+
+    def __init__(self,
+        requests_per_second: float = 5,
+        burst: int = 10,
+        bandwidth: float = None,
+        max_retries: int = 6,
+        backoff: float = 1.0,
+        max_backoff: float = 120,
+        daily_request_limit: int = None,
+        daily_byte_limit: int = None,
+        quota_file: str = None,
+        on_throttle: Callable[[str, float], None] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        Args:
+            requests_per_second (float): Sustained request rate, None for no limit.
+            burst (int): Requests allowed at once after an idle period.
+            bandwidth (float): Maximum bytes per second, None for no cap.
+            max_retries (int): Retries of a request answered with 429/5xx.
+            backoff (float): First backoff in seconds, doubled on every retry.
+            max_backoff (float): Upper bound of a single backoff.
+            daily_request_limit (int): Requests allowed per quota day, None for no limit.
+            daily_byte_limit (int): Bytes allowed per quota day, None for no limit.
+            quota_file (str): JSON file keeping the daily counters between runs.
+            on_throttle (Callable[[str, float], None]): Told the reason and seconds of every long wait.
+            clock (Callable[[], float]): Monotonic clock (replaceable in tests).
+            sleep (Callable[[float], None]): Sleep function (replaceable in tests).
+        """
+        self._rate: float = requests_per_second
+        self._burst: float = max(1, burst)
+        self._bandwidth: float = bandwidth
+        self._max_retries: int = max_retries
+        self._backoff: float = backoff
+        self._max_backoff: float = max_backoff
+        self._daily_request_limit: int = daily_request_limit
+        self._daily_byte_limit: int = daily_byte_limit
+        self._quota_file = Path(quota_file) if quota_file else None
+        self._on_throttle = on_throttle
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        now = clock()
+        self._request_tokens: float = self._burst
+        self._request_time: float = now
+        self._byte_tokens: float = bandwidth or 0
+        self._byte_time: float = now
+        self._quota: dict = self._load_quota()
+
+    #region Quota
+    @staticmethod
+    def _quota_day():
+        return datetime.now(QUOTA_TIMEZONE).date().isoformat()
+
+    @staticmethod
+    def _seconds_to_next_day():
+        now = datetime.now(QUOTA_TIMEZONE)
+        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (tomorrow - now).total_seconds()
+
+    def _load_quota(self):
+        quota = {"day": self._quota_day(), "requests": 0, "bytes": 0}
+        if self._quota_file:
+            try:
+                with open(self._quota_file, "r") as file:
+                    stored = json.load(file)
+                if stored.get("day") == quota["day"]:
+                    quota.update(stored)
+            except (OSError, ValueError):
+                pass
+        return quota
+
+    def _save_quota(self):
+        if not self._quota_file:
+            return
+        self._quota_file.parent.mkdir(parents=True, exist_ok=True)
+        temp = self._quota_file.with_suffix(self._quota_file.suffix + ".tmp")
+        with open(temp, "w") as file:
+            json.dump(self._quota, file)
+        os.replace(temp, self._quota_file)
+
+    @property
+    def quota(self):
+        """Requests and bytes counted for the current quota day."""
+        with self._lock:
+            return dict(self._quota)
+
+    def _quota_exceeded(self, nbytes: int):
+        if self._quota["day"] != self._quota_day():
+            self._quota = {"day": self._quota_day(), "requests": 0, "bytes": 0}
+        if self._daily_request_limit is not None and self._quota["requests"] + 1 > self._daily_request_limit:
+            return "daily request quota"
+        if self._daily_byte_limit is not None and self._quota["bytes"] + nbytes > self._daily_byte_limit:
+            return "daily byte quota"
+        return None
+    #endregion
+
+    #region Pacing
+    def _reserve(self, nbytes: int):
+        """
+        Take a request token and nbytes of bandwidth, return how long the caller must wait first.
+        Tokens may go negative: the debt is the wait, so callers are served in arrival order.
+        """
+        now = self._clock()
+        wait = 0.0
+        if self._rate:
+            self._request_tokens = min(self._burst, self._request_tokens + (now - self._request_time) * self._rate)
+            self._request_time = now
+            self._request_tokens -= 1
+            if self._request_tokens < 0:
+                wait = -self._request_tokens / self._rate
+        if self._bandwidth and nbytes:
+            self._byte_tokens = min(self._bandwidth, self._byte_tokens + (now - self._byte_time) * self._bandwidth)
+            self._byte_time = now
+            self._byte_tokens -= nbytes
+            if self._byte_tokens < 0:
+                wait = max(wait, -self._byte_tokens / self._bandwidth)
+        return wait
+
+    def acquire(self, nbytes: int = 0):
+        """
+        Block until a request of nbytes may be sent, and count it in the daily quota.
+
+        Raises:
+            ValueError: If nbytes alone exceeds the daily byte quota (no quota day would let it pass).
+        """
+        if self._daily_byte_limit is not None and nbytes > self._daily_byte_limit:
+            raise ValueError(f"Request of {nbytes} bytes exceeds the daily byte quota of {self._daily_byte_limit} bytes.")
+        while True:
+            with self._lock:
+                reason = self._quota_exceeded(nbytes)
+                if not reason:
+                    wait = self._reserve(nbytes)
+                    self._quota["requests"] += 1
+                    self._quota["bytes"] += nbytes
+                    self._save_quota()
+                    break
+            delay = self._seconds_to_next_day()
+            if self._on_throttle:
+                self._on_throttle(reason, delay)
+            self._sleep(delay)
+        if wait > 0:
+            self._sleep(wait)
+
+    @staticmethod
+    def parse_retry_after(value: str):
+        """
+        Retry-After header (seconds or HTTP date) in seconds, None when missing or invalid.
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, (parsedate_to_datetime(value) - datetime.now(tz=ZoneInfo("UTC"))).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def backoff_delay(self, attempt: int, retry_after: str = None):
+        """
+        Seconds to wait before retry number `attempt` (0 based): Retry-After when given,
+        otherwise exponential backoff with jitter.
+        """
+        delay = self.parse_retry_after(retry_after)
+        if delay is not None:
+            return delay
+        cap = min(self._max_backoff, self._backoff * 2 ** attempt)
+        return cap / 2 + random.uniform(0, cap / 2)
+
+    def call(self, request: Callable, nbytes: int = 0):
+        """
+        Send a request under the rate limits, retrying 429/5xx responses.
+
+        Args:
+            request (Callable): Sends the request and returns its response (must be safe to call again).
+            nbytes (int): Bytes sent by the request, counted against the bandwidth cap and byte quota.
+
+        Returns:
+            Response: The first response that is not retried (or the last one).
+        """
+        for attempt in range(self._max_retries + 1):
+            self.acquire(nbytes)
+            response = request()
+            if response.status_code not in RETRY_STATUS or attempt == self._max_retries:
+                return response
+            delay = self.backoff_delay(attempt, response.headers.get("Retry-After"))
+            if self._on_throttle:
+                self._on_throttle(f"HTTP {response.status_code}", delay)
+            self._sleep(delay)
+    #endregion
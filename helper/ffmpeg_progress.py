@@ -0,0 +1,64 @@
+from classes.encode_progress import EncodeProgress
+
+class FFmpegProgressParser:
+    """
+    Parser of ffmpeg's `-progress` output: blocks of key=value lines, each block closed by
+    `progress=continue` (or `progress=end` for the last one).
+
+    Lines are only split on "=", no pattern matching runs per line.
+    """
+
+    def __init__(self, duration: float = None):
+        """
+        Args:
+            duration (float): Seconds to encode in total, used for ratio, ETA and projections.
+        """
+        self._duration: float = duration
+        self._values: dict[str, str] = {}
+
+    def feed(self, line: str):
+        """
+        Add one line of progress output.
+
+        Returns:
+            EncodeProgress | None: The event of the block the line closes, None otherwise.
+        """
+        key, separator, value = line.strip().partition("=")
+        if not separator:
+            return None
+        if key != "progress":
+            self._values[key] = value
+            return None
+        values, self._values = self._values, {}
+        return self.event(values, self._duration, value == "end")
+
+    @staticmethod
+    def _number(value: str, cast=float, suffix: str = ""):
+        # "N/A" (nothing encoded yet) and garbage are None
+        if value is None:
+            return None
+        try:
+            return cast(value.strip().removesuffix(suffix))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def event(values: dict[str, str], duration: float = None, finished: bool = False):
+        """
+        EncodeProgress from the key=value pairs of one block.
+        """
+        number = FFmpegProgressParser._number
+        # out_time_ms is in microseconds as well (ffmpeg quirk)
+        out_time_us = number(values.get("out_time_us"), int)
+        if out_time_us is None:
+            out_time_us = number(values.get("out_time_ms"), int)
+        return EncodeProgress(
+            frame=number(values.get("frame"), int) or 0,
+            fps=number(values.get("fps")) or 0.0,
+            bitrate=number(values.get("bitrate"), suffix="kbits/s"),
+            total_size=number(values.get("total_size"), int) or 0,
+            out_time=max(0, out_time_us or 0) / 1_000_000,
+            speed=number(values.get("speed"), suffix="x"),
+            duration=duration,
+            finished=finished
+        )
@@ -0,0 +1,46 @@
+import queue
+import threading
+from typing import Callable, Iterable
+
+class Pipeline:
+    """
+    A producer and a consumer running at the same time, connected by a bounded queue.
+
+    The producer runs in the calling thread (so Ctrl-C reaches it) and hands over every item with
+    the put function, which blocks while the queue is full. The consumer runs in its own thread and
+    iterates the items until the producer is done. Whatever the consumer leaves (e.g. after a
+    failure) is drained, so the producer is never left blocked on a full queue.
+    """
+
+    @staticmethod
+    def _drain(items: queue.Queue):
+        # Yield queued items until the end marker (None)
+        while (item := items.get()) is not None:
+            yield item
+
+    @staticmethod
+    def run(produce: Callable[[Callable], None], consume: Callable[[Iterable], None], queue_size: int = 1, name: str = "consumer"):
+        """
+        Args:
+            produce (Callable[[Callable], None]): Called with the put function of the queue.
+            consume (Callable[[Iterable], None]): Called with the items, as they are produced.
+            queue_size (int): Items waiting for the consumer before the producer is paused.
+            name (str): Name of the consumer thread.
+        """
+        items = queue.Queue(maxsize=max(1, queue_size or 1))
+        pending = Pipeline._drain(items)
+
+        def consumer():
+            try:
+                consume(pending)
+            finally:
+                for _ in pending:   # never leave the producer blocked on a full queue
+                    pass
+
+        thread = threading.Thread(target=consumer, name=name)
+        thread.start()
+        try:
+            produce(items.put)
+        finally:
+            items.put(None)
+            thread.join()
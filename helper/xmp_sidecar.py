@@ -0,0 +1,59 @@
+import os
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+# Namespace of the custom tags (registered for exiftool in .exiftool_config)
+NAMESPACE = "https://xandeyong.github.io/project/mediaoptimizer/ns/1.0/"
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+
+class XmpSidecar:
+    """
+    XMP sidecar (<media>.xmp) holding mediaoptimizer tags, so they can be attached to a file
+    without rewriting the file itself.
+    """
+
+    @staticmethod
+    def path(media: Path):
+        return media.with_name(media.name + ".xmp")
+
+    @staticmethod
+    def write(media: Path, tags: dict[str, str]):
+        """
+        Write the tags to the media's sidecar (replacing an existing one).
+        """
+        properties = "\n".join(f"   <mediaoptimizer:{tag}>{escape(str(value))}</mediaoptimizer:{tag}>" for tag, value in tags.items())
+        packet = (
+            '<?xpacket begin="﻿" id="W5M0MpCehiHzreSzNTczkc9d"?>\n'
+            '<x:xmpmeta xmlns:x="adobe:ns:meta/">\n'
+            f' <rdf:RDF xmlns:rdf="{RDF}">\n'
+            f'  <rdf:Description rdf:about="" xmlns:mediaoptimizer="{NAMESPACE}">\n'
+            f'{properties}\n'
+            '  </rdf:Description>\n'
+            ' </rdf:RDF>\n'
+            '</x:xmpmeta>\n'
+            '<?xpacket end="w"?>\n'
+        )
+        sidecar = XmpSidecar.path(media)
+        temp = sidecar.with_name(sidecar.name + ".tmp")
+        with open(temp, "w", encoding="utf-8") as file:
+            file.write(packet)
+        os.replace(temp, sidecar)
+        return sidecar
+
+    @staticmethod
+    def read(media: Path):
+        """
+        Tags of the media's sidecar, empty when there is none (or it can't be parsed).
+        """
+        sidecar = XmpSidecar.path(media)
+        try:
+            root = ET.parse(sidecar).getroot()
+        except (OSError, ET.ParseError):
+            return {}
+        prefix = f"{{{NAMESPACE}}}"
+        return {
+            element.tag.removeprefix(prefix): element.text or ""
+            for element in root.iter()
+            if element.tag.startswith(prefix)
+        }
@@ -4,13 +4,14 @@ from classes.argument import Argument
 from classes.google_auth import GoogleAuth
 from classes.path_manager import PathManager
 from components.file_manager import FileManager
+from helper.pipeline import Pipeline
 from pathlib import Path
 from constants.media_mime_types import IMAGE_EXT, VIDEO_EXT
 
 # Injecting dependency
-args: Argument = container.args
-path_manager: PathManager = container.path_manager
-google_auth: GoogleAuth = container.google_auth
+args: Argument = container.args()
+path_manager: PathManager = container.path_manager()
+google_auth: GoogleAuth = container.google_auth()
 
 def set_supported_ext(extensions: list[str]):
     image_ext = []
@@ -39,6 +40,54 @@ def set_supported_ext(extensions: list[str]):
     
     return image_ext, video_ext
 
+def discover_media(source: Path, image_ext: list[str], video_ext: list[str], report_every: int = 1000):
+    """
+    Stream media files from the source while reporting the counts as the scan goes.
+    """
+    image_count = 0
+    video_count = 0
+    for media, media_type in FileManager.iter_media_files(source, image_ext, video_ext, args.media, args.scan_workers or 1):
+        if media_type == "image":
+            image_count += 1
+        else:
+            video_count += 1
+
+        if (image_count + video_count) % report_every == 0:
+            log_message(f"Discovered files: {image_count + video_count}, image: {image_count}, video: {video_count}", path_manager.log)
+        yield media
+
+    log_message(f"Total files: {image_count + video_count}, image: {image_count}, video: {video_count}", path_manager.log)
+
+def optimize_and_upload(media_files):
+    """
+    Operation 0 as a pipeline: every optimized file is uploaded while the next ones encode.
+    The upload queue is bounded, a full queue pauses the optimizer workers.
+    """
+    from modules.optimizer import process_medias
+    from modules.upload_files import upload_all_medias
+
+    Pipeline.run(
+        lambda put: process_medias(media_files, on_success=put),
+        upload_all_medias,
+        args.upload_queue_size,
+        name="uploader"
+    )
+
+def download_and_optimize():
+    """
+    Operation 3 as a pipeline: every downloaded file is optimized while the next ones download.
+    The optimizer queue is bounded, a full queue pauses the download workers.
+    """
+    from modules.optimizer import process_medias
+    from modules.download_files import download_all_medias
+
+    Pipeline.run(
+        lambda put: download_all_medias(on_download=put),
+        lambda medias: process_medias(medias, streamed=True),
+        args.download_queue_size,
+        name="optimizer"
+    )
+
 # MAIN
 if __name__ == "__main__":
     # Start Application
@@ -47,31 +96,32 @@ if __name__ == "__main__":
         log_message(f"Log file path: {path_manager.log}", path_manager.log)
         log_message(f"Args: {args.model_dump_json()}", path_manager.log)
 
-        # Perform Download
-        # from modules.download_files import google_download
-        # google_download()
-
-        source = args.source
-        if source is None:
-            source = input("Enter the folder path: ")
-        log_message(f"Source: {source}", path_manager.log)
+        # Perform Download and Optimize (no source folder)
+        if args.operation == 3:
+            download_and_optimize()
+        else:
+            source = args.source
+            if source is None:
+                source = input("Enter the folder path: ")
+            log_message(f"Source: {source}", path_manager.log)
         
-        # Filter media
-        image_ext, video_ext = set_supported_ext(args.extension)
-        media_files, image_count, video_count = FileManager.collect_media_files(Path(source), image_ext, video_ext, args.media)
-
-        # print(media_files)
-        log_message(f"Total files: {len(media_files)}, image: {image_count}, video: {video_count}", path_manager.log)
-
-        # Perform Optimize
-        if args.operation in (0, 1):
-            from modules.optimizer import process_medias
-            process_medias(media_files)
-
-        # Perform Upload
-        if args.operation in (0, 2):
-            from modules.upload_files import upload_all_medias
-            upload_all_medias(media_files if args.operation == 2 else [])
+            # Filter media (streamed, optimization starts on the first file found)
+            image_ext, video_ext = set_supported_ext(args.extension)
+            media_files = discover_media(Path(source), image_ext, video_ext)
+
+            # Perform Optimize and Upload (pipelined)
+            if args.operation == 0:
+                optimize_and_upload(media_files)
+
+            # Perform Optimize
+            if args.operation == 1:
+                from modules.optimizer import process_medias
+                process_medias(media_files)
+
+            # Perform Upload
+            if args.operation == 2:
+                from modules.upload_files import upload_all_medias
+                upload_all_medias(list(media_files))
 
     except Exception as e:
         log_message(f"{e}", path_manager.log)
@@ -1,91 +1,119 @@
+import threading
 from mediaoptimizer import container
-from classes.google_auth import GoogleAuth
+from classes.argument import Argument
+from classes.google_photos import GooglePhotos
 from classes.path_manager import PathManager
+from classes.job_context import JobContext
+from components.google_api_manager import GoogleAPIManager
+from components.thread_manager import ThreadManager
 from components.my_logging import log_message
-from modules.optimizer import process_medias
-import requests
-import threading
-import time
-from PIL import Image
-from constants.media_mime_types import MEDIA_MIME_TYPES
-
-
-# # Injecting dependency
-path_manager: PathManager = container.path_manager
-google_auth: GoogleAuth = container.google_auth
-
-# Set up API credentials
-ACCESS_TOKEN = google_auth.scope.readonly.token
-HEADERS = {"Authorization": f"Bearer {ACCESS_TOKEN}"}
-GOOGLE_API = google_auth.google_api.media_fetch_url
-
-# variables
+from helper.timespan_logger import TimeSpanLogger
+from helper.extension_helper import ExtensionHelper
+from helper.xmp_sidecar import XmpSidecar
+from pathlib import Path
+from typing import Callable
+
+# Injecting dependency
+path_manager: PathManager = container.path_manager()
+google_api_manager: GoogleAPIManager = container.google_api_manager()
+google_photos: GooglePhotos = container.google_photos()
+args: Argument = container.args()
+
+# Variables
 count_success = 0
+count_skipped = 0
 count_failed = 0
-
-# Function to fetch media items
-def fetch_media():
-    log_message("Starting API call...", path_manager.log)
-    response = requests.get(url=GOOGLE_API, headers=HEADERS)
-    log_message("API call completed.", path_manager.log)
-
-    if response.status_code == 200:
-        log_message("Fetch media API success.", path_manager.log)
-        with open(f"{path_manager.root}/media_content.json", "w") as file:
-            file.write(response.text)
-        return response.json().get("mediaItems", [])
-    else:
-        log_message(f"Fetch media API failed with status: {response.status_code}", path_manager.log)
-        return []
-
-# Function to download media
-def download_media(media_items):
-    global count_success, count_failed
-
-    log_message("Starting media download...", path_manager.log)
-    for item in media_items:
-        url = item["baseUrl"]
-        extension = MEDIA_MIME_TYPES.get(item["mimeType"]) or (".jpg" if item['mimeType'].startswith('image') else ".mp4")
-        file_name = f"{item['filename']}{extension}"
-        file_path = path_manager.failed_media / file_name
-
-        log_message(f"Downloading {file_name}...", path_manager.log)
-        media_response = requests.get(url)
-
-        if media_response.status_code == 200:
-            with open(path_manager.failed_media / file_name, "wb") as file:
-                file.write(media_response.content)
-
-            # add Google ID into the metadata
-            img = Image.open(file_path)
-            img.info["Google ID"] = item['id']
-            img.save(file_path)
-
-            log_message(f"Success: {file_name}", path_manager.log)
+counter_lock = threading.Lock()
+claimed: set[Path] = set()   # destinations taken by running downloads
+claim_lock = threading.Lock()
+
+def _count(result: str):
+    global count_success, count_skipped, count_failed
+    with counter_lock:
+        if result == "success":
             count_success += 1
-
-            # Start optimization in a new thread
-            thread = threading.Thread(target=process_medias, args=(file_name, item["mimeType"]))
-            thread.start()
+        elif result == "skipped":
+            count_skipped += 1
         else:
-            log_message(f"Failed: {file_name}", path_manager.log)
             count_failed += 1
 
-    log_message("Download process completed.", path_manager.log)
-
-# MAIN function
-def google_download():
-    log_message("Download process started.", path_manager.log)
-
-    media_items = fetch_media()
-    if media_items:
-        download_media(media_items)
-        log_message(f"Summary:\nSuccess: {count_success}\nFailed: {count_failed}\nTotal: {count_success + count_failed}", path_manager.log)
-    else:
-        log_message("No media items found.", path_manager.log)
+def _downloaded(media: Path, google_id: str):
+    return media.exists() and XmpSidecar.read(media).get("Google_ID") == google_id
+
+# Pick the file name, items sharing a filename get their id appended
+def _destination(item: dict):
+    name = Path(item.get("filename") or item["id"])
+    if not name.suffix:
+        name = name.with_suffix(ExtensionHelper.get_extension_from_mime(item.get("mimeType")))
+    destination = path_manager.downloaded_media / name.name
+
+    with claim_lock:
+        owner = XmpSidecar.read(destination).get("Google_ID")
+        if destination in claimed or (owner and owner != item["id"]):
+            destination = destination.with_name(f"{name.stem}_{item['id'][-8:]}{name.suffix}")
+        claimed.add(destination)
+    return destination
+
+def _download_media(item: dict, count: int, job: JobContext):
+    guid = job.guid
+    timer = TimeSpanLogger()
+    media = None
+    try:
+        timer.start()
+        media = _destination(item)
+        log_message(f"[{guid}] Start downloading file: [{count}], media: [{media.name}], id: [{item['id']}]", path_manager.log, file=media.absolute())
+
+        if _downloaded(media, item["id"]):
+            log_message(f"[{guid}] Already downloaded.", path_manager.log)
+            _count("skipped")
+            return media
+
+        # The id goes into a sidecar (the media is never rewritten), the optimizer stamps it into its output
+        XmpSidecar.write(media, {"Google_ID": item["id"]})
+        size = google_api_manager.download_media(item, media)
+        log_message(f"[{guid}] Downloaded {size} bytes.", path_manager.log)
+        _count("success")
+        return media
+
+    except Exception as e:
+        log_message(f"[{guid}] Error: {e}", path_manager.log, "ERROR", file=media)
+        _count("failed")
+        return None
+    finally:
+        timer.stop()
+        log_message(f"[{guid}] End download. Elapsed: {timer}", path_manager.log, duration=timer.elapsed())
+
+def download_all_medias(on_download: Callable[[Path], None] = None):
+    """
+    Download every media item (of google_photos.album_id when set) into downloaded_media.
+
+    Pages are listed as the downloads go and --download_workers files are streamed at the
+    same time. Every downloaded file is passed to on_download, which may block to pause
+    the downloads (e.g. a full optimizer queue).
+    """
+    downloader_timer = TimeSpanLogger()
+    try:
+        log_message("Download process started - Google Photos", path_manager.log)
+        downloader_timer.start()
+
+        def run(item: tuple[int, dict], job: JobContext):
+            count, media_item = item
+            media = _download_media(media_item, count, job)
+            if media and on_download:
+                on_download(media)
+
+        media_items = google_api_manager.list_media_items(google_photos.album_id or None)
+        thread_manager = ThreadManager(args.download_workers)
+        thread_manager.run(run, enumerate(media_items, start=1))
+
+    except Exception as e:
+        log_message(f"{e}", path_manager.log, "ERROR")
+    finally:
+        downloader_timer.stop()
+        log_message(f"Download process ended - Google Photos. Elapsed: {downloader_timer}", path_manager.log)
+        log_message(f"Download Summary: Success: {count_success}, Skipped: {count_skipped}, Failed: {count_failed}, Total: {count_success + count_skipped + count_failed}", path_manager.log)
 
-    log_message("Process ended.", path_manager.log)
 
 # MAIN (Manual Run)
 if __name__ == "__main__":
-    google_download()
+    download_all_medias()
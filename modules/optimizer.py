@@ -1,8 +1,7 @@
 import os
 import signal
-import uuid
 import shutil
-import cv2
+import threading
 import pillow_heif
 import pillow_avif   # AVIF support for Pillow
 from app_info import APP_NAME, VERSION
@@ -13,17 +12,29 @@ from PIL import Image
 from mediaoptimizer import container
 from classes.argument import Argument
 from classes.path_manager import PathManager
+from classes.storage import Storage
+from classes.rendition import Rendition, Renditions
 from components.file_manager import FileManager
-from components.media_optimizer import MediaOptimizer
+from components.media_optimizer import MediaOptimizer, EncodeAbortedError
+from components.thread_manager import ThreadManager
+from components.compression_predictor import CompressionPredictor
+from components.run_journal import RunJournal
+from components.processed_ledger import ProcessedLedger
+from components.output_cache import OutputCache
+from components.metrics_manager import MetricsManager
+from components.tool_registry import ToolRegistry
 from components.my_logging import log_message
+from classes.job_context import JobContext
+from classes.media_probe import MediaProbe
+from classes.encode_progress import EncodeProgress
+from classes.raw_frame import RawFrame
 from helper.timespan_logger import TimeSpanLogger
 from helper.extension_helper import ExtensionHelper
+from helper.xmp_sidecar import XmpSidecar
 from constants.media_mime_types import IMAGE_EXT, VIDEO_EXT
+from constants.ffmpeg_codec_types import FFMPEG_CODEC_TYPES
 from enum import Enum, auto
-from subprocess import TimeoutExpired
-
-# Global Param
-user_interrupt = False
+from typing import Callable, Iterable
 
 # Enum Mode for process
 class Mode(Enum):
@@ -40,11 +51,16 @@ class ProcessState(Enum):
     SUCCESS = auto()
     SKIPPED = auto()
     FAILED = auto()
+    CANCELLED = auto()      # metrics result only, the journal keeps the interrupted state for --resume
 
 # Injecting dependency
-args: Argument = container.args
-path_manager: PathManager = container.path_manager
-media_optimizer: MediaOptimizer = container.media_optimizer
+args: Argument = container.args()
+path_manager: PathManager = container.path_manager()
+media_optimizer: MediaOptimizer = container.media_optimizer()
+storage: Storage = container.storage()
+metrics: MetricsManager = container.metrics_manager()
+tool_registry: ToolRegistry = container.tool_registry()
+renditions: Renditions = container.renditions()
 
 # Register HEIF support with Pillow
 pillow_heif.register_heif_opener()
@@ -52,37 +68,90 @@ pillow_heif.register_heif_opener()
 # file to skip (optimizing raw image is pointless, why take raw image in the first place)
 SKIP_RAW = ["image/tiff", "image/x-adobe-dng"]
 UNKNOWN_MIME_TYPE = ["application/octet-stream", "inode/blockdevice"]
+# containers exiftool can't write, their metadata is written by ffmpeg instead
+FFMPEG_METADATA_EXT = {".mkv", ".webm", ".avi", ".flv", ".wmv", ".mpg", ".ogv"}
+# Pillow mode to ffmpeg rawvideo pixel format
+RAW_PIX_FMT = {"RGB": "rgb24", "RGBA": "rgba", "L": "gray"}
 FILE_GENERATED_STATE = {ProcessState.OPTIMIZING, ProcessState.ROLLBACK, ProcessState.METADATA_RECOVERYING, ProcessState.METADATA_INJECTING, ProcessState.SUCCESS}
 
 image_codec = args.image_output_codec or "libaom-av1"
 video_codec = args.video_output_codec or "libx265"
 image_out_ext = ExtensionHelper.get_extension_from_codec(image_codec)
 video_out_ext = ExtensionHelper.get_extension_from_codec(video_codec)
+# fail at startup instead of on every file
+tool_registry.validate(image_codec, video_codec, *(rendition.codec for rendition in renditions.image + renditions.video))
+compression_predictor = CompressionPredictor(storage.history_file)
+journal = RunJournal(path_manager.root / "journal.jsonl")
+ledger = ProcessedLedger(storage.ledger_file)
+output_cache = OutputCache(storage.cache_dir, int(storage.cache_max_size_gb * 1024 ** 3), tool_registry.ffmpeg_version) if args.output_cache else None
+# Video renditions share one decode with the main output: no early abort, no segments
+if renditions.video and (args.abort_ratio or args.segment_duration):
+    disabled = [option for option, value in (("--abort_ratio", args.abort_ratio), ("--segment_duration", args.segment_duration)) if value]
+    log_message(f"Video renditions are configured, {' and '.join(disabled)} won't apply to videos.", path_manager.log, "WARNING")
+# Settings that change the encoded output
+encode_params = {"image_quality": args.image_quality, "video_quality": args.video_quality, "abort_ratio": args.abort_ratio}
+
+# Feed the encode progress (fps, speed, ETA) to the metrics
+def _progress_callback(job: JobContext):
+    def on_progress(event: EncodeProgress):
+        metrics.encoding(job.guid, event.fps, event.speed, event.eta)
+        if event.finished:
+            log_message(f"[{job.guid}] Encoded {event.out_time:.1f}s at {event.fps:.1f} fps, {event.speed or 0:.2f}x, {event.total_size} bytes", path_manager.log, "DEBUG")
+    return on_progress
 
 # Optimize media
-def _optimize(input_file: str, output_file: str, media_format: str, multiple_frame: bool):
-    if media_format == "image":
-        return media_optimizer.optimize_image(input_file, output_file, codec=image_codec, multiple_frame=multiple_frame)
-    elif media_format == "video":
-        return media_optimizer.optimize_video(input_file, output_file, codec=video_codec)
+def _optimize(input_file: str, output_file: str, probe: MediaProbe, job: JobContext, metadatas: dict[str, str] = None, raw_frame: RawFrame = None, extras: list[tuple[Rendition, Path, dict[str, str]]] = None):
+    if extras and probe.kind in ("image", "video"):
+        # main output and every rendition from one decode (abort_ratio and segments don't apply, see startup warning)
+        main = Rendition(name="optimized", codec=image_codec) if probe.kind == "image" else Rendition(name="optimized", codec=video_codec, preset="slow")
+        return media_optimizer.optimize_renditions(
+            input_file,
+            [(main, Path(output_file), metadatas), *extras],
+            probe.kind,
+            threads=job.threads,
+            job=job,
+            raw_frame=raw_frame,
+            multiple_frame=probe.frames > 1,
+            duration=probe.duration,
+            progress_callback=_progress_callback(job) if probe.kind == "video" else None
+        )
+    elif probe.kind == "image":
+        return media_optimizer.optimize_image(input_file, output_file, codec=image_codec, multiple_frame=probe.frames > 1, threads=job.threads, job=job, raw_frame=raw_frame)
+    elif probe.kind == "video" and args.segment_duration and (probe.duration or 0) >= args.segment_duration:
+        # long video, encode keyframe aligned segments in parallel
+        return media_optimizer.optimize_video_segmented(
+            input_file,
+            output_file,
+            path_manager.temp_media / job.guid,
+            codec=video_codec,
+            threads=job.threads,
+            segment_workers=args.segment_workers,
+            segment_time=args.segment_time or 30,
+            job=job,
+            metadatas=metadatas,
+            duration=probe.duration,
+            abort_ratio=args.abort_ratio,
+            progress_callback=_progress_callback(job)
+        )
+    elif probe.kind == "video":
+        return media_optimizer.optimize_video(input_file, output_file, codec=video_codec, threads=job.threads, job=job, metadatas=metadatas, duration=probe.duration, abort_ratio=args.abort_ratio, progress_callback=_progress_callback(job))
     else:
-        raise TypeError(f"Media Format is not supported: {media_format}.")
+        raise TypeError(f"Media Format is not supported: {probe.kind}.")
     
-# Recover metadata
-def _metadata_recovery(media: Path, guid: str, output_path: str):
+# Recover metadata and register xmp namespace in a single rewrite
+def _write_metadata(media: Path, guid: str, output_path: Path, metadatas: dict[str, str]):
     try:
-        media_optimizer.replace_metadata(media.absolute(), output_path.absolute())
+        media_optimizer.write_metadata(media.absolute(), output_path.absolute(), "mediaoptimizer", metadatas)
     except Exception as e:
-        log_message(f"[{guid}] metadata_recovery failed: {e}", path_manager.log)
+        log_message(f"[{guid}] write_metadata failed: {e}", path_manager.log)
 
 # Metadata Registration
-def _set_metadata(media: Path, guid: str, metadatas: dict[str, str]):
+def _set_metadata(media: Path, guid: str, metadatas: dict[str, str], job: JobContext = None):
     try:
-        print(media.suffix, media.suffix == ".mkv")
-        if media.suffix == ".mkv": 
+        if media.suffix.lower() in FFMPEG_METADATA_EXT:
             # due to complicated container structure, exiftool doesn't support modify mkv metadata.
             temp_path = path_manager.temp_media / media.name
-            media_optimizer.ffmpeg_set_media_metadata(media, temp_path, metadatas)
+            media_optimizer.ffmpeg_set_media_metadata(media, temp_path, metadatas, job)
             shutil.copy2(temp_path, media)
             _delete_file(temp_path, guid, "temporary_metadata")
         else:
@@ -94,48 +163,53 @@ def _set_metadata(media: Path, guid: str, metadatas: dict[str, str]):
 
 # Verify media
 def _verify(media_path: Path):
+    """
+    Identify the media with one ffprobe call (memoized), returns format (image/video/raw), mime and probe.
+    """
     # Verify media type (Image/Video)
-    #mime = magic(mime=True).from_file(str(media_file_path))
     mime: str = magic.from_file(str(media_path), mime=True)
-    ext: str = media_path.suffix
 
     if mime in UNKNOWN_MIME_TYPE:
         mime = media_optimizer.get_mime_type(media_path)
 
     for m in SKIP_RAW:
         if mime == m:
-            return "raw", mime, ext
-
-    if mime.startswith("image"):
-        # try image
-        try:
-            image = Image.open(media_path)
-            image.close()
-            return "image", mime, ext
-        except Exception as e:
-            raise RuntimeError(e)
-    
-    elif mime.startswith("video"):
-        # try video
-        try:
-            video = cv2.VideoCapture(str(media_path))
-            if not video.isOpened():
-                raise ValueError("Cannot open video file")
-            video.release()
-            return "video", mime, ext
-        except Exception as e:
-            raise RuntimeError(e)
+            return "raw", mime, None
 
-    raise ValueError(f"Unsupported MIME type: [{mime}]")
+    if not mime.startswith(("image", "video")):
+        raise ValueError(f"Unsupported MIME type: [{mime}]")
 
-# Count media frames
-def _count_frames(image_path: Path):
-    with Image.open(image_path) as img:
+    try:
+        probe = media_optimizer.probe(media_path, mime)
+    except Exception as e:
+        if not mime.startswith("image"):
+            raise RuntimeError(e)
+        probe = _pil_probe(media_path, mime)   # ffmpeg builds without HEIF tile grid support
+    if probe.kind == "image" and not probe.width:
+        # tile grid ffprobe couldn't size (no stream groups), the picture size comes from Pillow
         try:
-            return img.n_frames
-        except AttributeError:
-            # If n_frames doesn't exist, assume it's a single-frame image
-            return 1
+            pil_probe = _pil_probe(media_path, mime)
+            probe = probe.model_copy(update={"width": pil_probe.width, "height": pil_probe.height})
+        except RuntimeError:
+            pass   # size stays unknown, nothing is predicted for it
+    return probe.kind, mime, probe
+
+# Probe image through Pillow when ffprobe can't read it
+def _pil_probe(image_path: Path, mime: str):
+    try:
+        with Image.open(image_path) as img:
+            return MediaProbe(
+                path=str(image_path),
+                mime=mime,
+                kind="image",
+                size=image_path.stat().st_size,
+                codec=img.format,
+                width=img.width,
+                height=img.height,
+                frames=getattr(img, "n_frames", 1)   # If n_frames doesn't exist, assume it's a single-frame image
+            )
+    except Exception as e:
+        raise RuntimeError(e)
 
 # Generate temp media
 def _generate_temp_media(media: Path, mime_type: str):
@@ -145,125 +219,279 @@ def _generate_temp_media(media: Path, mime_type: str):
     temp = Path(temp)
     return temp
 
+# Optimizer metadata (sizes are unknown when the tags are written by the encoder itself)
+def _optimizer_metadata(optimize: bool, input_format: str, output_format: str, original_size: int, optimized_size: int = None, sidecar: dict[str, str] = None):
+    metadatas = {
+        "Optimizer_Toolkit": str(APP_NAME),
+        "Optimizer_Version": str(VERSION),
+        "Optimize_Date": str(datetime.now(UTC).isoformat()),
+        "Optimize": str(optimize),
+        "Optimize_Tool": tool_registry.ffmpeg_version,
+        "Input_Format": str(input_format),
+        "Output_Format": str(output_format),
+        "Original_Size": str(original_size),
+    }
+    if optimized_size is not None:
+        reduction_percentage = ((original_size - optimized_size) / original_size) * 100
+        metadatas["Optimized_Size"] = str(optimized_size)
+        metadatas["Size_Reduction_Percent"] = str(round(reduction_percentage, 2))
+    if sidecar:
+        metadatas.update(sidecar)   # e.g. Google_ID of downloaded media
+    return metadatas
+
+# Extra renditions of a media (renditions/<name>/<stem><ext>)
+def _rendition_outputs(media: Path, media_format: str):
+    specs = renditions.image if media_format == "image" else renditions.video if media_format == "video" else []
+    outputs = []
+    for rendition in specs:
+        folder = path_manager.renditions / rendition.name
+        folder.mkdir(exist_ok=True)
+        outputs.append((rendition, folder / f"{media.stem}{ExtensionHelper.get_extension_from_codec(rendition.codec)}"))
+    return outputs
+
+def _rendition_metadata(rendition: Rendition, input_format: str, original_size: int, optimized_size: int = None, sidecar: dict[str, str] = None):
+    metadatas = _optimizer_metadata(True, input_format, FFMPEG_CODEC_TYPES.get(rendition.codec), original_size, optimized_size, sidecar)
+    metadatas["Rendition"] = rendition.name
+    return metadatas
+
+# Decode media into raw pixels for ffmpeg's stdin
+def _decode_raw_frame(media: Path):
+    with Image.open(media) as img:
+        if img.mode not in RAW_PIX_FMT:
+            img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+        return RawFrame(img.tobytes(), img.width, img.height, RAW_PIX_FMT[img.mode])
+
+# Rollback to the original media
+def _rollback(media: Path, output_path: Path, guid: str):
+    rollback_media = Path(shutil.copy2(media, path_manager.optimized_media))
+    # same name: the copy already replaced the generated file
+    if output_path.resolve() != rollback_media.resolve() and output_path.exists():
+        _delete_file(output_path, guid, "generated")
+    return rollback_media
+
 # Delete file
 def _delete_file(file: Path, guid: str, category: str = "unnecessary"):
     log_message(f"[{guid}] Cleanning {category} file...", path_manager.log)
     delete, message = FileManager.delete_file(file)
     if not delete:
-        log_message(f"[{guid}] Failed to delete {category} file. path: [{file}], error: {message}", path_manager.log)
+        log_message(f"[{guid}] Failed to delete {category} file. path: [{file}], error: {message}", path_manager.log, "WARNING", file=file)
     else:
         log_message(f"[{guid}] Deleted {category} file. path: [{file}].", path_manager.log)
 
     return delete, message
 
+# Record a state change in the run journal
+def _transition(media: Path, guid: str, state: ProcessState, output_path: Path = None):
+    journal.record(media, state.name, guid, output_path)
+    log_message(f"[{guid}] State: {state.name}", path_manager.log, "DEBUG", stage=state.name, file=media)
+    metrics.transition(guid, state.name)
+    if state == ProcessState.ROLLBACK:
+        metrics.count("rollbacks_total")
+    return state
+
+# Clean up what an interrupted run left behind, so its files can be processed again
+def _recover_journal():
+    for entry in journal.unfinished():
+        guid, media = entry["guid"], Path(entry["path"])
+        log_message(f"[{guid}] Recovering interrupted file: [{media}], State: {entry['state']}", path_manager.log)
+        if entry["output"] and Path(entry["output"]).exists():
+            _delete_file(Path(entry["output"]), guid, "half-written")
+        rollback_copy = Path(path_manager.optimized_media) / media.name
+        if entry["state"] == ProcessState.ROLLBACK.name and rollback_copy.exists():
+            _delete_file(rollback_copy, guid, "half-written")
+        failed_copy = Path(path_manager.failed_media) / media.name
+        if failed_copy.exists() and failed_copy.resolve() != media.resolve():
+            _delete_file(failed_copy, guid, "interrupted")
+        shutil.rmtree(Path(path_manager.temp_media) / guid, ignore_errors=True)   # segment scratch folder
+
+# Drop the files that already finished in the resumed run
+def _skip_finished(files: Iterable[Path]):
+    skipped = 0
+    for media in files:
+        if journal.finished(media):
+            skipped += 1
+            metrics.count("skips_total", reason="resume")
+            continue
+        yield media
+    log_message(f"Resume: skipped {skipped} finished files", path_manager.log)
+
+# Drop the files recorded in the ledger (stat only, batched unless the files are streamed)
+def _skip_processed(files: Iterable[Path], streamed: bool = False):
+    skipped = 0
+    for media, known in ledger.filter_unknown(files, 1 if streamed else None):
+        if known:
+            skipped += 1
+            metrics.count("skips_total", reason="ledger")
+            continue
+        yield media
+    log_message(f"Ledger: skipped {skipped} processed files", path_manager.log)
+
 # Process
-def process(media: Path, count: int, mode: Mode):
-    global user_interrupt
+def process(media: Path, count: int, mode: Mode, job: JobContext = None):
+    job = job or JobContext()
     success: bool = False
+    cancelled: bool = False
     state: ProcessState = ProcessState.PROCESSING
     output_path: Path = None
-    guid = str(uuid.uuid4())
+    media_format: str = None
+    guid = job.guid
     timer = TimeSpanLogger()
     try:
-        log_message(f"[{guid}] Start processing file: [{count}], media: [{media.name}], path: [{media.absolute()}]", path_manager.log)
+        log_message(f"[{guid}] Start processing file: [{count}], media: [{media.name}], path: [{media.absolute()}]", path_manager.log, file=media.absolute())
         timer.start()
+        metrics.transition(guid, state.name)
 
         # Variable
         optimize: bool = True
-        reduction_percentage: float = 0.0
-        multiple_frame: bool = False
 
         # Verify media type (Image/Video)
         log_message(f"[{guid}] Verifying media file...", path_manager.log)
-        state = ProcessState.VERIFYING
-        media_format, mime_type, ext = _verify(media)
+        state = _transition(media, guid, ProcessState.VERIFYING, output_path)
+        media_format, mime_type, probe = _verify(media)
         log_message(f"[{guid}] format: [{media_format}], mime: [{mime_type}], ext: [{media.suffix}]", path_manager.log)
 
         # Check Raw
         if media_format == "raw":
             log_message(f"[{guid}] Raw media shouldn't be optimize.", path_manager.log)
-            state = ProcessState.SKIPPED
             shutil.copy2(media, path_manager.raw_media)
+            state = _transition(media, guid, ProcessState.SKIPPED, output_path)
+            metrics.count("skips_total", reason="raw")
             success = True
             return   # Escape
 
         # Count Frame
-        if (media_format == "image"):
-            log_message(f"[{guid}] Counting frames...", path_manager.log)
-            frames = _count_frames(media)
-            if frames > 1:
-                log_message(f"[{guid}] Image have more than 1 frame.", path_manager.log)
-                multiple_frame = True
-
-        # Verify reprocessing file
+        if media_format == "image" and probe.frames > 1:
+            log_message(f"[{guid}] Image have more than 1 frame.", path_manager.log)
+
+        # Verify reprocessing file (not in the ledger, but may carry our tag from elsewhere)
         if not args.allow_reprocess and media_optimizer.read_custom_xmp_tag(media.absolute(), "MediaOptimizer", "Optimizer_Toolkit"):
-            state = ProcessState.SKIPPED
-            raise RecursionError(f"Media have been optimized before.")
+            log_message(f"[{guid}] Media have been optimized before, skip optimization.", path_manager.log)
+            ledger.record(media, result="tagged")
+            state = _transition(media, guid, ProcessState.SKIPPED, output_path)
+            metrics.count("skips_total", reason="tagged")
+            success = True
+            return   # Escape
 
-        # HEIF handling (tile grid (image collection))
-        temp = None
-        if mime_type in {"image/heic", "image/heif"}:
-            log_message(f"[{guid}] Generating temp file...", path_manager.log)
-            temp = _generate_temp_media(media, "image/png")
-    
-        # Optimize the media file
-        log_message(f"[{guid}] Optimizing media...", path_manager.log)
         output_ext = image_out_ext if (media_format == "image") else video_out_ext
         output_path = Path(f"{path_manager.optimized_media}/{media.stem}{output_ext}")
-        state = ProcessState.OPTIMIZING
-        try:
-            _optimize(
-                temp.absolute() if temp else media.absolute(), 
-                output_path, 
-                media_format, 
-                multiple_frame
-            )
-        except Exception as e:
-            raise e
-        log_message(f"[{guid}] Optimized. output: [{output_path}]", path_manager.log)
-
-        # Recover metadata
-        log_message(f"[{guid}] Recover metadata...", path_manager.log)
-        state = ProcessState.METADATA_RECOVERYING
-        _metadata_recovery(media, guid, output_path)
-
-        # Verify proficiency
-        log_message(f"[{guid}] Verifying optimization proficiency...", path_manager.log)
         original_size = media.stat().st_size
-        optimized_size = output_path.stat().st_size
-        reduction_percentage = ((original_size - optimized_size) / original_size) * 100
-        if optimized_size > original_size:
-            log_message(f"[{guid}] Media shouldn't be optimize any further.", path_manager.log)
-            state = ProcessState.ROLLBACK
+        sidecar = XmpSidecar.read(media)
+
+        # exiftool can't write this container, let ffmpeg write the tags while encoding
+        encoder_metadata = None
+        if media_format == "video" and output_ext.lower() in FFMPEG_METADATA_EXT:
+            encoder_metadata = _optimizer_metadata(True, mime_type, FFMPEG_CODEC_TYPES.get(video_codec), original_size, sidecar=sidecar)
+
+        # Renditions are encoded from the same decode, ffmpeg-only containers get their tags while encoding
+        extras = [
+            (rendition, path, _rendition_metadata(rendition, mime_type, original_size, sidecar=sidecar) if path.suffix.lower() in FFMPEG_METADATA_EXT else None)
+            for rendition, path in _rendition_outputs(media, media_format)
+        ]
+
+        # Predict the savings, skip encodes that are not worth running
+        output_codec = image_codec if media_format == "image" else video_codec
+        predicted = compression_predictor.predict(probe, output_codec)
+        optimized_size = None
+        temp = None
+        if predicted is not None:
+            log_message(f"[{guid}] Predicted size reduction: {predicted:.2f}%", path_manager.log)
+
+        # Reuse the encode of a byte-identical media (hardlink, unless ffmpeg rewrites the tags in place)
+        # Renditions need the decode anyway, neither the cache nor the prediction can skip it
+        # The source is read once, its hash serves the cache key and the ledger
+        source_digest = FileManager.hash_file(media) if output_cache and not extras else None
+        cache_key = output_cache.key(source_digest, output_codec, encode_params) if source_digest else None
+        cache_hit = bool(cache_key) and output_cache.get(cache_key, output_path, link=not encoder_metadata)
+
+        if cache_hit:
+            log_message(f"[{guid}] Served from output cache. output: [{output_path}]", path_manager.log)
+            metrics.count("cache_hits_total")
+            state = _transition(media, guid, ProcessState.OPTIMIZING, output_path)
+            optimized_size = output_path.stat().st_size
+        elif not extras and CompressionPredictor.below_threshold(predicted, args.min_expected_savings):
+            log_message(f"[{guid}] Predicted size reduction below {args.min_expected_savings}%, skip optimization.", path_manager.log)
+            state = _transition(media, guid, ProcessState.ROLLBACK, output_path)
             optimize = False
-
-            # remove the generated file
-            print(f"prepare to remove output_path: {output_path}")
-
-            # rollback to the previous file
-            rollback_media = Path(shutil.copy2(media, path_manager.optimized_media))
-            print(f"media: {media}, copied path: {rollback_media}")
-            if output_path.name is not rollback_media.name:
-                _delete_file(output_path, guid, "generated")
-                output_path = rollback_media
+            output_path = _rollback(media, output_path, guid)
+        else:
+            # HEIF handling (tile grid (image collection))
+            raw_frame = None
+            if mime_type in {"image/heic", "image/heif"}:
+                if args.heif_temp:
+                    log_message(f"[{guid}] Generating temp file...", path_manager.log)
+                    temp = _generate_temp_media(media, "image/png")
+                else:
+                    # pipe decoded pixels to ffmpeg, no png compress/decompress and no disk I/O
+                    log_message(f"[{guid}] Decoding frame...", path_manager.log)
+                    raw_frame = _decode_raw_frame(media)
+
+            # Optimize the media file
+            log_message(f"[{guid}] Optimizing media...", path_manager.log)
+            state = _transition(media, guid, ProcessState.OPTIMIZING, output_path)
+            aborted: EncodeAbortedError = None
+            try:
+                _optimize(
+                    temp.absolute() if temp else media.absolute(), 
+                    output_path, 
+                    probe,
+                    job,
+                    encoder_metadata,
+                    raw_frame,
+                    extras
+                )
+            except EncodeAbortedError as e:
+                aborted = e
+            except Exception as e:
+                job.raise_if_cancelled()   # subprocess was stopped by the user, not by a failure
+                raise e
+
+            # Verify proficiency
+            if aborted:
+                log_message(f"[{guid}] Optimization aborted: {aborted}", path_manager.log)
+                optimized_size = aborted.projected_size
+            else:
+                log_message(f"[{guid}] Optimized. output: [{output_path}]", path_manager.log)
+                log_message(f"[{guid}] Verifying optimization proficiency...", path_manager.log)
+                optimized_size = output_path.stat().st_size
+
+            if aborted or optimized_size > original_size:
+                log_message(f"[{guid}] Media shouldn't be optimize any further.", path_manager.log)
+                state = _transition(media, guid, ProcessState.ROLLBACK, output_path)
+                optimize = False
+
+                # rollback to the previous file, remove the generated file
+                output_path = _rollback(media, output_path, guid)
+            elif cache_key:
+                output_cache.put(cache_key, output_path)
+
+            # Learn from the result
+            reduction_percentage = ((original_size - optimized_size) / original_size) * 100
+            compression_predictor.record(probe, output_codec, reduction_percentage, predicted)
+            if predicted is not None:
+                log_message(f"[{guid}] Size reduction: predicted {predicted:.2f}%, actual {reduction_percentage:.2f}%", path_manager.log)
 
         # Modify media's metadata
-        log_message(f"[{guid}] Altering metadata...", path_manager.log)
-        state = ProcessState.METADATA_INJECTING
-        
-        # Register xmp namespace and modify metadata
-        _set_metadata(output_path, guid, {
-            "Optimizer_Toolkit": str(APP_NAME),
-            "Optimizer_Version": str(VERSION),
-            "Optimize_Date": str(datetime.now(UTC).isoformat()),
-            "Optimize": str(optimize),
-            "Optimize_Tool": media_optimizer.get_ffmpeg_version,
-            "Input_Format": str(mime_type),
-            "Output_Format": str(_verify(output_path)[1]),
-            "Original_Size": str(original_size),
-            "Optimized_Size": str(optimized_size),
-            "Size_Reduction_Percent": str(round(reduction_percentage, 2))
-        })
+        state = _transition(media, guid, ProcessState.METADATA_INJECTING, output_path)
+        output_format = FFMPEG_CODEC_TYPES.get(output_codec) if optimize else mime_type
+        metadatas = _optimizer_metadata(optimize, mime_type, output_format, original_size, optimized_size, sidecar)
+        if not optimize or (cache_hit and encoder_metadata):
+            # rollback copy (or cached encode) already carries the original metadata, only stamp it
+            log_message(f"[{guid}] Altering metadata...", path_manager.log)
+            _set_metadata(output_path, guid, metadatas, job)
+        elif encoder_metadata:
+            log_message(f"[{guid}] Metadata written by encoder.", path_manager.log)
+        else:
+            # Copy original metadata and register xmp namespace in one rewrite
+            log_message(f"[{guid}] Recovering and altering metadata...", path_manager.log)
+            _write_metadata(media, guid, output_path, metadatas)
+
+        # Stamp every rendition with its own tags
+        for rendition, rendition_path, encoder_tags in extras:
+            if encoder_tags is None:
+                rendition_tags = _rendition_metadata(rendition, mime_type, original_size, rendition_path.stat().st_size, sidecar)
+                _write_metadata(media, guid, rendition_path, rendition_tags)
+            metrics.count("renditions_total", rendition=rendition.name)
+            log_message(f"[{guid}] Rendition [{rendition.name}]: [{rendition_path}]", path_manager.log)
 
         log_message(f"[{guid}] Metadata modified.", path_manager.log)
         
@@ -271,41 +499,46 @@ def process(media: Path, count: int, mode: Mode):
         if not args.keep_temp and temp:
             _delete_file(temp, guid, "temporary")
 
+        # Remember the source and its output, later scans skip them without opening them
+        ledger.record(media, output_codec, encode_params, "optimized" if optimize else "rollback", source_digest)
+        ledger.record(output_path, output_codec, encode_params, "output")
+        metrics.count("bytes_in_total", original_size, kind=media_format)
+        metrics.count("bytes_out_total", output_path.stat().st_size, kind=media_format)
+
         success = True
+        job.output_path = output_path
         log_message(f"[{guid}] Successfully optimized media: {media.name}.", path_manager.log)
-        state = ProcessState.SUCCESS
+        state = _transition(media, guid, ProcessState.SUCCESS, output_path)
     except KeyboardInterrupt as e:
         e = "User Interrupted." if not str(e).strip() else e
+        cancelled = True
 
         # subprocess cleanup
-        previous_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)   # Temporarily ignore signal during cleanup
+        main_thread = threading.current_thread() is threading.main_thread()
+        if main_thread:
+            previous_handler = signal.signal(signal.SIGINT, signal.SIG_IGN)   # Temporarily ignore signal during cleanup
         try:
-            if getattr(media_optimizer, "_pbar", None) and not media_optimizer._pbar.disable:
-                media_optimizer._pbar.close()
-            media_optimizer._subprocess.wait(timeout=5)
-        except TimeoutExpired:
-            media_optimizer._subprocess.kill()
-            media_optimizer._subprocess.wait()
-        except Exception:
-            pass                                                          # Indicate that there is no subprocess to clean up
+            job.cancel()                                                      # Stop the job's subprocess and progress bar
         finally:
-            signal.signal(signal.SIGINT, previous_handler)                # Restore normal signal behavior
+            if main_thread:
+                signal.signal(signal.SIGINT, previous_handler)                # Restore normal signal behavior
 
-        exception_action(media, guid, e, mode, state, output_path)
-        user_interrupt = True
+        exception_action(media, guid, e, mode, state, output_path, final=False)
         log_message(f"[{guid}] Clean Up completed", path_manager.log)
 
     except Exception as e:
         exception_action(media, guid, e, mode, state, output_path)
     finally:
         timer.stop()
-        log_message(f"[{guid}] End process. Elapsed: {timer}", path_manager.log)
+        result = state if success else ProcessState.CANCELLED if cancelled else ProcessState.FAILED
+        metrics.finish(guid, result.name, timer.elapsed(), media_format)
+        log_message(f"[{guid}] End process. Elapsed: {timer}", path_manager.log, file=media.absolute(), stage=state.name, duration=timer.elapsed())
         return success
 
 # Core exception action
-def exception_action(media, guid, e, mode, state, output_path):
+def exception_action(media, guid, e, mode, state, output_path, final=True):
     try:
-        log_message(f"[{guid}] Error: {e}, State: {state}", path_manager.log)
+        log_message(f"[{guid}] Error: {e}, State: {state}", path_manager.log, "ERROR", file=media, stage=state.name)
 
         if mode == Mode.NORMAL:
             # copy file to failed_media folder
@@ -316,42 +549,74 @@ def exception_action(media, guid, e, mode, state, output_path):
             failed_file = Path(path_manager.optimized_media / output_path.name)
             _delete_file(failed_file, guid, "failed")
 
-        state = ProcessState.FAILED
+        # an interrupted file stays unfinished in the journal, --resume processes it again
+        if final:
+            state = _transition(media, guid, ProcessState.FAILED, output_path)
     except Exception as err:
-        log_message(f"[{guid}] exception_action failed: {err}", path_manager.log)
+        log_message(f"[{guid}] exception_action failed: {err}", path_manager.log, "ERROR", file=media)
 
     
 # Batch process
-def batch_process(files: list[Path], mode: Mode):
-    count: int = 1
-    for media in files:
-        success = process(media, count, mode)
-        count += 1
+def batch_process(files: Iterable[Path], mode: Mode, on_success: Callable[[Path], None] = None):
+    """
+    Optimize the files on a worker pool (--workers), return True when the user interrupted the batch.
+    on_success receives the output of every optimized file (it may block, which pauses the worker).
+    """
+    thread_manager = ThreadManager(args.workers, args.threads)
+    log_message(f"Workers: {thread_manager.workers}, ffmpeg threads per worker: {thread_manager.threads_per_worker or 'auto'}", path_manager.log)
+
+    def run(item: tuple[int, Path], job: JobContext):
+        count, media = item
+        success = process(media, count, mode, job)
+        if success and on_success and job.output_path:
+            on_success(job.output_path)
 
         if mode == Mode.RETRY and success:
             delete, message = FileManager.delete_file(media)
             if not delete:
-                raise Exception(message)
+                log_message(f"[{job.guid}] Failed to delete retried file. path: [{media}], error: {message}", path_manager.log, "WARNING", file=media)
+        return success
 
+    thread_manager.run(run, enumerate(files, start=1))
+    return thread_manager.interrupted
 
 
 # Optimizer
-def process_medias(files: list[Path]):
+def process_medias(files: Iterable[Path], on_success: Callable[[Path], None] = None, streamed: bool = False):
     log_message(f"Optimizer started", path_manager.log)
     optimizer_timer = TimeSpanLogger()
     optimizer_timer.start()
+    metrics.start()
+
+    # Resume: clean up interrupted files, skip the finished ones
+    if args.resume:
+        _recover_journal()
+        files = _skip_finished(files)
+    if not args.allow_reprocess:
+        files = _skip_processed(files, streamed)   # streamed from a bounded queue: keep its backpressure
 
-    batch_process(files, Mode.NORMAL)
+    user_interrupt = batch_process(files, Mode.NORMAL, on_success)
 
     while args.retry_failed and not user_interrupt:
         failed_files, image_count, video_count = FileManager.collect_media_files(path_manager.failed_media, IMAGE_EXT, VIDEO_EXT)
         if failed_files:
             log_message(f"Retry failed files started", path_manager.log)
             log_message(f"Total files: {len(failed_files)}, image: {image_count}, video: {video_count}", path_manager.log)
-            batch_process(failed_files, Mode.RETRY)
+            user_interrupt = batch_process(failed_files, Mode.RETRY, on_success)
             log_message(f"Retry failed files ended", path_manager.log)
         else:
             break
+    media_optimizer.close()   # stop persistent exiftool processes
+    journal.close()
+    ledger.close()
+    if output_cache:
+        output_cache.close()
+        log_message(f"Output cache: {output_cache.hits} hits, {output_cache.misses} misses", path_manager.log)
+    compression_predictor.save()
+    predictions, error = compression_predictor.accuracy
+    if predictions:
+        log_message(f"Prediction accuracy: {predictions} predictions, mean absolute error {error:.2f}%", path_manager.log)
+    metrics.stop()
     optimizer_timer.stop()
     log_message(f"Optimizer ended. Elapsed: {optimizer_timer}", path_manager.log)
 
@@ -1,23 +1,28 @@
 import shutil
-import uuid
+import threading
 from classes.argument import Argument
 from classes.google_photos import GooglePhotos
 from mediaoptimizer import container
 from classes.path_manager import PathManager
 from components.google_api_manager import GoogleAPIManager
+from components.media_item_batcher import MediaItemBatcher
+from classes.responses.google_upload_response import NewMediaItemResult
+from components.thread_manager import ThreadManager
+from classes.job_context import JobContext
 from components.my_logging import log_message
 from helper.timespan_logger import TimeSpanLogger
 from pathlib import Path
 
 # Injecting dependency
-path_manager: PathManager = container.path_manager
-google_api_manager: GoogleAPIManager = container.google_api_manager
-google_photos: GooglePhotos = container.google_photos
-args: Argument = container.args
+path_manager: PathManager = container.path_manager()
+google_api_manager: GoogleAPIManager = container.google_api_manager()
+google_photos: GooglePhotos = container.google_photos()
+args: Argument = container.args()
 
 # Variables
 count_success = 0
 count_failed = 0
+counter_lock = threading.Lock()
 
 def _move_file(media: Path, dest: Path):
     if args.operation == 2:
@@ -25,12 +30,46 @@ def _move_file(media: Path, dest: Path):
     else:
         shutil.move(media, dest)
 
-def _upload_media(media: Path, count: int):
+def _count(success: bool):
+    global count_success, count_failed
+    with counter_lock:
+        if success:
+            count_success += 1
+        else:
+            count_failed += 1
+
+# Create the media items of a batch (up to 50 items per call)
+def _create_media_items(items: list[tuple[str, str]]):
+    log_message(f"Creating {len(items)} media items...", path_manager.log)
+    return google_api_manager.create_media_items(items, google_photos.album_id)
+
+def _on_created(media: Path, guid: str, result: NewMediaItemResult):
+    try:
+        log_message(f"[{guid}] Media item created. id: {result.mediaItem.id}", path_manager.log)
+        _move_file(media, path_manager.uploaded_media)
+        log_message(f"[{guid}] Successfully uploaded media: {media.name}.", path_manager.log)
+        _count(True)
+    except Exception as e:
+        log_message(f"[{guid}] Error: {e}", path_manager.log, "ERROR", file=media)
+        _count(False)
+
+def _on_failed(media: Path, guid: str, reason: str):
+    try:
+        log_message(f"[{guid}] Error: {reason}", path_manager.log, "ERROR", file=media)
+        _move_file(media, path_manager.failed_upload_media)
+    except Exception as e:
+        log_message(f"[{guid}] Error: {e}", path_manager.log, "ERROR", file=media)
+    _count(False)
+
+# Uploaded files waiting for batchCreate, every result is mapped back to its file
+batcher = MediaItemBatcher(_create_media_items, _on_created, _on_failed)
+
+def _upload_media(media: Path, count: int, job: JobContext):
     success: bool = False
-    guid = str(uuid.uuid4())
+    guid = job.guid
     timer = TimeSpanLogger()
     try:
-        log_message(f"[{guid}] Start processing file: [{count}], media: [{media.name}], path: [{media.absolute()}]", path_manager.log)
+        log_message(f"[{guid}] Start processing file: [{count}], media: [{media.name}], path: [{media.absolute()}]", path_manager.log, file=media.absolute())
         timer.start()
 
         # Upload media to google server and retrieve upload token
@@ -41,31 +80,21 @@ def _upload_media(media: Path, count: int):
         # Validate upload token
         if upload_token == "":
             raise Exception("Upload token is empty.")
-        
-        # Create media item from upload token
-        log_message(f"[{guid}] Creating media item...", path_manager.log)
-        response = google_api_manager.create_media_item(upload_token, media.name, google_photos.album_id)
-
-        log_message(f"[{guid}] Response: {response.json()}", path_manager.log)
-        
-        # Move file to uploaded folder
-        log_message(f"[{guid}] Moving media file...", path_manager.log)
-        _move_file(media, path_manager.uploaded_media)
-        
+
+        # Media item is created with the next batch (up to 50 items per call)
+        batcher.add(media, guid, upload_token)
         success = True
-        log_message(f"[{guid}] Successfully uploaded media: {media.name}.", path_manager.log)
 
     except Exception as e:
-        log_message(f"[{guid}] Error: {e}", path_manager.log)
+        log_message(f"[{guid}] Error: {e}", path_manager.log, "ERROR", file=media)
         _move_file(media, path_manager.failed_upload_media)
+        _count(False)
     finally:
         timer.stop()
-        log_message(f"[{guid}] End process. Elapsed: {timer}", path_manager.log)
+        log_message(f"[{guid}] End process. Elapsed: {timer}", path_manager.log, file=media.absolute(), duration=timer.elapsed())
         return success
 
 def upload_all_medias(media_files: list[Path]):
-    count: int = 1
-    count_failed = 0
     try:
         log_message("Upload process started - Google Photos", path_manager.log)
         uploader_timer = TimeSpanLogger()
@@ -75,24 +104,23 @@ def upload_all_medias(media_files: list[Path]):
         if media_files == []:
             optimized_medias = Path(path_manager.optimized_media)
             media_files = [Path(media) for media in optimized_medias.iterdir()]
-        print(media_files)
-
-        for media in media_files:
-            success = _upload_media(media, count)
-            count += 1
 
-            if not success:
-                count_failed += 1
+        # Byte uploads run on a pool (--upload_workers) sharing one keep-alive session
+        def run(item: tuple[int, Path], job: JobContext):
+            count, media = item
+            return _upload_media(media, count, job)
 
-        # Adjust count to be the total number of files processed
-        count -= 1
+        thread_manager = ThreadManager(args.upload_workers)
+        thread_manager.run(run, enumerate(media_files, start=1))
+        batcher.flush()
 
     except Exception as e:
         log_message(f"{e}", path_manager.log)
     finally:
+        google_api_manager.close()
         uploader_timer.stop()
         log_message(f"Upload process ended - Google Photos. Elapsed: {uploader_timer}", path_manager.log)
-        log_message(f"Upload Summary: Success: {count - count_failed}, Failed: {count_failed}, Total: {count}", path_manager.log)
+        log_message(f"Upload Summary: Success: {count_success}, Failed: {count_failed}, Total: {count_success + count_failed}", path_manager.log)
 
 
 
@@ -0,0 +1,150 @@
+import os
+import sys
+import asyncio
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.async_media_optimizer import AsyncMediaOptimizer
+from components.media_optimizer import EncodeAbortedError
+
+# Stub ffmpeg: progress blocks on stdout, a stats line on stderr, writes its last argument
+FFMPEG = """
+import sys
+from pathlib import Path
+sys.stdout.write("frame=10\\nfps=5.0\\ntotal_size=100\\nout_time_us=1000000\\nspeed=0.5x\\nprogress=continue\\n")
+sys.stdout.write("frame=20\\nfps=5.0\\ntotal_size=200\\nout_time_us=2000000\\nspeed=0.5x\\nprogress=end\\n")
+sys.stderr.write("frame=10 fps=5.0\\rframe=20 fps=5.0\\n")
+Path(sys.argv[-1]).write_bytes(b"encoded")
+"""
+
+# Stub ffprobe: one video stream
+FFPROBE = """
+import json
+print(json.dumps({"format": {"format_name": "mov,mp4", "duration": "2.0"}, "streams": [{"codec_type": "video", "codec_name": "h264", "width": 64, "height": 48, "avg_frame_rate": "10/1"}]}))
+"""
+
+
+def _tool(tmp_path: Path, name: str, source: str):
+    tool = tmp_path / name
+    tool.write_text(f"#!{sys.executable}\n{source}")
+    tool.chmod(0o755)
+    return str(tool)
+
+
+def _python(source: str):
+    return [sys.executable, "-c", source]
+
+
+def test_run_returns_output_and_splits_stderr():
+    optimizer = AsyncMediaOptimizer()
+    lines = []
+    source = "import sys; sys.stdout.write(sys.stdin.read().upper()); sys.stderr.write('a\\rb\\nc'); sys.exit(3)"
+    returncode, stdout, stderr = asyncio.run(optimizer.run(_python(source), b"frame", on_stderr_line=lines.append))
+    assert returncode == 3
+    assert stdout == "FRAME"
+    assert lines == ["a", "b", "c"]
+    assert stderr == "a\nb\nc"
+
+
+def test_run_child_exits_before_reading_stdin():
+    optimizer = AsyncMediaOptimizer()
+    source = "import sys; sys.stderr.write('Invalid frame size'); sys.exit(1)"
+    returncode, _, stderr = asyncio.run(optimizer.run(_python(source), b"x" * (8 << 20)))   # more than the pipe holds
+    assert returncode == 1
+    assert stderr == "Invalid frame size"
+
+
+def test_run_streams_stdout_lines():
+    optimizer = AsyncMediaOptimizer()
+    lines = []
+    returncode, stdout, _ = asyncio.run(optimizer.run(_python("print('one'); print('two')"), on_stdout_line=lines.append))
+    assert returncode == 0
+    assert stdout == ""
+    assert lines == ["one", "two"]
+
+
+def test_semaphore_bounds_children(tmp_path: Path):
+    # every child registers itself, waits, and reports how many children were alive
+    source = (
+        "import os, sys, time; from pathlib import Path; d = Path(sys.argv[1]); me = d / str(os.getpid()); me.touch(); "
+        "time.sleep(0.2); print(len(list(d.iterdir()))); me.unlink()"
+    )
+    optimizer = AsyncMediaOptimizer(max_concurrency=2)
+
+    async def main():
+        return await asyncio.gather(*(optimizer.run([*_python(source), tmp_path]) for _ in range(6)))
+
+    results = asyncio.run(main())
+    assert all(returncode == 0 for returncode, _, _ in results)
+    assert max(int(stdout) for _, stdout, _ in results) <= 2
+
+
+def test_cancel_terminates_child():
+    optimizer = AsyncMediaOptimizer(timeout=1)
+    pids = []
+
+    async def main():
+        started = asyncio.Event()
+
+        def on_line(line: str):
+            pids.append(int(line))
+            started.set()
+
+        task = asyncio.ensure_future(optimizer.run(_python("import os, time; print(os.getpid(), flush=True); time.sleep(30)"), on_stdout_line=on_line))
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pids[0], 0)
+
+
+def test_async_probe_and_video(tmp_path: Path):
+    optimizer = AsyncMediaOptimizer(ffmpeg=_tool(tmp_path, "ffmpeg", FFMPEG), ffprobe=_tool(tmp_path, "ffprobe", FFPROBE))
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"source")
+    output = tmp_path / "output.mkv"
+    events = []
+
+    async def main():
+        probe = await optimizer.async_probe(source, "video/mp4")
+        path = await optimizer.async_optimize_video(str(source), output, progress_callback=events.append)
+        return probe, path
+
+    probe, path = asyncio.run(main())
+    assert (probe.kind, probe.width, probe.height, probe.duration) == ("video", 64, 48, 2.0)
+    assert path == output and output.read_bytes() == b"encoded"
+    assert [event.ratio for event in events] == [0.5, 1.0]
+    assert events[-1].finished
+
+
+def test_async_video_failure_reports_stderr(tmp_path: Path):
+    ffmpeg = _tool(tmp_path, "ffmpeg", "import sys; sys.stderr.write('Unknown encoder\\n'); sys.exit(1)")
+    optimizer = AsyncMediaOptimizer(ffmpeg=ffmpeg)
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"source")
+    with pytest.raises(RuntimeError, match="Unknown encoder"):
+        asyncio.run(optimizer.async_optimize_video(str(source), tmp_path / "output.mkv", duration=2.0))
+
+
+def test_async_video_aborts_oversized_encode(tmp_path: Path):
+    pid_file = tmp_path / "ffmpeg.pid"
+    ffmpeg = _tool(tmp_path, "ffmpeg", f"""
+import os, sys, time
+open({str(pid_file)!r}, "w").write(str(os.getpid()))
+sys.stdout.write("total_size=500\\nout_time_us=2000000\\nspeed=1.0x\\nprogress=continue\\n")
+sys.stdout.flush()
+time.sleep(30)
+""")
+    optimizer = AsyncMediaOptimizer(ffmpeg=ffmpeg)
+    source = tmp_path / "video.mp4"
+    source.write_bytes(b"s" * 1000)
+    with pytest.raises(EncodeAbortedError) as aborted:   # 500 bytes for 2 of 10s project 2500 bytes
+        asyncio.run(optimizer.async_optimize_video(str(source), tmp_path / "output.mkv", duration=10.0, abort_ratio=1.0))
+    assert aborted.value.projected_size == 2500
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(pid_file.read_text()), 0)
@@ -0,0 +1,71 @@
+import sys
+import json
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from classes.media_probe import MediaProbe
+from components.compression_predictor import CompressionPredictor
+
+
+def _image(size: int = 1_200_000, codec: str = "mjpeg"):
+    # 4000x3000 at 0.8 bits per pixel by default
+    return MediaProbe(path="photo.jpg", kind="image", size=size, codec=codec, width=4000, height=3000)
+
+
+def test_prior_from_bits_per_pixel(tmp_path: Path):
+    predictor = CompressionPredictor(str(tmp_path / "history.json"))
+    assert CompressionPredictor.bits_per_pixel(_image()) == 0.8
+    assert predictor.predict(_image(), "libaom-av1") == (1 - 0.6 / 0.8) * 100
+    assert predictor.predict(_image(), "unknown-codec") is None
+    assert predictor.predict(MediaProbe(path="x", kind="image", size=1), "libaom-av1") is None
+
+
+def test_history_blends_with_prior_per_bucket(tmp_path: Path):
+    predictor = CompressionPredictor(str(tmp_path / "history.json"), min_samples=5)
+    prior = predictor.predict(_image(), "libaom-av1")
+    for _ in range(5):
+        predictor.record(_image(), "libaom-av1", 60.0)
+
+    # 5 samples weigh as much as the prior
+    assert predictor.predict(_image(), "libaom-av1") == 0.5 * 60.0 + 0.5 * prior
+    # other bpp band, other input codec: untouched
+    assert predictor.predict(_image(size=2_400_000), "libaom-av1") == (1 - 0.6 / 1.6) * 100
+    assert predictor.predict(_image(codec="png"), "libaom-av1") == prior
+    # no prior at all: the history alone
+    assert predictor.predict(_image(), "unknown-codec") is None
+    predictor.record(_image(), "unknown-codec", 12.0)
+    assert predictor.predict(_image(), "unknown-codec") == 12.0
+
+
+def test_history_round_trip(tmp_path: Path):
+    history_file = tmp_path / "history" / "history.json"
+    predictor = CompressionPredictor(str(history_file))
+    predictor.record(_image(), "libaom-av1", 40.0)
+    predictor.record(_image(), "libaom-av1", 50.0)
+    predictor.save()
+
+    assert not history_file.with_suffix(".json.tmp").exists()
+    assert json.loads(history_file.read_text())["buckets"] == {"mjpeg|libaom-av1|5": {"count": 2, "mean": 45.0}}
+    reloaded = CompressionPredictor(str(history_file))
+    assert reloaded.predict(_image(), "libaom-av1") == predictor.predict(_image(), "libaom-av1")
+
+    history_file.write_text("{torn")
+    assert CompressionPredictor(str(history_file)).predict(_image(), "libaom-av1") == (1 - 0.6 / 0.8) * 100
+
+
+def test_accuracy_is_mean_absolute_error(tmp_path: Path):
+    predictor = CompressionPredictor(str(tmp_path / "history.json"))
+    assert predictor.accuracy == (0, None)
+    predictor.record(_image(), "libaom-av1", 30.0, predicted=25.0)
+    predictor.record(_image(), "libaom-av1", 30.0, predicted=45.0)
+    predictor.record(_image(), "libaom-av1", 30.0)              # no prediction, not checked
+    predictor.record(_image(), "libaom-av1", float("nan"), 10)   # ignored
+    assert predictor.accuracy == (2, 10.0)
+
+
+def test_min_expected_savings_skip():
+    assert CompressionPredictor.below_threshold(3.0, 5.0)
+    assert not CompressionPredictor.below_threshold(5.0, 5.0)
+    assert not CompressionPredictor.below_threshold(-20.0, None)   # option not set
+    assert not CompressionPredictor.below_threshold(None, 5.0)     # nothing to predict from
@@ -0,0 +1,60 @@
+import sys
+import time
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.media_optimizer import MediaOptimizer, EncodeAbortedError
+
+# Stub ffmpeg encoding a 10s video: progress blocks from STUB_PROGRESS ("seconds:bytes,..."),
+# then it keeps running until it is stopped (or finishes when STUB_FINISH is set)
+FFMPEG = """
+import os, sys, time
+from pathlib import Path
+for block in os.environ["STUB_PROGRESS"].split(","):
+    seconds, size = block.split(":")
+    sys.stdout.write(f"total_size={size}\\nout_time_us={int(float(seconds) * 1000000)}\\nspeed=1.0x\\nprogress=continue\\n")
+    sys.stdout.flush()
+if not os.environ.get("STUB_FINISH"):
+    time.sleep(30)
+sys.stdout.write("progress=end\\n")
+Path(sys.argv[-1]).write_bytes(b"e" * 100)
+"""
+
+
+@pytest.fixture
+def optimizer(tmp_path: Path):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(f"#!{sys.executable}\n{FFMPEG}")
+    ffmpeg.chmod(0o755)
+    (tmp_path / "video.mov").write_bytes(b"v" * 1000)
+    return MediaOptimizer(ffmpeg=str(ffmpeg), exiftool_daemon=False)
+
+
+def _optimize(optimizer: MediaOptimizer, tmp_path: Path, **kwargs):
+    return optimizer.optimize_video(
+        str(tmp_path / "video.mov"), tmp_path / "out.mp4", metadata=False, duration=10, **kwargs
+    )
+
+
+def test_aborts_when_projection_exceeds_ratio(optimizer: MediaOptimizer, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("STUB_PROGRESS", "2:500")   # 500 bytes for 2 of 10s project 2500 bytes
+    started = time.monotonic()
+    with pytest.raises(EncodeAbortedError) as aborted:
+        _optimize(optimizer, tmp_path, abort_ratio=1.0)
+    assert aborted.value.projected_size == 2500
+    assert time.monotonic() - started < 10          # the encode was stopped, not waited for
+
+
+def test_no_abort_before_min_progress(optimizer: MediaOptimizer, tmp_path: Path, monkeypatch):
+    # 0.5s is below the 10% minimum, the later projection fits within the original
+    monkeypatch.setenv("STUB_PROGRESS", "0.5:900,5:400")
+    monkeypatch.setenv("STUB_FINISH", "1")
+    assert _optimize(optimizer, tmp_path, abort_ratio=1.0) == tmp_path / "out.mp4"
+
+
+def test_no_abort_without_ratio(optimizer: MediaOptimizer, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("STUB_PROGRESS", "2:500")
+    monkeypatch.setenv("STUB_FINISH", "1")
+    assert _optimize(optimizer, tmp_path) == tmp_path / "out.mp4"
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.exiftool_process import ExifToolProcess
+
+# Stub exiftool in stay_open mode: echoes every command's arguments, "fail" reports an error,
+# "noisy" floods stderr before stdout, "crash" exits (only once when the marker file is set)
+EXIFTOOL = """
+import os, sys
+with open(os.environ["STUB_STARTS"], "a") as starts:
+    starts.write(" ".join(sys.argv[1:]) + "\\n")
+args = []
+for line in sys.stdin:
+    arg = line.rstrip("\\n")
+    if arg == "False" and args[-1:] == ["-stay_open"]:
+        sys.exit(0)
+    if not arg.startswith("-execute"):
+        args.append(arg)
+        continue
+    if "crash" in args:
+        marker = os.environ.get("STUB_CRASH_ONCE")
+        if not marker or not os.path.exists(marker):
+            if marker:
+                open(marker, "w").close()
+            sys.exit(1)
+    ready = args[args.index("-echo4") + 1]
+    if "noisy" in args:
+        sys.stderr.write("Warning: [minor] Bad MakerNotes\\n" * 20000)   # more than the pipe holds
+    sys.stdout.write("|".join(args[2:args.index("-echo4")]) + "\\n" + ready + "\\n")
+    sys.stdout.flush()
+    if "fail" in args:
+        sys.stderr.write("Error: File not found - fail\\n")
+    sys.stderr.write(ready + "\\n")
+    sys.stderr.flush()
+    args = []
+"""
+
+
+@pytest.fixture
+def exiftool(tmp_path: Path, monkeypatch):
+    stub = tmp_path / "exiftool"
+    stub.write_text(f"#!{sys.executable}\n{EXIFTOOL}")
+    stub.chmod(0o755)
+    monkeypatch.setenv("STUB_STARTS", str(tmp_path / "starts.txt"))
+    process = ExifToolProcess(str(stub), xmp_config="xmp.config")
+    yield process
+    process.close()
+
+
+def _starts(tmp_path: Path):
+    path = tmp_path / "starts.txt"
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def test_commands_share_one_process(exiftool: ExifToolProcess, tmp_path: Path):
+    assert exiftool.execute("-json", "a.jpg") == ("-json|a.jpg\n", "")
+    assert exiftool.execute("-Title=two\nlines", "b.jpg") == ("-Title=two lines|b.jpg\n", "")   # one argument per line
+    assert exiftool._counter == 2
+    assert _starts(tmp_path) == ["-config xmp.config -stay_open True -@ -"]
+
+
+def test_error_raises(exiftool: ExifToolProcess):
+    with pytest.raises(RuntimeError, match="File not found"):
+        exiftool.execute("fail")
+    assert exiftool.execute("ok") == ("ok\n", "")   # the process keeps serving
+
+
+def test_stderr_flood_does_not_stall(exiftool: ExifToolProcess):
+    result = []
+    runner = threading.Thread(target=lambda: result.append(exiftool.execute("noisy")), daemon=True)
+    runner.start()
+    runner.join(10)
+    assert result, "exiftool stalled on a full stderr pipe"
+    stdout, stderr = result[0]
+    assert stdout == "noisy\n"
+    assert stderr.count("Bad MakerNotes") == 20000
+
+
+def test_restart_after_crash(exiftool: ExifToolProcess, tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("STUB_CRASH_ONCE", str(tmp_path / "crashed"))
+    assert exiftool.execute("crash") == ("crash\n", "")
+    assert len(_starts(tmp_path)) == 2
+    assert exiftool._counter == 1   # the counter starts over with the new process
+
+
+def test_keeps_dying_raises(exiftool: ExifToolProcess, tmp_path: Path):
+    with pytest.raises(RuntimeError, match="stopped responding"):
+        exiftool.execute("crash")
+    assert len(_starts(tmp_path)) == 2
+    assert not exiftool.running
+
+
+def test_close_leaves_stay_open(exiftool: ExifToolProcess):
+    exiftool.execute("ok")
+    process = exiftool._process
+    exiftool.close()
+    assert process.returncode == 0 and not exiftool.running
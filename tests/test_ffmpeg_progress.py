@@ -0,0 +1,68 @@
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from helper.ffmpeg_progress import FFmpegProgressParser
+
+# Two blocks as written by `ffmpeg -progress pipe:1 -nostats`
+OUTPUT = """frame=0
+fps=0.00
+stream_0_0_q=0.0
+bitrate=N/A
+total_size=N/A
+out_time_us=N/A
+out_time_ms=N/A
+out_time=N/A
+dup_frames=0
+drop_frames=0
+speed=N/A
+progress=continue
+frame=240
+fps=48.00
+stream_0_0_q=28.0
+bitrate=1024.5kbits/s
+total_size=1280000
+out_time_us=10000000
+out_time_ms=10000000
+out_time=00:00:10.000000
+dup_frames=0
+drop_frames=0
+speed=2.5x
+progress=continue
+"""
+
+
+def _events(output: str, duration: float = None):
+    parser = FFmpegProgressParser(duration)
+    return [event for line in output.splitlines(keepends=True) if (event := parser.feed(line))]
+
+
+def test_blocks_become_events():
+    first, second = _events(OUTPUT, duration=40)
+    assert first.total_size == 0 and first.out_time == 0 and first.speed is None and first.bitrate is None
+    assert second.frame == 240
+    assert second.fps == 48.0
+    assert second.bitrate == 1024.5
+    assert second.total_size == 1280000
+    assert second.out_time == 10.0
+    assert second.speed == 2.5
+
+
+def test_eta_ratio_and_projection():
+    event = _events(OUTPUT, duration=40)[1]
+    assert event.ratio == 0.25
+    assert event.eta == 12.0                  # 30s left at 2.5x
+    assert event.projected_size == 5120000
+    assert _events(OUTPUT)[1].eta is None     # unknown duration
+
+
+def test_end_block():
+    event = _events("out_time_ms=3000000\ntotal_size=100\nprogress=end\n", duration=3)[0]
+    assert event.finished
+    assert event.out_time == 3.0
+    assert event.eta == 0.0
+
+
+def test_ignores_other_lines():
+    assert _events("\nrandom text\n") == []
@@ -0,0 +1,46 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.file_manager import FileManager
+
+
+@pytest.fixture
+def media_tree(tmp_path: Path):
+    for i in range(12):
+        folder = tmp_path / f"album_{i % 3}" / f"day_{i % 2}"
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / f"photo_{i}.JPG").touch()
+        (folder / f"clip_{i}.mp4").touch()
+        (folder / f"notes_{i}.txt").touch()
+    return tmp_path
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_iter_media_files(media_tree: Path, workers: int):
+    found = list(FileManager.iter_media_files(media_tree, [".jpg"], [".mp4"], workers=workers))
+
+    assert len(found) == 24
+    assert sum(1 for _, media_type in found if media_type == "image") == 12
+    assert {path for path, _ in found} == {path for path in media_tree.rglob("*") if path.suffix.lower() in (".jpg", ".mp4")}
+
+
+def test_iter_media_files_media_filter(media_tree: Path):
+    found = list(FileManager.iter_media_files(media_tree, [".jpg"], [".mp4"], media="video", workers=2))
+
+    assert len(found) == 12
+    assert all(media_type == "video" for _, media_type in found)
+
+
+def test_iter_media_files_stops_early(media_tree: Path):
+    scanner = FileManager.iter_media_files(media_tree, [".jpg"], [".mp4"], workers=4)
+    next(scanner)
+    scanner.close()
+
+
+def test_collect_media_files(media_tree: Path):
+    media_files, image_count, video_count = FileManager.collect_media_files(media_tree, [".jpg"], [".mp4"])
+
+    assert (len(media_files), image_count, video_count) == (24, 12, 12)
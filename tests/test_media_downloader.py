@@ -0,0 +1,91 @@
+import sys
+import threading
+import pytest
+import requests
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.media_downloader import MediaDownloader
+from helper.xmp_sidecar import XmpSidecar
+
+BODY = bytes(range(256)) * 4096     # 1 MiB
+
+
+class MediaServer(ThreadingHTTPServer):
+    """Stand-in for Google Photos base urls."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MediaHandler)
+        self.paths: list[str] = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MediaHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path.startswith("/missing"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        if self.path.startswith("/dropped"):
+            self.wfile.write(BODY[:1000])   # connection lost part way through
+            self.close_connection = True
+            return
+        for offset in range(0, len(BODY), 64 * 1024):
+            self.wfile.write(BODY[offset:offset + 64 * 1024])
+
+
+@pytest.fixture
+def server():
+    server = MediaServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _download(server: MediaServer, path: str, destination: Path):
+    with requests.Session() as session:
+        return MediaDownloader(session, chunk_size=4096, timeout=5).download(f"{server.url}{path}", destination)
+
+
+def test_download_streams_to_file(server: MediaServer, tmp_path: Path):
+    destination = tmp_path / "photo.jpg"
+    assert _download(server, "/media=d", destination) == len(BODY)
+    assert destination.read_bytes() == BODY
+    assert list(tmp_path.iterdir()) == [destination]     # no .part left
+
+
+@pytest.mark.parametrize("path", ["/missing=d", "/dropped=d"])
+def test_failed_download_leaves_nothing(server: MediaServer, tmp_path: Path, path: str):
+    destination = tmp_path / "photo.jpg"
+    with pytest.raises(ConnectionError):
+        _download(server, path, destination)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_url():
+    assert MediaDownloader.download_url({"baseUrl": "https://x/a", "mediaMetadata": {"photo": {}}}) == "https://x/a=d"
+    assert MediaDownloader.download_url({"baseUrl": "https://x/a", "mediaMetadata": {"video": {}}}) == "https://x/a=dv"
+
+
+def test_xmp_sidecar(tmp_path: Path):
+    media = tmp_path / "photo.jpg"
+    assert XmpSidecar.read(media) == {}
+    sidecar = XmpSidecar.write(media, {"Google_ID": "AB<&>12"})
+    assert sidecar == tmp_path / "photo.jpg.xmp"
+    assert XmpSidecar.read(media) == {"Google_ID": "AB<&>12"}
@@ -0,0 +1,129 @@
+import sys
+import json
+import threading
+import requests
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.media_item_batcher import MediaItemBatcher, BATCH_CREATE_LIMIT
+from classes.responses.google_upload_response import GoogleUploadResponse
+
+
+class BatchCreateServer(ThreadingHTTPServer):
+    """Stand-in for mediaItems:batchCreate, fails the tokens starting with "bad" (207) or every call."""
+
+    def __init__(self, fail_all: bool = False):
+        super().__init__(("127.0.0.1", 0), BatchCreateHandler)
+        self.calls: list[int] = []
+        self.fail_all = fail_all
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/mediaItems:batchCreate"
+
+
+class BatchCreateHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server: BatchCreateServer = self.server
+        items = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["newMediaItems"]
+        server.calls.append(len(items))
+        if server.fail_all:
+            return self._reply(500, {"error": {"code": 500, "message": "Backend Error", "status": "INTERNAL"}})
+
+        results = []
+        for item in reversed(items):   # order is not guaranteed, results carry their token
+            token = item["simpleMediaItem"]["uploadToken"]
+            if token.startswith("bad"):
+                results.append({"uploadToken": token, "status": {"code": 3, "message": f"Invalid token {token}"}})
+            else:
+                results.append({
+                    "uploadToken": token,
+                    "status": {"message": "Success"},
+                    "mediaItem": {
+                        "id": f"id-{token}", "productUrl": "", "mimeType": "image/avif", "filename": token,
+                        "mediaMetadata": {"creationTime": "", "width": "1", "height": "1"}
+                    }
+                })
+        failed = any(item["simpleMediaItem"]["uploadToken"].startswith("bad") for item in items)
+        self._reply(207 if failed else 200, {"newMediaItemResults": results})
+
+
+def _serve(server: BatchCreateServer):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def create(items: list[tuple[str, str]]):
+        payload = {"newMediaItems": [{"simpleMediaItem": {"uploadToken": token}} for token, _ in items]}
+        response = requests.post(server.url, json=payload)
+        if response.status_code not in (200, 207):
+            raise ConnectionError(response.text)
+        return GoogleUploadResponse(**response.json())
+    return create
+
+
+def _batcher(create):
+    created, failed = {}, {}
+    batcher = MediaItemBatcher(
+        create,
+        lambda media, guid, result: created.update({media.name: result.mediaItem.id}),
+        lambda media, guid, reason: failed.update({media.name: reason})
+    )
+    return batcher, created, failed
+
+
+def test_full_batches_of_50():
+    server = BatchCreateServer()
+    batcher, created, failed = _batcher(_serve(server))
+    try:
+        for index in range(BATCH_CREATE_LIMIT * 2 + 3):
+            batcher.add(Path(f"media_{index}.avif"), f"guid-{index}", f"token-{index}")
+            if index == BATCH_CREATE_LIMIT - 2:
+                assert server.calls == []   # nothing sent before the batch is full
+        assert server.calls == [BATCH_CREATE_LIMIT, BATCH_CREATE_LIMIT]
+        batcher.flush()
+        batcher.flush()                     # nothing left, no empty call
+    finally:
+        server.shutdown()
+    assert server.calls == [BATCH_CREATE_LIMIT, BATCH_CREATE_LIMIT, 3]
+    assert len(created) == BATCH_CREATE_LIMIT * 2 + 3 and not failed
+    assert created["media_7.avif"] == "id-token-7"
+
+
+def test_partial_results_mapped_by_upload_token():
+    server = BatchCreateServer()
+    batcher, created, failed = _batcher(_serve(server))
+    try:
+        batcher.add(Path("good.avif"), "guid-1", "token-good")
+        batcher.add(Path("bad.avif"), "guid-2", "bad-token")
+        batcher.add(Path("other.avif"), "guid-3", "token-other")
+        batcher.flush()
+    finally:
+        server.shutdown()
+    assert created == {"good.avif": "id-token-good", "other.avif": "id-token-other"}
+    assert failed == {"bad.avif": "Invalid token bad-token"}
+
+
+def test_whole_batch_failure_fails_every_file():
+    server = BatchCreateServer(fail_all=True)
+    batcher, created, failed = _batcher(_serve(server))
+    try:
+        batcher.add(Path("one.avif"), "guid-1", "token-1")
+        batcher.add(Path("two.avif"), "guid-2", "token-2")
+        batcher.flush()
+    finally:
+        server.shutdown()
+    assert created == {}
+    assert set(failed) == {"one.avif", "two.avif"}
+    assert all("Backend Error" in reason for reason in failed.values())
@@ -0,0 +1,76 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.media_optimizer import MediaOptimizer
+
+VIDEO_PROBE = {
+    "streams": [
+        {"codec_type": "video", "codec_name": "mjpeg", "width": 320, "height": 320, "disposition": {"attached_pic": 1}},
+        {"codec_type": "video", "codec_name": "hevc", "width": 1920, "height": 1080, "avg_frame_rate": "30000/1001", "nb_frames": "1798"},
+        {"codec_type": "audio", "codec_name": "aac"}
+    ],
+    "format": {"format_name": "mov,mp4,m4a,3gp,3g2,mj2", "duration": "60.0", "bit_rate": "8000000"}
+}
+
+IMAGE_PROBE = {
+    "streams": [{"codec_type": "video", "codec_name": "mjpeg", "width": 4000, "height": 3000, "avg_frame_rate": "0/0"}],
+    "format": {"format_name": "image2"}
+}
+
+
+def test_probe_video_prefers_real_stream():
+    probe = MediaOptimizer._parse_probe(Path("clip.mp4"), 60_000_000, "video/mp4", VIDEO_PROBE)
+
+    assert probe.kind == "video"
+    assert probe.codec == "hevc"
+    assert (probe.width, probe.height) == (1920, 1080)
+    assert probe.frames == 1798
+    assert probe.duration == 60.0
+    assert probe.bit_rate == 8_000_000
+    assert probe.fps == pytest.approx(29.97, abs=0.01)
+
+
+def test_probe_image_without_mime():
+    probe = MediaOptimizer._parse_probe(Path("photo.jpg"), 3_000_000, None, IMAGE_PROBE)
+
+    assert probe.kind == "image"
+    assert probe.frames == 1
+    assert probe.duration is None
+    assert probe.bit_rate is None
+
+
+def test_probe_without_visual_stream():
+    with pytest.raises(RuntimeError):
+        MediaOptimizer._parse_probe(Path("song.mp3"), 1, "audio/mpeg", {"streams": [{"codec_type": "audio"}], "format": {}})
+
+
+def _tiles(count: int = 4):
+    return [{"index": index, "codec_type": "video", "codec_name": "hevc", "width": 512, "height": 512} for index in range(count)]
+
+
+def test_probe_heic_tile_grid_size():
+    data = {
+        "streams": _tiles(),
+        "stream_groups": [{
+            "index": 0, "type": "Tile Grid", "nb_streams": 4,
+            "components": [{"nb_tiles": 4, "coded_width": 1024, "coded_height": 1024, "width": 1000, "height": 750}],
+            "streams": [{"index": index} for index in range(4)]
+        }],
+        "format": {"format_name": "heif"}
+    }
+    probe = MediaOptimizer._parse_probe(Path("photo.heic"), 800_000, "image/heic", data)
+    assert (probe.width, probe.height) == (1000, 750)
+
+
+def test_probe_heic_tiles_without_grid_leave_size_unknown():
+    # ffprobe before 7.0 lists the tiles only, the tile size is not the picture size
+    probe = MediaOptimizer._parse_probe(Path("photo.heic"), 800_000, "image/heic", {"streams": _tiles(), "format": {"format_name": "heif"}})
+    assert (probe.width, probe.height) == (None, None)
+
+
+def test_probe_command_stream_groups():
+    assert "-show_stream_groups" not in MediaOptimizer()._probe_command(Path("photo.heic"))
+    assert "-show_stream_groups" in MediaOptimizer(stream_groups=True)._probe_command(Path("photo.heic"))
@@ -0,0 +1,47 @@
+import sys
+import json
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.metrics_manager import MetricsManager
+
+
+def test_metrics_export(tmp_path: Path):
+    metrics = MetricsManager(tmp_path, interval=0)
+    metrics.transition("job-1", "VERIFYING")
+    metrics.transition("job-1", "OPTIMIZING")
+    metrics.count("bytes_in_total", 2048, kind="image")
+    metrics.finish("job-1", "SUCCESS", 3.0, "image")
+    metrics.transition("job-2", "OPTIMIZING")
+    metrics.finish("job-2", "CANCELLED", 1.0, "video")   # Ctrl-C is not a failure
+    metrics.count("skips_total", reason="ledger")
+    metrics.count("skips_total", reason="ledger")
+    metrics.stop()
+
+    prometheus = (tmp_path / "metrics.prom").read_text()
+    assert "# TYPE mediaoptimizer_stage_duration_seconds histogram" in prometheus
+    assert 'mediaoptimizer_files_total{result="SUCCESS"} 1' in prometheus
+    assert 'mediaoptimizer_files_total{result="CANCELLED"} 1' in prometheus
+    assert 'result="FAILED"' not in prometheus
+    assert 'mediaoptimizer_bytes_in_total{kind="image"} 2048' in prometheus
+    assert 'mediaoptimizer_skips_total{reason="ledger"} 2' in prometheus
+    assert 'mediaoptimizer_file_duration_seconds_bucket{kind="image",le="2.5"} 0' in prometheus
+    assert 'mediaoptimizer_file_duration_seconds_bucket{kind="image",le="+Inf"} 1' in prometheus
+
+    snapshot = json.loads((tmp_path / "metrics.json").read_text())
+    stages = {h["labels"]["stage"] for h in snapshot["histograms"] if h["name"] == "stage_duration_seconds"}
+    assert stages == {"VERIFYING", "OPTIMIZING"}
+
+
+def test_encode_gauges(tmp_path: Path):
+    metrics = MetricsManager(tmp_path, interval=0)
+    metrics.encoding("job-1", 30.0, 1.5, 20.0)
+    metrics.encoding("job-2", 10.0, 0.5, 60.0)
+    prometheus = metrics.to_prometheus()
+    assert "mediaoptimizer_encodes_running 2" in prometheus
+    assert "mediaoptimizer_encode_fps 40.0" in prometheus
+    assert "mediaoptimizer_encode_eta_seconds 60.0" in prometheus
+
+    metrics.finish("job-2", "SUCCESS")
+    assert "mediaoptimizer_encodes_running 1" in metrics.to_prometheus()
@@ -0,0 +1,29 @@
+import sys
+import json
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.my_logging import QueueLogger
+
+
+def test_queue_logger(tmp_path: Path):
+    log_file = tmp_path / "log.jsonl"
+    logger = QueueLogger(level="INFO", console=False, max_bytes=2000, backup_count=2)
+    guid = "0f8fad5b-d9cb-469f-a165-70867728950e"
+
+    logger.log("debug is filtered", log_file, "DEBUG")
+    for i in range(30):
+        logger.log(f"[{guid}] Optimizing media {i}...", log_file, stage="OPTIMIZING", file=tmp_path / "a.jpg")
+    logger.log("Optimizer ended.", log_file, "WARNING", duration=1.5)
+    logger.shutdown()
+
+    records = []
+    for file in sorted(tmp_path.glob("log.jsonl*"), reverse=True):
+        records += [json.loads(line) for line in file.read_text(encoding="utf-8").splitlines()]
+
+    assert (tmp_path / "log.jsonl.1").exists() and not (tmp_path / "log.jsonl.3").exists()
+    assert records[-1] == {"time": records[-1]["time"], "level": "WARNING", "guid": None, "message": "Optimizer ended.", "duration": 1.5}
+    assert records[-2]["guid"] == guid and records[-2]["message"] == "Optimizing media 29..."
+    assert records[-2]["file"] == str(tmp_path / "a.jpg")
+    assert all(record["level"] != "DEBUG" for record in records)
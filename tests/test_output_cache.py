@@ -0,0 +1,33 @@
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.output_cache import OutputCache
+from components.file_manager import FileManager
+
+
+def test_output_cache_lru(tmp_path: Path):
+    cache = OutputCache(str(tmp_path / "cache"), max_size=25, tool_version="ffmpeg 7.1")
+    digests = []
+    for i in range(3):
+        source = tmp_path / f"source_{i}.jpg"
+        source.write_bytes(bytes([i]) * 100)
+        output = tmp_path / f"output_{i}.avif"
+        output.write_bytes(bytes([i]) * 10)
+        digests.append(FileManager.hash_file(source))
+        cache.put(cache.key(digests[i], "libaom-av1"), output)
+        if i == 1:
+            # source_0 used again, source_1 becomes the least recently used entry
+            assert cache.get(cache.key(digests[0], "libaom-av1"), tmp_path / "duplicate.avif")
+
+    assert (tmp_path / "duplicate.avif").read_bytes() == bytes([0]) * 10
+    assert cache.key(digests[0], "libaom-av1") != cache.key(digests[0], "libaom-av1", {"image_quality": 30})
+    assert not cache.get(cache.key(digests[1], "libaom-av1"), tmp_path / "evicted.avif")
+    assert cache.get(cache.key(digests[2], "libaom-av1"), tmp_path / "output_2_copy.avif")
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.close()
+
+    # reopened on the next use in the same process
+    assert cache.get(cache.key(digests[2], "libaom-av1"), tmp_path / "output_2_again.avif")
+    cache.close()
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from classes.path_manager import PathManager
+
+
+def test_folders_created_once(tmp_path: Path, monkeypatch):
+    folders = {name: tmp_path / name for name in ("failed", "temp", "optimized", "raw", "uploaded", "failed_upload")}
+    path_manager = PathManager(tmp_path, tmp_path / "log", *folders.values())
+    assert not any(folder.exists() for folder in folders.values())   # nothing created up front
+
+    created = []
+    original = Path.mkdir
+    monkeypatch.setattr(Path, "mkdir", lambda self, *a, **k: created.append(self.name) or original(self, *a, **k))
+    for _ in range(3):
+        assert path_manager.optimized_media == folders["optimized"]
+        assert path_manager.temp_media == folders["temp"]
+    assert created == ["optimized", "temp"]
+    assert folders["optimized"].is_dir() and not folders["raw"].exists()
@@ -0,0 +1,67 @@
+import sys
+import threading
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from helper.pipeline import Pipeline
+
+# Operation 0 shape: process_medias hands every output to on_success, upload_all_medias consumes them
+
+
+def _process_medias(files: list[str], produced: list[str]):
+    def process(put):
+        for media in files:
+            put(media)
+            produced.append(media)
+    return process
+
+
+def test_full_queue_blocks_producer():
+    produced, uploaded = [], []
+    release = threading.Event()
+
+    def upload_all_medias(medias):
+        release.wait()
+        uploaded.extend(medias)
+
+    runner = threading.Thread(target=Pipeline.run, args=(_process_medias([f"{i}.avif" for i in range(5)], produced), upload_all_medias, 2))
+    runner.start()
+    runner.join(0.3)
+    assert runner.is_alive()
+    assert produced == ["0.avif", "1.avif"]   # the third put waits for the uploader
+
+    release.set()
+    runner.join(5)
+    assert not runner.is_alive()
+    assert uploaded == [f"{i}.avif" for i in range(5)]
+
+
+def test_uploader_failure_drains_queue():
+    produced, uploaded = [], []
+
+    def upload_all_medias(medias):
+        for media in medias:
+            uploaded.append(media)
+            return   # upload_all_medias logs the error and stops
+
+    Pipeline.run(_process_medias([f"{i}.avif" for i in range(20)], produced), upload_all_medias, 1)
+    assert len(produced) == 20                # the optimizer was never left blocked
+    assert uploaded == ["0.avif"]
+
+
+def test_sentinel_ends_pipeline():
+    produced, uploaded = [], []
+    Pipeline.run(_process_medias(["a.avif", "b.avif"], produced), uploaded.extend, 4)
+    assert uploaded == produced == ["a.avif", "b.avif"]
+
+    # the end marker is sent even when the producer fails
+    def process_medias(put):
+        put("a.avif")
+        raise KeyboardInterrupt
+
+    uploaded.clear()
+    with pytest.raises(KeyboardInterrupt):
+        Pipeline.run(process_medias, uploaded.extend, 4)
+    assert uploaded == ["a.avif"]
@@ -0,0 +1,111 @@
+import os
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.processed_ledger import ProcessedLedger
+from components.file_manager import FileManager
+
+
+def test_processed_ledger(tmp_path: Path):
+    processed = tmp_path / "processed.jpg"
+    processed.write_bytes(b"processed")
+    fresh = tmp_path / "fresh.jpg"
+    fresh.write_bytes(b"new-media")      # same size, different content
+
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"), batch_size=2)
+    ledger.record(processed, "libaom-av1", {"image_quality": None}, "optimized", FileManager.hash_file(processed))
+
+    # moved file is still recognised by its content
+    moved = tmp_path / "moved.jpg"
+    os.replace(processed, moved)
+
+    result = dict(ledger.filter_unknown([moved, fresh, tmp_path / "missing.jpg"]))
+    assert result == {moved: True, fresh: False, tmp_path / "missing.jpg": False}
+    ledger.close()
+
+
+def test_record_only_stats(tmp_path: Path, monkeypatch):
+    output = tmp_path / "output.avif"
+    output.write_bytes(b"encoded")
+    hashed = []
+    original = FileManager.hash_file
+    monkeypatch.setattr(FileManager, "hash_file", staticmethod(lambda file, *a: hashed.append(Path(file).name) or original(file, *a)))
+
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record(output, "libaom-av1", result="output")
+    assert hashed == []                   # recording only stats the file
+
+    # without a recorded hash there is nothing to compare a same-size file with
+    moved = tmp_path / "moved.avif"
+    os.replace(output, moved)
+    assert dict(ledger.filter_unknown([moved])) == {moved: False}
+    assert hashed == []
+    ledger.close()
+
+
+def test_duplicate_is_not_processed(tmp_path: Path):
+    original = tmp_path / "original.jpg"
+    original.write_bytes(b"forwarded")
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record(original, "libaom-av1", result="optimized", digest=FileManager.hash_file(original))
+
+    # a byte-identical copy next to the original goes on to the output cache
+    copy = tmp_path / "copy.jpg"
+    copy.write_bytes(b"forwarded")
+    assert dict(ledger.filter_unknown([original, copy])) == {original: True, copy: False}
+
+    # once the original is gone, the same content is the moved original
+    original.unlink()
+    assert dict(ledger.filter_unknown([copy])) == {copy: True}
+
+    # touched in place, the content still matches
+    os.utime(copy, ns=(1, 1))
+    ledger.record(copy, "libaom-av1", result="optimized", digest=FileManager.hash_file(copy))
+    os.utime(copy, ns=(2, 2))
+    assert dict(ledger.filter_unknown([copy])) == {copy: True}
+    ledger.close()
+
+
+def test_ledger_reopens_after_close(tmp_path: Path):
+    media = tmp_path / "media.jpg"
+    media.write_bytes(b"media")
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    ledger.record(media, result="optimized")
+    ledger.close()
+
+    # a second batch in the same process
+    assert dict(ledger.filter_unknown([media])) == {media: True}
+    ledger.close()
+    ledger.close()
+
+
+def test_first_file_before_scan_ends(tmp_path: Path):
+    pulled = []
+
+    def scan():
+        for index in range(2000):
+            pulled.append(index)
+            yield tmp_path / f"{index}.jpg"
+
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    checked = ledger.filter_unknown(scan())
+    assert next(checked) == (tmp_path / "0.jpg", False)
+    assert pulled == [0]                  # the scan is still running
+    assert len(list(checked)) == 1999
+    ledger.close()
+
+
+def test_streamed_files_checked_one_by_one(tmp_path: Path):
+    pulled = []
+
+    def queue():
+        for index in range(20):
+            pulled.append(index)
+            yield tmp_path / f"{index}.jpg"
+
+    ledger = ProcessedLedger(str(tmp_path / "ledger.sqlite3"))
+    for count, (media, known) in enumerate(ledger.filter_unknown(queue(), batch_size=1), start=1):
+        assert len(pulled) == count       # nothing is taken out of the queue ahead of time
+    ledger.close()
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from classes.rendition import Rendition, Renditions
+from components.media_optimizer import MediaOptimizer
+
+
+def _outputs(tmp_path: Path, *renditions: Rendition):
+    return [(rendition, tmp_path / f"{rendition.name}.out", None) for rendition in renditions]
+
+
+def _output_args(cmd: list, output: Path):
+    """Arguments of one output (between the previous output file and this one)."""
+    end = cmd.index(output)
+    start = max((index for index, arg in enumerate(cmd[:end]) if isinstance(arg, Path)), default=cmd.index("-filter_complex") + 1)
+    return [str(arg) for arg in cmd[start + 1:end]]
+
+
+def test_image_renditions_share_one_decode(tmp_path: Path):
+    outputs = _outputs(
+        tmp_path,
+        Rendition(name="optimized", codec="libaom-av1"),
+        Rendition(name="jpeg", codec="mjpeg", qvb=3),
+        Rendition(name="thumbnail", codec="mjpeg", qvb=5, max_size=512),
+    )
+    cmd = MediaOptimizer()._renditions_command("photo.jpg", outputs, "image", threads=6)
+
+    assert cmd.count("-i") == 1
+    graph = cmd[cmd.index("-filter_complex") + 1]
+    assert graph.startswith("[0:v:0]split=3[s0][s1][s2];[s2]scale=w='min(iw,512)'")
+    assert "force_divisible_by" not in graph
+
+    main, jpeg, thumbnail = (_output_args(cmd, path) for _, path, _ in outputs)
+    assert main[:2] == ["-map", "[s0]"] and "-crf" in main and "-still-picture" in main
+    assert jpeg[:2] == ["-map", "[s1]"] and jpeg[jpeg.index("-q:v") + 1] == "3"
+    assert thumbnail[:2] == ["-map", "[r2]"] and thumbnail[thumbnail.index("-q:v") + 1] == "5"
+
+
+def test_video_renditions_streams_and_tags(tmp_path: Path):
+    outputs = [
+        (Rendition(name="optimized", codec="libx265", preset="slow"), tmp_path / "master.mkv", {"Optimize": "True"}),
+        (Rendition(name="preview", codec="libx264", crf=28, max_size=720, streaming=True), tmp_path / "preview.mp4", {"Rendition": "preview"}),
+    ]
+    cmd = MediaOptimizer()._renditions_command("video.mov", outputs, "video")
+
+    assert "force_divisible_by=2" in cmd[cmd.index("-filter_complex") + 1]
+    master = _output_args(cmd, outputs[0][1])
+    preview = _output_args(cmd, outputs[1][1])
+
+    # master keeps every other stream of the source, the preview only the audio
+    assert master[:6] == ["-map", "[s0]", "-map", "0", "-map", "-0:v:0"]
+    assert master[master.index("-crf") + 1] == "26"
+    assert "Optimize=True" in master and "Rendition=preview" not in master
+    assert preview[:4] == ["-map", "[r1]", "-map", "0:a?"]
+    assert preview[preview.index("-crf") + 1] == "28"
+    assert "+faststart" in preview and "-dn" in preview
+    assert "Rendition=preview" in preview
+
+
+def test_renditions_config():
+    renditions = Renditions(**{"image": [{"name": "thumbnail", "codec": "mjpeg", "max_size": 512}]})
+    assert renditions.image[0].max_size == 512
+    assert renditions.video == []
@@ -0,0 +1,105 @@
+import sys
+import threading
+import pytest
+import requests
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.resumable_upload import ResumableUpload
+
+GRANULARITY = 256
+
+
+class UploadServer(ThreadingHTTPServer):
+    """Stand-in for the Google upload endpoint, drops the chunk at `fail_offset` once."""
+
+    def __init__(self, fail_offset: int = None):
+        super().__init__(("127.0.0.1", 0), UploadHandler)
+        self.received = bytearray()
+        self.commands: list[str] = []
+        self.fail_offset = fail_offset
+        self.finalized = False
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status: int = 200, headers: dict = None, body: bytes = b""):
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        server: UploadServer = self.server
+        data = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        command = self.headers["X-Goog-Upload-Command"]
+        server.commands.append(command)
+        assert self.headers["Authorization"] == "Bearer token"
+
+        if command == "start":
+            assert self.headers["X-Goog-Upload-Protocol"] == "resumable"
+            return self._reply(headers={
+                "X-Goog-Upload-URL": f"{server.url}/session",
+                "X-Goog-Upload-Chunk-Granularity": str(GRANULARITY)
+            })
+        if command == "query":
+            return self._reply(headers={"X-Goog-Upload-Status": "active", "X-Goog-Upload-Size-Received": str(len(server.received))})
+
+        offset = int(self.headers["X-Goog-Upload-Offset"])
+        if offset == server.fail_offset:
+            server.fail_offset = None
+            server.received.extend(data[:10])      # connection dropped part way through the chunk
+            return self._reply(503)
+        assert offset == len(server.received)
+        server.received.extend(data)
+        if "finalize" in command:
+            server.finalized = True
+            return self._reply(body=b"upload-token")
+        return self._reply()
+
+
+@pytest.fixture
+def server(request):
+    server = UploadServer(getattr(request, "param", None))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def media(tmp_path: Path):
+    file = tmp_path / "video.mp4"
+    file.write_bytes(bytes(range(256)) * 10)     # 2560 bytes
+    return file
+
+
+def _upload(server: UploadServer, media: Path):
+    with requests.Session() as session:
+        uploader = ResumableUpload(session, f"{server.url}/upload", lambda: {"Authorization": "Bearer token"}, chunk_size=1000, backoff=0)
+        return uploader.upload(media, "video/mp4")
+
+
+def test_resumable_upload(server: UploadServer, media: Path):
+    assert _upload(server, media) == "upload-token"
+    assert bytes(server.received) == media.read_bytes()
+    # chunk size rounded down to the granularity: 768 + 768 + 768 + 256
+    assert server.commands == ["start", "upload", "upload", "upload", "upload, finalize"]
+
+
+@pytest.mark.parametrize("server", [768], indirect=True)
+def test_resumable_upload_resumes_after_error(server: UploadServer, media: Path):
+    assert _upload(server, media) == "upload-token"
+    assert bytes(server.received) == media.read_bytes()
+    assert server.commands == ["start", "upload", "upload", "query", "upload", "upload", "upload, finalize"]
@@ -0,0 +1,29 @@
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.run_journal import RunJournal
+
+
+def test_run_journal_resume(tmp_path: Path):
+    journal_file = tmp_path / "journal.jsonl"
+    journal = RunJournal(journal_file)
+    journal.record(tmp_path / "a.jpg", "OPTIMIZING", "guid-a", tmp_path / "a.avif")
+    journal.record(tmp_path / "a.jpg", "SUCCESS", "guid-a", tmp_path / "a.avif")
+    journal.record(tmp_path / "b.mp4", "OPTIMIZING", "guid-b", tmp_path / "b.mp4.out")
+    journal.close()
+
+    # torn line left by a crash
+    with open(journal_file, "a", encoding="utf-8") as file:
+        file.write('{"path": "c.jpg", "sta')
+
+    resumed = RunJournal(journal_file)
+    assert resumed.finished(tmp_path / "a.jpg")
+    assert not resumed.finished(tmp_path / "b.mp4")
+    assert [entry["guid"] for entry in resumed.unfinished()] == ["guid-b"]
+    assert resumed.unfinished()[0]["output"] == str(tmp_path / "b.mp4.out")
+
+    resumed.record(tmp_path / "b.mp4", "SUCCESS", "guid-b")
+    resumed.close()
+    assert RunJournal(journal_file).finished(tmp_path / "b.mp4")
@@ -0,0 +1,84 @@
+import sys
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.media_optimizer import MediaOptimizer
+
+# Stub ffmpeg for the three steps: split into 3 segments, encode a segment (10s, 100 bytes), concat
+FFMPEG = """
+import os, sys
+from pathlib import Path
+args = sys.argv[1:]
+output = Path(args[-1])
+if "segment" in args:
+    for index in range(3):
+        Path(str(output) % index).write_bytes(b"s" * 1000)
+elif "concat" in args:
+    listed = Path(args[args.index("-i") + 1]).read_text().splitlines()
+    output.write_bytes(b"".join(Path(line[6:-1]).read_bytes() for line in listed))
+else:
+    source = args[args.index("-i") + 1]
+    if source.endswith(os.environ.get("STUB_FAIL", "-")):
+        sys.stderr.write("Segment encode failed\\n")
+        sys.exit(1)
+    sys.stdout.write("fps=25.0\\ntotal_size=100\\nout_time_us=10000000\\nspeed=2.0x\\nprogress=end\\n")
+    output.write_bytes(b"e" * 100)
+"""
+
+
+def _optimizer(tmp_path: Path):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(f"#!{sys.executable}\n{FFMPEG}")
+    ffmpeg.chmod(0o755)
+    return MediaOptimizer(ffmpeg=str(ffmpeg), exiftool_daemon=False)
+
+
+def test_split_command(tmp_path: Path):
+    cmd = MediaOptimizer()._split_command("video.mov", tmp_path, 20)
+    assert cmd[cmd.index("-map") + 1] == "0:v:0"
+    assert cmd[cmd.index("-c") + 1] == "copy"
+    assert cmd[cmd.index("-f") + 1] == "segment"
+    assert cmd[cmd.index("-segment_time") + 1] == "20"
+    assert cmd[-1] == tmp_path / "source_%05d.mkv"
+
+
+def test_concat_command(tmp_path: Path):
+    cmd = MediaOptimizer()._concat_command(tmp_path / "segments.txt", "video.mov", tmp_path / "out.mp4", True, {"Optimize": "True"})
+    assert cmd[cmd.index("-f") + 1] == "concat"
+    assert cmd.count("-i") == 2 and cmd[cmd.index("-i") + 1] == tmp_path / "segments.txt"
+    maps = [cmd[index + 1] for index, arg in enumerate(cmd) if arg == "-map"]
+    assert maps == ["0:v:0", "1", "-1:v:0"]                # encoded video, every other stream of the original
+    assert "-dn" in cmd and "+faststart" in cmd
+    assert "Optimize=True" in cmd
+    assert cmd[-1] == tmp_path / "out.mp4"
+
+    mkv = MediaOptimizer()._concat_command(tmp_path / "segments.txt", "video.mov", tmp_path / "out.mkv")
+    assert "-dn" not in mkv and "+faststart" not in mkv
+
+
+def test_segmented_encode_joins_and_cleans_up(tmp_path: Path):
+    source = tmp_path / "video.mov"
+    source.write_bytes(b"v" * 3000)
+    work_dir = tmp_path / "work"
+    events = []
+
+    output = _optimizer(tmp_path).optimize_video_segmented(
+        str(source), tmp_path / "out.mkv", work_dir, threads=4, segment_workers=2, duration=30, progress_callback=events.append
+    )
+    assert output.read_bytes() == b"e" * 300
+    assert not work_dir.exists()
+    assert events[-1].out_time == 30.0 and events[-1].ratio == 1.0
+
+
+def test_segmented_failure_cleans_up(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("STUB_FAIL", "source_00001.mkv")
+    source = tmp_path / "video.mov"
+    source.write_bytes(b"v" * 3000)
+    work_dir = tmp_path / "work"
+
+    with pytest.raises(RuntimeError, match="Segment encode failed"):
+        _optimizer(tmp_path).optimize_video_segmented(str(source), tmp_path / "out.mkv", work_dir, threads=2, segment_workers=1, duration=30)
+    assert not work_dir.exists()
+    assert not (tmp_path / "out.mkv").exists()
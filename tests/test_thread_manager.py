@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import threading
+import subprocess
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.thread_manager import ThreadManager
+from classes.job_context import JobContext
+from components.media_optimizer import MediaOptimizer
+
+
+def _wait_cancelled(job: JobContext, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not job.cancelled and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job.cancelled
+
+
+def test_run_bounds_concurrency():
+    running, peak = [0], [0]
+    lock = threading.Lock()
+
+    def job(item, context: JobContext):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+        return item * 2
+
+    manager = ThreadManager(workers=3, threads=12)
+    assert sorted(manager.run(job, range(10))) == [i * 2 for i in range(10)]
+    assert peak[0] <= 3
+    assert not manager.interrupted
+
+
+def test_threads_per_worker(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    assert ThreadManager(workers=4).threads_per_worker == 2                 # the cpu is split, not handed out 4 times
+    assert ThreadManager(workers=4, threads=2).threads_per_worker == 1      # never below one thread
+    assert ThreadManager(workers=1).threads_per_worker is None              # ffmpeg decides, no -threads flag
+    threads = []
+    ThreadManager(workers=1, threads=6).run(lambda item, job: threads.append(job.threads), [1])
+    assert threads == [6]
+
+
+def test_worker_share_reaches_the_encoder(monkeypatch):
+    monkeypatch.setattr(os, "cpu_count", lambda: 8)
+    optimizer = MediaOptimizer()
+    commands = []
+    ThreadManager(workers=2).run(lambda item, job: commands.append(optimizer._video_command("in.mov", Path("out.mp4"), 26, "slow", "libx265", threads=job.threads)), [1, 2])
+    for cmd in commands:
+        assert cmd[cmd.index("-threads") + 1] == "4"
+        assert cmd[cmd.index("-x265-params") + 1] == "pools=4"
+
+    commands.clear()
+    ThreadManager(workers=1).run(lambda item, job: commands.append(optimizer._video_command("in.mov", Path("out.mp4"), 26, "slow", "libx265", threads=job.threads)), [1])
+    assert "-threads" not in commands[0] and "-x265-params" not in commands[0]
+
+
+def test_interrupt_while_pulling_stops_the_pull():
+    started, finished = [], []
+    lock = threading.Lock()
+
+    def job(item, context: JobContext):
+        with lock:
+            started.append(item)
+        cancelled = _wait_cancelled(context)
+        finished.append(item)
+        return f"cancelled-{item}" if cancelled else item
+
+    def items():
+        yield from range(4)   # two running, two waiting in the backlog
+        deadline = time.monotonic() + 5
+        while len(started) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        raise KeyboardInterrupt
+        yield 4   # never pulled
+
+    manager = ThreadManager(workers=2)
+    results = manager.run(job, items())
+    assert manager.interrupted
+    assert sorted(results) == ["cancelled-0", "cancelled-1"]
+    assert sorted(started) == [0, 1]   # the backlog never started
+
+
+def test_interrupt_while_pulling_single_worker():
+    def items():
+        yield 1
+        raise KeyboardInterrupt
+
+    manager = ThreadManager(workers=1)
+    assert manager.run(lambda item, job: item, items()) == [1]
+    assert manager.interrupted
+
+
+def test_interrupt_inside_job_cancels_it():
+    jobs = {}
+
+    def job(item, context: JobContext):
+        jobs[item] = context
+        if item == 1:
+            raise KeyboardInterrupt
+        return item
+
+    manager = ThreadManager(workers=2)
+    assert sorted(manager.run(job, [0, 1, 2]), key=str) == [0, 2, None]
+    assert manager.interrupted
+    assert jobs[1].cancelled
+    assert not jobs[0].cancelled and not jobs[2].cancelled   # the other items keep going
+
+
+def _sleeper():
+    return subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"])
+
+
+def test_job_cancel_terminates_subprocess():
+    job = JobContext()
+    process = _sleeper()
+    job.attach_subprocess(process)
+    job.raise_if_cancelled()   # not cancelled yet
+    job.cancel()
+    assert process.poll() is not None
+    with pytest.raises(KeyboardInterrupt):
+        job.raise_if_cancelled()
+
+
+def test_attach_after_cancel_terminates():
+    job = JobContext()
+    job.cancel()
+    process = _sleeper()
+    job.attach_subprocess(process)
+    assert process.poll() is not None
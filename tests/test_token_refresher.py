@@ -0,0 +1,82 @@
+import sys
+import time
+import threading
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.token_refresher import TokenRefresher
+
+
+class FakeCredentials:
+    """Credentials stand-in: a token, its expiry (naive UTC like google-auth) and slow refreshes."""
+
+    def __init__(self, token: str = "token-0", expires_in: timedelta = timedelta(hours=1)):
+        self.token = token
+        self.expiry = datetime.now(UTC).replace(tzinfo=None) + expires_in
+        self.refreshes = 0
+
+    def refresh(self):
+        time.sleep(0.05)   # long enough for the other callers to pile up
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = datetime.now(UTC).replace(tzinfo=None) + timedelta(hours=1)
+
+
+def _refresher(creds: FakeCredentials, active: bool = True):
+    validations = []
+    refresher = TokenRefresher(lambda: creds, creds.refresh, lambda: validations.append(creds.token) or active)
+    return refresher, validations
+
+
+def test_fresh_token_is_trusted_locally():
+    creds = FakeCredentials()
+    refresher, validations = _refresher(creds)
+    assert refresher.ensure_valid()
+    assert (creds.refreshes, validations) == (0, [])
+
+
+def test_concurrent_callers_share_one_refresh():
+    creds = FakeCredentials(expires_in=timedelta(minutes=2))   # within the 5 minutes skew
+    refresher, validations = _refresher(creds)
+    start = threading.Barrier(8)
+
+    def call():
+        start.wait()
+        refresher.ensure_valid()
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert creds.refreshes == 1
+    assert creds.token == "token-1"
+    assert validations == []
+
+
+def test_stale_401_is_skipped_after_another_refresh():
+    creds = FakeCredentials()
+    refresher, validations = _refresher(creds, active=False)
+    used_token = creds.token
+    creds.refresh()                          # another thread refreshed meanwhile
+    refresher.on_unauthorized(used_token)
+    assert creds.refreshes == 1
+    assert validations == []
+
+
+def test_401_validates_then_refreshes_once():
+    creds = FakeCredentials()
+    refresher, validations = _refresher(creds, active=True)
+    refresher.on_unauthorized(creds.token)   # token still active: no refresh
+    assert (creds.refreshes, validations) == (0, ["token-0"])
+
+    refresher, validations = _refresher(creds, active=False)
+    threads = [threading.Thread(target=refresher.on_unauthorized, args=("token-0",)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert creds.refreshes == 1              # the other three saw the new token
+    assert validations == ["token-0"]
@@ -0,0 +1,56 @@
+import os
+import sys
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.tool_registry import ToolRegistry
+
+ENCODERS = """Encoders:
+ V..... = Video
+ A..... = Audio
+ ------
+ V....D libx265              libx265 H.265 / HEVC (codec hevc)
+ V....D libaom-av1           libaom AV1 (codec av1)
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+
+MUXERS = """File formats:
+ D. = Demuxing supported
+ .E = Muxing supported
+ --
+  E mp4             MP4 (MPEG-4 Part 14)
+ DE matroska,webm   Matroska / WebM
+"""
+
+
+def test_parse_list():
+    encoders = ToolRegistry._parse_list(ENCODERS, "------")
+    assert encoders == {"libx265": "V....D", "libaom-av1": "V....D", "aac": "A....D"}
+
+    muxers = ToolRegistry._parse_list(MUXERS, "--")
+    assert set(muxers) == {"mp4", "matroska", "webm"}
+
+
+def test_extract_version():
+    assert ToolRegistry.extract_version("ffmpeg version 7.1.1-full_build-www.gyan.dev Copyright") == "7.1.1"
+    assert ToolRegistry.extract_version("ffprobe version n6.0 Copyright") == "6.0"
+
+
+def test_version_resolved_once(tmp_path: Path, monkeypatch):
+    ffmpeg = tmp_path / "ffmpeg"
+    ffmpeg.write_text(f"#!{sys.executable}\nprint('ffmpeg version 7.1 Copyright')\n")
+    ffmpeg.chmod(0o755)
+    resolved = []
+    original = ToolRegistry._resolve
+    monkeypatch.setattr(ToolRegistry, "_resolve", staticmethod(lambda executable: resolved.append(executable) or original(executable)))
+
+    registry = ToolRegistry(ffmpeg=str(ffmpeg), cache_file=str(tmp_path / "tools.json"))
+    assert [registry.ffmpeg_version for _ in range(3)] == ["ffmpeg-7.1"] * 3
+    assert resolved == [str(ffmpeg)]
+
+    # a later run reads the cached version while the binary keeps its mtime
+    mtime = ffmpeg.stat().st_mtime_ns
+    ffmpeg.write_text(f"#!{sys.executable}\nraise SystemExit(1)\n")
+    os.utime(ffmpeg, ns=(mtime, mtime))
+    assert ToolRegistry(ffmpeg=str(ffmpeg), cache_file=str(tmp_path / "tools.json")).ffmpeg_version == "ffmpeg-7.1"
@@ -0,0 +1,108 @@
+import sys
+import json
+import pytest
+from pathlib import Path
+
+# Add the components folder to sys.path
+sys.path.append(str(Path(".").absolute()))
+from components.upload_scheduler import UploadScheduler
+
+
+class FakeClock:
+    """Clock advanced only by sleep, so waits are measured exactly."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, headers: dict = None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+def _scheduler(clock: FakeClock, **kwargs):
+    return UploadScheduler(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def test_request_rate_allows_burst_then_paces():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, requests_per_second=2, burst=3)
+    for _ in range(5):
+        scheduler.acquire()
+    # 3 from the burst, then one every 0.5s
+    assert clock.sleeps == [0.5, 0.5]
+
+
+def test_bandwidth_cap():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, requests_per_second=None, bandwidth=1000)
+    scheduler.acquire(1000)
+    scheduler.acquire(3000)
+    assert clock.sleeps == [3.0]
+
+
+def test_retry_after_is_honored():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, requests_per_second=None)
+    responses = iter([FakeResponse(429, {"Retry-After": "7"}), FakeResponse(503), FakeResponse(200)])
+    response = scheduler.call(lambda: next(responses))
+    assert response.status_code == 200
+    assert clock.sleeps[0] == 7
+    assert 1 <= clock.sleeps[1] <= 2      # backoff of attempt 1 with jitter
+
+
+def test_retries_are_bounded():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, requests_per_second=None, max_retries=2)
+    calls = []
+    response = scheduler.call(lambda: calls.append(1) or FakeResponse(500))
+    assert response.status_code == 500
+    assert len(calls) == 3
+
+
+def test_quota_is_persisted(tmp_path: Path):
+    quota_file = tmp_path / "quota.json"
+    clock = FakeClock()
+    scheduler = _scheduler(clock, requests_per_second=None, quota_file=quota_file)
+    scheduler.acquire(100)
+    scheduler.acquire(50)
+
+    reloaded = _scheduler(clock, requests_per_second=None, quota_file=quota_file)
+    assert reloaded.quota["requests"] == 2
+    assert reloaded.quota["bytes"] == 150
+    assert json.loads(quota_file.read_text())["day"] == reloaded.quota["day"]
+
+
+def test_quota_exhausted_waits_for_next_day():
+    clock = FakeClock()
+    throttled = []
+    scheduler = _scheduler(clock, requests_per_second=None, daily_request_limit=1,
+                           on_throttle=lambda reason, delay: throttled.append(reason))
+    scheduler.acquire()
+    # Day changes while sleeping
+    scheduler._seconds_to_next_day = lambda: 0.0
+    original = clock.sleep
+    scheduler._sleep = lambda seconds: (original(seconds), scheduler._quota.update(day="yesterday"))
+    scheduler.acquire()
+    assert throttled == ["daily request quota"]
+    assert scheduler.quota["requests"] == 1
+
+
+def test_request_larger_than_byte_quota_fails():
+    clock = FakeClock()
+    scheduler = _scheduler(clock, requests_per_second=None, daily_byte_limit=100)
+    with pytest.raises(ValueError):
+        scheduler.acquire(200)
+    assert clock.sleeps == []
+    assert scheduler.quota["requests"] == 0
+    scheduler.acquire(100)
+    assert scheduler.quota["bytes"] == 100